@@ -1,157 +1,284 @@
 """
-Webhook endpoints для приема бронирований от модуля бронирования.
+Webhook endpoints для приема бронирований от модулей бронирования.
+
+/webhooks/{provider} — провайдер из реестра (app/services/webhook_parser.py),
+/webhooks/booking — исторический адрес для HomeReserve.
 """
 
 from fastapi import APIRouter, Request, Depends, HTTPException, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
-import json
-
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from datetime import datetime
+from app import fastjson
 from app.config import get_settings
-from app.db.session import get_session
-from app.db.crud import (
-    get_or_create_booking, save_webhook_event, get_webhook_event_by_hash,
-    mark_webhook_processed, log_referral_event, get_or_create_user,
+from app.db.session import get_session, unit_of_work
+from app.db.crud import claim_webhook_event
+from app.services.webhook_parser import (
+    ProviderSpec, calculate_payload_hash, get_provider_registry,
+)
+from app.services.booking_events import (
+    apply_booking_event, get_webhook_inbox, ingest_booking_batch, parse_booking_event,
 )
-from app.services.webhook_parser import WebhookParser, calculate_payload_hash
-from app.services.attribution import attribute_booking, check_attribution_window
-from app.services.referrals import create_payout_for_booking
 from app.logger import log_webhook
 
 router = APIRouter()
 settings = get_settings()
 
 
+def check_secret(x_webhook_secret: Optional[str]):
+    if x_webhook_secret != settings.webhook_secret:
+        log_webhook.warning("Неверный webhook secret")
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def check_provider(provider: str) -> ProviderSpec:
+    spec = get_provider_registry().get(provider)
+    if spec is None:
+        log_webhook.warning(f"Вебхук от неизвестного провайдера: {provider}")
+        raise HTTPException(status_code=404, detail="Unknown provider")
+    return spec
+
+
+def duplicate_response(payload_hash: str) -> dict:
+    log_webhook.info(f"Вебхук уже обработан (дубликат): payload_hash={payload_hash}")
+    return {"ok": True, "duplicate": True}
+
+
 @router.post("/booking")
 async def webhook_booking(
     request: Request,
     session: AsyncSession = Depends(get_session),
     x_webhook_secret: Optional[str] = Header(None),
+):
+    """Вебхук HomeReserve (исторический адрес)"""
+    return await handle_webhook("homereserve", request, session, x_webhook_secret)
+
+
+async def handle_webhook(
+    provider: str,
+    request: Request,
+    session: AsyncSession,
+    x_webhook_secret: Optional[str],
 ):
     """
     Вебхук для приема бронирований.
     
     Проверяет:
     - Secret для авторизации
-    - Идемпотентность по payload_hash
+    - Идемпотентность по payload_hash (уникальный индекс, без отдельного SELECT);
+      хеш канонический — порядок ключей и volatile-поля не влияют
     - Парсит payload универсальным парсером
     - Обновляет Booking, создает Payout, логирует события
+
+    Все изменения в БД идут одной транзакцией (unit_of_work).
+    В режиме inbox (WEBHOOK_MODE=inbox) только сохраняет сырое событие
+    и отвечает 202 — обработку делают воркеры (app/services/booking_events.py).
     """
     
-    # 1. Проверка secret
-    if x_webhook_secret != settings.webhook_secret:
-        log_webhook.warning("Неверный webhook secret")
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    # 1. Проверка secret и провайдера
+    check_secret(x_webhook_secret)
+    spec = check_provider(provider)
     
-    # 2. Получить raw payload
+    # 2. Получить raw payload и разобрать JSON
     body = await request.body()
-    payload_hash = calculate_payload_hash(body)
-    
-    # Парсим JSON
     try:
-        payload = json.loads(body)
-    except Exception as e:
-        log_webhook.error("Ошибка парсинга JSON", error=str(e))
+        payload = fastjson.loads(body)
+    except ValueError as e:
+        log_webhook.error(f"Ошибка парсинга JSON: {e}")
         return {"ok": False, "error": "Invalid JSON"}
     
-    # 3. Проверка идемпотентности (по хешу)
-    existing_event = await get_webhook_event_by_hash(
-        session, provider="homereserve", payload_hash=payload_hash
-    )
+    # Событие — только JSON-объект (как в пакетном приеме)
+    if not isinstance(payload, dict):
+        log_webhook.error(f"Вебхук не JSON-объект: provider={provider}")
+        return {"ok": False, "error": "Invalid JSON"}
     
-    if existing_event:
-        log_webhook.info(
-            "Вебхук уже обработан (дубликат)",
-            payload_hash=payload_hash,
-        )
-        return {"ok": True, "duplicate": True}
+    payload_hash = spec.payload_hash(payload)
     
-    # 4. Парсим через универсальный парсер
-    parser = WebhookParser(provider="homereserve", payload=payload)
-    parsed = parser.parse()
+    if settings.webhook_mode == "inbox":
+        return await enqueue_webhook(session, provider, payload, payload_hash)
     
-    if not parsed:
-        # Сохраняем even так, чтобы не обрабатывать снова
-        event = await save_webhook_event(
+    # 3. Парсим через универсальный парсер (без обращений к БД);
+    # событие без id брони не применить — отвечаем ok: false до upsert
+    parsed = parse_booking_event(provider, payload)
+    
+    # Весь вебхук — одна транзакция: хелперы только flush-ят,
+    # commit один на выходе, при ошибке ничего не остается наполовину
+    async with unit_of_work(session):
+        # 4. Захватываем событие. Идемпотентность обеспечивает уникальный
+        # индекс (provider, payload_hash): дубликат — это конфликт вставки
+        if not parsed:
+            # Сохраняем событие так, чтобы не обрабатывать снова
+            event = await claim_webhook_event(
+                session,
+                provider=provider,
+                payload_hash=payload_hash,
+                event_id=payload.get("id"),
+                event_type="unknown",
+                raw_payload_json=payload,
+                processed_at=datetime.utcnow(),
+            )
+            if not event:
+                return duplicate_response(payload_hash)
+            
+            return {"ok": False, "error": "Could not parse webhook"}
+        
+        # 5. Сохраняем сырое событие (обработано в этой же транзакции)
+        event = await claim_webhook_event(
             session,
-            provider="homereserve",
-            event_id=payload.get("id"),
-            event_type="unknown",
+            provider=parsed["provider"],
             payload_hash=payload_hash,
+            event_id=parsed["event_id"],
+            event_type=parsed["event_type"],
             raw_payload_json=payload,
+            processed_at=datetime.utcnow(),
         )
-        await mark_webhook_processed(session, event.id)
+        if not event:
+            return duplicate_response(payload_hash)
         
-        return {"ok": False, "error": "Could not parse webhook"}
+        # 6. Upsert Booking, атрибуция, выплата
+        booking, transitioned, payout_created = await apply_booking_event(session, parsed, payload)
     
-    # 5. Сохраняем сырое событие
-    event = await save_webhook_event(
-        session,
-        provider=parsed["provider"],
-        event_id=parsed["event_id"],
-        event_type=parsed["event_type"],
-        payload_hash=payload_hash,
-        raw_payload_json=payload,
+    log_webhook.info(
+        f"Вебхук обработан: event_id={event.id} booking_id={booking.id} "
+        f"event_type={parsed['event_type']}"
     )
     
-    # 6. Upsert Booking
-    external_id = parsed["event_id"]
-    
-    booking, created = await get_or_create_booking(
+    return {
+        "ok": True,
+        "booking_id": booking.id,
+        "status_applied": transitioned,
+        "payout_created": payout_created,
+    }
+
+
+async def enqueue_webhook(session: AsyncSession, provider: str, payload, payload_hash: str):
+    """
+    Режим inbox: сохранить сырое событие (processed_at IS NULL) и ответить 202.
+    Дубликат отсекается тем же уникальным индексом (provider, payload_hash).
+    """
+    event = await claim_webhook_event(
         session,
-        external_id=external_id,
-        status=parsed["event_type"],
-        check_in=parsed["check_in"],
-        check_out=parsed["check_out"],
-        total_amount=parsed["total_amount"],
-        currency=parsed["currency"],
-        source_tag=parsed.get("source_tag"),
+        provider=provider,
+        payload_hash=payload_hash,
+        event_id=payload.get("id"),
+        event_type="unknown",
         raw_payload_json=payload,
     )
+    if not event:
+        return duplicate_response(payload_hash)
     
-    # 7. Атрибуция
-    source_tag = payload.get("source_tag") or payload.get("utm_source")
-    ref_code = await attribute_booking(
-        session,
-        booking,
-        source_tag=source_tag,
-        phone=parsed.get("phone"),
-    )
+    get_webhook_inbox().notify()
+    return JSONResponse({"ok": True, "queued": True, "event_id": event.id}, status_code=202)
+
+
+# ============= BATCH =============
+
+def batch_item(spec: ProviderSpec, raw: bytes) -> Tuple[str, Any]:
+    """(payload_hash, payload) строки NDJSON; payload None — невалидный JSON"""
+    try:
+        payload = fastjson.loads(raw)
+    except ValueError:
+        return calculate_payload_hash(raw), None
+    return spec.payload_hash(payload), payload
+
+
+async def iter_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Строки NDJSON из потока тела запроса, без чтения тела целиком"""
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+@router.post("/booking/batch")
+async def webhook_booking_batch(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    x_webhook_secret: Optional[str] = Header(None),
+):
+    """Пакетный вебхук HomeReserve (исторический адрес)"""
+    return await handle_webhook_batch("homereserve", request, session, x_webhook_secret)
+
+
+async def handle_webhook_batch(
+    provider: str,
+    request: Request,
+    session: AsyncSession,
+    x_webhook_secret: Optional[str],
+):
+    """
+    Пакетный прием бронирований: JSON-массив событий или NDJSON
+    (Content-Type: application/x-ndjson, одно событие на строку).
+
+    NDJSON читается потоком. Оба формата применяются частями по
+    WEBHOOK_BATCH_SIZE — каждая часть одной транзакцией: дедупликация
+    одним запросом, брони одним пакетным upsert. Части держат INSERT в
+    пределах лимита параметров драйвера (asyncpg — 32767) даже для
+    выгрузки тысяч броней. Ответ — результат по каждому событию по порядку.
+    """
+    check_secret(x_webhook_secret)
+    spec = check_provider(provider)
+    queue_only = settings.webhook_mode == "inbox"
+    results: List[dict] = []
     
-    # 8. Если статус PAID — создаем Payout
-    if parsed["event_type"] == "paid" and ref_code:
-        # Проверяем окно атрибуции
-        # TODO: Получить user_id из phone или другого способа
-        
-        payout = await create_payout_for_booking(session, ref_code, booking)
-        
-        if payout:
-            log_webhook.info(
-                "Выплата создана",
-                payout_id=payout.id,
-                booking_id=booking.id,
-            )
-        
-        # Логируем событие для реферала
-        await log_referral_event(
-            session,
-            ref_code.id,
-            "booking_paid",
-            booking_id=booking.id,
-        )
+    async def flush(items: List[Tuple[str, Any]]):
+        results.extend(await ingest_booking_batch(session, provider, items, queue_only))
+        items.clear()
     
-    # 9. Отмечаем обработанным
-    await mark_webhook_processed(session, event.id)
+    items: List[Tuple[str, Any]] = []
+    if "ndjson" in request.headers.get("content-type", ""):
+        async for line in iter_ndjson(request.stream()):
+            items.append(batch_item(spec, line))
+            if len(items) >= settings.webhook_batch_size:
+                await flush(items)
+    else:
+        try:
+            payloads = fastjson.loads(await request.body())
+        except ValueError as e:
+            log_webhook.error(f"Ошибка парсинга JSON пачки: {e}")
+            return {"ok": False, "error": "Invalid JSON"}
+        if not isinstance(payloads, list):
+            return {"ok": False, "error": "Expected JSON array"}
+        for payload in payloads:
+            items.append((spec.payload_hash(payload), payload))
+            if len(items) >= settings.webhook_batch_size:
+                await flush(items)
     
-    log_webhook.info(
-        "Вебхук обработан",
-        event_id=event.id,
-        booking_id=booking.id,
-        event_type=parsed["event_type"],
-    )
+    if items:
+        await flush(items)
     
-    return {
-        "ok": True,
-        "booking_id": booking.id,
-        "payout_created": parsed["event_type"] == "paid" and ref_code is not None,
-    }
\ No newline at end of file
+    if queue_only and any(result.get("queued") for result in results):
+        get_webhook_inbox().notify()
+    
+    return {"ok": True, "count": len(results), "results": results}
+
+
+# ============= PROVIDERS =============
+# Объявлены последними: конкретные адреса выше имеют приоритет
+
+@router.post("/{provider}")
+async def webhook_provider(
+    provider: str,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    x_webhook_secret: Optional[str] = Header(None),
+):
+    """Вебхук провайдера из реестра"""
+    return await handle_webhook(provider, request, session, x_webhook_secret)
+
+
+@router.post("/{provider}/batch")
+async def webhook_provider_batch(
+    provider: str,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    x_webhook_secret: Optional[str] = Header(None),
+):
+    """Пакетный вебхук провайдера из реестра"""
+    return await handle_webhook_batch(provider, request, session, x_webhook_secret)
@@ -0,0 +1,15 @@
+"""
+Типизированные callback data для inline-кнопок.
+
+Telegram ограничивает callback_data 64 байтами, поэтому поля короткие, а
+данные (список результатов) живут в FSM, в кнопке — только курсор.
+"""
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class ResultPage(CallbackData, prefix="res"):
+    """Переход по карусели результатов: res:<search>:<index>"""
+
+    search: int  # номер подборки в FSM — кнопки старой подборки не срабатывают
+    index: int
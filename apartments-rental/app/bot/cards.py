@@ -0,0 +1,98 @@
+"""
+Кеш готовых карточек квартир.
+
+Текст карточки, ссылка бронирования с UTM и кнопки зависят только от
+квартиры и источника (source/medium), поэтому рендерятся один раз: кеш
+прогревается при каждой загрузке каталога, а показ карточки — это поиск в
+словаре. Навигация (➡️/⬅️) зависит от позиции в выдаче и добавляется
+отдельной строкой при показе.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.bot import utils
+from app.services.catalog import ApartmentView, CatalogSnapshot, catalog
+
+CardKey = Tuple[int, Optional[datetime], str, str]
+
+DEFAULT_SOURCE = ("tg_bot", "bot")
+INLINE_SOURCE = ("tg_inline", "inline")
+
+# Источники, карточки которых рендерятся при загрузке каталога
+WARM_SOURCES = (DEFAULT_SOURCE, INLINE_SOURCE)
+
+
+@dataclass(frozen=True)
+class RenderedCard:
+    text: str
+    rows: Tuple[Tuple[InlineKeyboardButton, ...], ...]
+
+    def markup(self, extra_rows: Sequence[Sequence[InlineKeyboardButton]] = ()) -> InlineKeyboardMarkup:
+        """Клавиатура карточки плюс строки, зависящие от контекста показа"""
+        rows = [list(row) for row in self.rows]
+        rows.extend(list(row) for row in extra_rows if row)
+        return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def render_card(apt: ApartmentView, source: str = "tg_bot", medium: str = "bot") -> RenderedCard:
+    booking_url = utils.build_booking_url(apt.id, source=source, medium=medium)
+    text = utils.format_apartment_card(apt, booking_url)
+
+    first_row = [InlineKeyboardButton(text="💰 Проверить цену", url=booking_url)]
+    if apt.map_url:
+        first_row.append(InlineKeyboardButton(text="📍 На карте", url=apt.map_url))
+
+    second_row = [InlineKeyboardButton(text="💬 Вопрос", callback_data=f"ask_apt_{apt.id}")]
+    if apt.media:
+        second_row.append(InlineKeyboardButton(text="🖼 Фото", callback_data=f"apt_media_{apt.id}"))
+
+    return RenderedCard(text=text, rows=(tuple(first_row), tuple(second_row)))
+
+
+class CardCache:
+    """
+    Карточки по ключу (id, updated_at, source, medium).
+
+    Вместе с карточкой хранится ApartmentView, из которого она собрана: при
+    загрузке каталога перерисовываются только карточки, чьи данные
+    изменились (например, добавили медиа без изменения updated_at), и
+    удаляются карточки снятых квартир.
+    """
+
+    def __init__(self):
+        self._cards: Dict[CardKey, Tuple[ApartmentView, RenderedCard]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    @staticmethod
+    def key(apt: ApartmentView, source: str, medium: str) -> CardKey:
+        return (apt.id, apt.updated_at, source, medium)
+
+    def get(self, apt: ApartmentView, source: str = "tg_bot", medium: str = "bot") -> RenderedCard:
+        key = self.key(apt, source, medium)
+        entry = self._cards.get(key)
+        if entry is None:
+            entry = (apt, render_card(apt, source, medium))
+            self._cards[key] = entry
+        return entry[1]
+
+    def warm(self, snapshot: CatalogSnapshot, sources: Sequence[Tuple[str, str]] = WARM_SOURCES):
+        cards = {}
+        for apt in snapshot.apartments:
+            for source, medium in sources:
+                key = self.key(apt, source, medium)
+                entry = self._cards.get(key)
+                if entry is None or entry[0] != apt:
+                    entry = (apt, render_card(apt, source, medium))
+                cards[key] = entry
+        # Карточки с другими source/medium прогреются при первом показе
+        self._cards = cards
+
+
+card_cache = CardCache()
+catalog.add_listener(card_cache.warm)
@@ -0,0 +1,105 @@
+"""
+Отсев повторных доставок Telegram updates по update_id.
+
+Когда обработчики медленные, Telegram повторяет доставку, и без отсева
+лиды и реферальные события дублируются. update_id достается из сырого
+тела регуляркой (Telegram кладет его первым полем) — до разбора JSON,
+валидации и любых запросов к БД.
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import get_settings
+
+UPDATE_ID_RE = re.compile(rb'"update_id"\s*:\s*(\d+)')
+
+
+def extract_update_id(body: bytes) -> Optional[int]:
+    """update_id из сырого JSON без полного разбора"""
+    match = UPDATE_ID_RE.search(body)
+    return int(match.group(1)) if match else None
+
+
+class MemoryUpdateDeduplicator:
+    """
+    Окно недавно виденных update_id в памяти процесса.
+
+    OrderedDict в порядке поступления: устаревшие записи срезаются с головы,
+    размер ограничен max_size — проверка и вставка за O(1) (амортизированно).
+    """
+
+    def __init__(self, window: float = 600, max_size: int = 100_000):
+        self.window = window
+        self.max_size = max_size
+        self.dropped = 0
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+
+    def _prune(self, now: float):
+        while self._seen:
+            update_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window and len(self._seen) < self.max_size:
+                break
+            self._seen.popitem(last=False)
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """Проверить и запомнить update_id. True — это повторная доставка"""
+        now = time.monotonic()
+        self._prune(now)
+        if update_id in self._seen:
+            self.dropped += 1
+            return True
+        self._seen[update_id] = now
+        return False
+
+    async def forget(self, update_id: int):
+        """Забыть update_id (например, если он не принят и будет доставлен снова)"""
+        self._seen.pop(update_id, None)
+
+    def metrics(self) -> dict:
+        return {"backend": "memory", "tracked": len(self._seen), "dropped": self.dropped}
+
+
+class RedisUpdateDeduplicator:
+    """Общее для всех воркеров окно: SET key NX EX window"""
+
+    def __init__(self, redis, window: float = 600, prefix: str = "tg:update:"):
+        self.redis = redis
+        self.window = int(window)
+        self.prefix = prefix
+        self.dropped = 0
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        created = await self.redis.set(f"{self.prefix}{update_id}", 1, nx=True, ex=self.window)
+        if not created:
+            self.dropped += 1
+            return True
+        return False
+
+    async def forget(self, update_id: int):
+        await self.redis.delete(f"{self.prefix}{update_id}")
+
+    def metrics(self) -> dict:
+        return {"backend": "redis", "dropped": self.dropped}
+
+
+_deduplicator = None
+
+
+def get_deduplicator():
+    """Дедупликатор по настройке TG_DEDUP_BACKEND: memory | redis | off"""
+    global _deduplicator
+    if _deduplicator is None:
+        settings = get_settings()
+        if settings.tg_dedup_backend == "redis":
+            from redis.asyncio import Redis
+            _deduplicator = RedisUpdateDeduplicator(
+                Redis.from_url(settings.redis_url), window=settings.tg_dedup_window,
+            )
+        elif settings.tg_dedup_backend == "memory":
+            _deduplicator = MemoryUpdateDeduplicator(
+                window=settings.tg_dedup_window, max_size=settings.tg_dedup_max_size,
+            )
+    return _deduplicator
@@ -4,12 +4,16 @@
 
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
-from typing import List
+from functools import lru_cache
+from typing import Sequence, Tuple
+
 from app.bot import texts
 
 
-def main_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Главное меню пользователя"""
+# Статические клавиатуры собираются один раз при импорте. Типы aiogram
+# неизменяемые (frozen), так что один объект безопасно отдавать во все ответы.
+
+def _build_main_menu() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
     kb.button(text="🏠 Подобрать квартиру")
     kb.button(text="📚 Каталог")
@@ -22,8 +26,7 @@ def main_menu_keyboard() -> ReplyKeyboardMarkup:
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=False)
 
 
-def admin_main_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Меню администратора"""
+def _build_admin_main_menu() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
     kb.button(text="🏠 Квартиры")
     kb.button(text="📢 Публикация")
@@ -36,29 +39,31 @@ def admin_main_menu_keyboard() -> ReplyKeyboardMarkup:
     return kb.as_markup(resize_keyboard=True)
 
 
-def back_menu_cancel_keyboard() -> ReplyKeyboardMarkup:
-    """Всегда доступные кнопки"""
+BACK_MENU_CANCEL_BUTTONS = (
+    KeyboardButton(text=texts.Buttons.back),
+    KeyboardButton(text=texts.Buttons.menu),
+    KeyboardButton(text=texts.Buttons.cancel),
+)
+
+
+def _build_back_menu_cancel() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
-    kb.button(text=texts.Buttons.back)
-    kb.button(text=texts.Buttons.menu)
-    kb.button(text=texts.Buttons.cancel)
+    kb.add(*BACK_MENU_CANCEL_BUTTONS)
     kb.adjust(3)
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=False)
 
 
-def wizard_dates_keyboard() -> ReplyKeyboardMarkup:
-    """Выбор дат"""
+def _build_wizard_dates() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
     kb.button(text=texts.Buttons.today)
     kb.button(text=texts.Buttons.tomorrow)
     kb.button(text=texts.Buttons.custom)
-    kb.add(back_menu_cancel_keyboard().keyboard[0][0], back_menu_cancel_keyboard().keyboard[0][1], back_menu_cancel_keyboard().keyboard[0][2])
+    kb.add(*BACK_MENU_CANCEL_BUTTONS)
     kb.adjust(3, 3)
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
-def wizard_guests_keyboard() -> ReplyKeyboardMarkup:
-    """Выбор количества гостей"""
+def _build_wizard_guests() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
     kb.button(text=texts.Buttons.guests_1)
     kb.button(text=texts.Buttons.guests_2)
@@ -70,8 +75,94 @@ def wizard_guests_keyboard() -> ReplyKeyboardMarkup:
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
-def wizard_district_keyboard(districts: List[str]) -> ReplyKeyboardMarkup:
+def _build_wizard_budget() -> ReplyKeyboardMarkup:
+    kb = ReplyKeyboardBuilder()
+    kb.button(text=texts.Buttons.budget_2500)
+    kb.button(text=texts.Buttons.budget_3500)
+    kb.button(text=texts.Buttons.budget_4500)
+    kb.button(text=texts.Buttons.budget_any)
+    kb.adjust(2, 2)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
+
+
+def _build_reply(*buttons: str, adjust: Sequence[int]) -> ReplyKeyboardMarkup:
+    kb = ReplyKeyboardBuilder()
+    for text in buttons:
+        kb.button(text=text)
+    kb.adjust(*adjust)
+    return kb.as_markup()
+
+
+MAIN_MENU = _build_main_menu()
+ADMIN_MAIN_MENU = _build_admin_main_menu()
+BACK_MENU_CANCEL = _build_back_menu_cancel()
+WIZARD_DATES = _build_wizard_dates()
+WIZARD_GUESTS = _build_wizard_guests()
+WIZARD_BUDGET = _build_wizard_budget()
+
+FAQ_MENU = _build_reply(
+    "🔑 Заезд/выезд", "💳 Залог и платежи", "❌ Отмена", "🐕 Животные",
+    "🚭 Курение", "📞 Правила", "🏠 В меню",
+    adjust=(2, 2, 2, 1),
+)
+CONTACT_MENU = _build_reply("📞 Менеджер", "📝 Оставить заявку", "🏠 В меню", adjust=(2, 1))
+CONTACT_FORM_TOPIC = _build_reply(
+    "🏠 Подобрать квартиру", "❓ Вопрос", "💬 Отзыв", "🏠 В меню",
+    adjust=(2, 2),
+)
+CONTACT_FORM_MESSAGE = _build_reply("Пропустить", "🏠 В меню", adjust=(1, 1))
+CONTACT_FORM_CONTACT = (
+    ReplyKeyboardBuilder()
+    .button(text="📱 Поделиться контактом", request_contact=True)
+    .button(text="🏠 В меню")
+    .adjust(1, 1)
+    .as_markup()
+)
+REFERRAL_MENU = _build_reply(
+    "📋 Моя ссылка", "📊 Статистика", "💰 Мои выплаты", "🏠 В меню",
+    adjust=(2, 2),
+)
+
+
+def main_menu_keyboard() -> ReplyKeyboardMarkup:
+    """Главное меню пользователя"""
+    return MAIN_MENU
+
+
+def admin_main_menu_keyboard() -> ReplyKeyboardMarkup:
+    """Меню администратора"""
+    return ADMIN_MAIN_MENU
+
+
+def back_menu_cancel_keyboard() -> ReplyKeyboardMarkup:
+    """Всегда доступные кнопки"""
+    return BACK_MENU_CANCEL
+
+
+def wizard_dates_keyboard() -> ReplyKeyboardMarkup:
+    """Выбор дат"""
+    return WIZARD_DATES
+
+
+def wizard_guests_keyboard() -> ReplyKeyboardMarkup:
+    """Выбор количества гостей"""
+    return WIZARD_GUESTS
+
+
+def wizard_budget_keyboard() -> ReplyKeyboardMarkup:
+    """Выбор бюджета"""
+    return WIZARD_BUDGET
+
+
+# Динамические клавиатуры зависят только от набора строк — кешируем по кортежу
+
+def wizard_district_keyboard(districts: Sequence[str]) -> ReplyKeyboardMarkup:
     """Выбор района"""
+    return _wizard_district_keyboard(tuple(districts))
+
+
+@lru_cache(maxsize=64)
+def _wizard_district_keyboard(districts: Tuple[str, ...]) -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
     for district in districts:
         kb.button(text=f"📍 {district}")
@@ -80,15 +171,19 @@ def wizard_district_keyboard(districts: List[str]) -> ReplyKeyboardMarkup:
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
-def wizard_budget_keyboard() -> ReplyKeyboardMarkup:
-    """Выбор бюджета"""
+def catalog_tags_keyboard(tags: Sequence[str]) -> ReplyKeyboardMarkup:
+    """Каталог по категориям (тегам)"""
+    return _catalog_tags_keyboard(tuple(tags))
+
+
+@lru_cache(maxsize=64)
+def _catalog_tags_keyboard(tags: Tuple[str, ...]) -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardBuilder()
-    kb.button(text=texts.Buttons.budget_2500)
-    kb.button(text=texts.Buttons.budget_3500)
-    kb.button(text=texts.Buttons.budget_4500)
-    kb.button(text=texts.Buttons.budget_any)
-    kb.adjust(2, 2)
-    return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
+    for tag in tags:
+        kb.button(text=f"📍 {tag}")
+    kb.button(text="🏠 В меню")
+    kb.adjust(2)
+    return kb.as_markup()
 
 
 def apartment_card_inline_keyboard(apartment_id: int, booking_url: str, map_url: str = None) -> InlineKeyboardMarkup:
@@ -4,26 +4,64 @@
 """
 
 from aiogram import Dispatcher, Bot
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from app.config import get_settings
+from app import fastjson
+from app.config import get_settings, Settings
 
 settings = get_settings()
 
 # Создаём бота
 bot = Bot(token=settings.bot_token)
 
-# FSM Storage (в памяти для MVP; для production → Redis)
-storage = MemoryStorage()
+
+def build_storage(cfg: Settings, redis=None) -> BaseStorage:
+    """
+    FSM Storage по настройке FSM_STORAGE.
+
+    - memory: в памяти процесса (локально, один воркер)
+    - redis: общий для всех воркеров, записи живут FSM_STATE_TTL секунд.
+      Можно передать готовый клиент (любой с redis-протоколом), иначе
+      подключаемся по REDIS_URL.
+    """
+    if cfg.fsm_storage == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        options = dict(
+            state_ttl=cfg.fsm_state_ttl,
+            data_ttl=cfg.fsm_state_ttl,
+            # Компактный JSON: в состоянии только id и курсор
+            json_dumps=fastjson.dumps,
+            json_loads=fastjson.loads,
+        )
+        if redis is not None:
+            return RedisStorage(redis=redis, **options)
+        return RedisStorage.from_url(cfg.redis_url, **options)
+
+    return MemoryStorage()
+
+
+# FSM Storage
+storage = build_storage(settings)
 
 # Диспетчер
 dp = Dispatcher(storage=storage)
 
 
+def register_middlewares():
+    """Одна сессия БД на update (app/bot/middlewares.py)"""
+    from app.bot.middlewares import DbSessionMiddleware
+    dp.update.middleware(DbSessionMiddleware())
+
+
 def register_routers():
     """Регистрируем роутеры (вызывается отдельно, чтобы избежать циклического импорта)"""
     from app.bot.router_user import router as user_router
     from app.bot.router_admin import router as admin_router
+    from app.bot.router_inline import router as inline_router
     
+    register_middlewares()
     dp.include_router(admin_router)  # Админ первым, чтобы имел приоритет
-    dp.include_router(user_router)
\ No newline at end of file
+    dp.include_router(user_router)
+    dp.include_router(inline_router)
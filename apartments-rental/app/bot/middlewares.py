@@ -0,0 +1,67 @@
+"""
+Middleware бота.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.crud import get_or_create_user
+from app.db.models import User
+
+
+class CurrentUser:
+    """Ленивая ссылка на User текущего update: резолвится один раз за update"""
+
+    def __init__(self, session: AsyncSession, tg_user: Optional[TelegramUser]):
+        self.session = session
+        self.tg_user = tg_user
+        self._user: Optional[User] = None
+
+    async def get(self) -> User:
+        """
+        User текущего update. Транзакцию чтения, которую открыл сам поиск,
+        закрываем сразу: иначе соединение оставалось бы "idle in transaction"
+        на все время хендлера, включая медленные вызовы Telegram API.
+        Уже идущую транзакцию хендлера не трогаем.
+        """
+        if self._user is None:
+            owned = not self.session.in_transaction()
+            self._user = await get_or_create_user(
+                self.session,
+                telegram_id=self.tg_user.id,
+                username=self.tg_user.username,
+            )
+            if owned and self.session.in_transaction():
+                await self.session.commit()
+        return self._user
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна AsyncSession на update.
+
+    Сессия передается в хендлеры как `session`, текущий пользователь — как
+    `current_user`. Соединение из пула берется только при первом запросе,
+    так что апдейты без обращений к БД соединение не занимают, а после
+    поиска пользователя возвращается в пул (см. CurrentUser.get).
+    """
+
+    def __init__(self, sessionmaker=None):
+        if sessionmaker is None:
+            from app.db.session import SessionLocal
+            sessionmaker = SessionLocal
+        self.sessionmaker = sessionmaker
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.sessionmaker() as session:
+            data["session"] = session
+            data["current_user"] = CurrentUser(session, data.get("event_from_user"))
+            return await handler(event, data)
@@ -14,9 +14,9 @@ from datetime import datetime, timedelta
 from app.bot.states import AdminStates
 from app.bot import texts, keyboards
 from app.config import get_settings
-from app.db.crud import list_apartments, get_apartment
+from app.db.crud import get_apartment
 from app.db.models import Lead, Booking, BookingStatus, User, Apartment
-from app.db.session import SessionLocal
+from app.services.catalog import get_catalog
 from app.logger import log_bot
 
 router = Router()
@@ -34,7 +34,7 @@ async def admin_panel(message: Message, state: FSMContext):
     if not is_admin(message.from_user.id):
         await message.answer("❌ Доступ запрещен")
         return
-    
+
     await message.answer(
         texts.Admin.main_menu,
         reply_markup=keyboards.admin_main_menu_keyboard(),
@@ -45,18 +45,18 @@ async def admin_panel(message: Message, state: FSMContext):
 @router.message(AdminStates.main_menu, F.text == "🏠 Квартиры")
 async def admin_apartments_menu(message: Message, state: FSMContext):
     """Меню управления квартирами"""
-    async with SessionLocal() as session:
-        apartments = await list_apartments(session)
-    
+    catalog = await get_catalog()
+    apartments = catalog.apartments
+
     from aiogram.utils.keyboard import ReplyKeyboardBuilder
     kb = ReplyKeyboardBuilder()
-    
+
     for apt in apartments:
         kb.button(text=f"🏠 {apt.title}")
     kb.button(text="➕ Добавить")
     kb.button(text="🏠 В меню")
     kb.adjust(1)
-    
+
     await message.answer(
         texts.Admin.apartments_menu + f"\n\nВсего: {len(apartments)}",
         reply_markup=kb.as_markup(),
@@ -65,29 +65,28 @@ async def admin_apartments_menu(message: Message, state: FSMContext):
 
 
 @router.message(AdminStates.apartment_list)
-async def admin_apartment_select(message: Message, state: FSMContext):
+async def admin_apartment_select(message: Message, state: FSMContext, session: AsyncSession):
     """Выбор квартиры для редактирования"""
     if message.text == "🏠 В меню":
         await admin_panel(message, state)
         return
-    
+
     if message.text == "➕ Добавить":
         await message.answer("📝 **Добавление новой квартиры** (скоро в админ-панели)")
         return
-    
+
     # Найти квартиру по названию
     apt_title = message.text.replace("🏠 ", "")
-    
-    async with SessionLocal() as session:
-        apt = await session.execute(
-            select(Apartment).where(Apartment.title == apt_title)
-        )
-        apt = apt.scalar_one_or_none()
-    
+
+    apt = await session.execute(
+        select(Apartment).where(Apartment.title == apt_title)
+    )
+    apt = apt.scalar_one_or_none()
+
     if not apt:
         await message.answer("❌ Квартира не найдена")
         return
-    
+
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
     kb.button(text="✏️ Редактировать", callback_data=f"edit_apt_{apt.id}")
@@ -95,7 +94,7 @@ async def admin_apartment_select(message: Message, state: FSMContext):
     kb.button(text="📤 Опубликовать", callback_data=f"publish_apt_{apt.id}")
     kb.button(text="🔄 Обновить", callback_data=f"update_apt_{apt.id}")
     kb.adjust(2, 2)
-    
+
     await message.answer(
         f"🏠 **{apt.title}**\n\n"
         f"📍 {apt.district}\n"
@@ -113,11 +112,12 @@ async def admin_publishing_menu(message: Message, state: FSMContext):
     kb = ReplyKeyboardBuilder()
     kb.button(text="📌 Обновить меню")
     kb.button(text="🏠 Опубликовать все")
+    kb.button(text="🔄 Синхронизировать квартиры")
     kb.button(text="📚 Обновить каталог")
     kb.button(text="📚 Опубликовать FAQ")
     kb.button(text="🏠 В меню")
     kb.adjust(1)
-    
+
     await message.answer(
         texts.Admin.publishing_menu,
         reply_markup=kb.as_markup(),
@@ -131,28 +131,66 @@ async def publish_menu_handler(message: Message):
     try:
         # Импортируем здесь, чтобы избежать циклического импорта
         from app.services.publishing import publish_channel_menu
-        
+
         await publish_channel_menu()
         await message.answer(texts.Admin.publish_menu_done)
-        log_bot.info("Меню опубликовано", admin_id=message.from_user.id)
+        log_bot.info(f"Меню опубликовано: admin_id={message.from_user.id}")
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
-        log_bot.error("Ошибка публикации меню", error=str(e))
+        log_bot.error(f"Ошибка публикации меню: {e}")
 
 
 @router.message(AdminStates.publishing_menu, F.text == "🏠 Опубликовать все")
-async def publish_apartments_handler(message: Message):
-    """Публикация всех квартир"""
+async def publish_apartments_handler(message: Message, state: FSMContext):
+    """Публикация всех квартир (прерванный прогон продолжается повторным нажатием)"""
     try:
         # Импортируем здесь, чтобы избежать циклического импорта
         from app.services.publishing import publish_all_apartments
-        
-        count = await publish_all_apartments()
-        await message.answer(texts.Admin.publish_apartments_done.format(count=count))
-        log_bot.info("Квартиры опубликованы", count=count, admin_id=message.from_user.id)
+
+        data = await state.get_data()
+        resume_since = data.get("publish_resume_since")
+        result = await publish_all_apartments(
+            resume_since=datetime.fromisoformat(resume_since) if resume_since else None,
+        )
+
+        if result.complete:
+            await state.update_data(publish_resume_since=None)
+            await message.answer(texts.Admin.publish_apartments_done.format(count=result.done))
+        else:
+            await state.update_data(
+                publish_resume_since=resume_since or result.started_at.isoformat(),
+            )
+            await message.answer(texts.Admin.publish_apartments_partial.format(
+                done=result.done, failed=len(result.failed),
+            ))
+        log_bot.info(
+            f"Квартиры опубликованы: {result.done}/{result.total}, "
+            f"admin_id={message.from_user.id}"
+        )
+    except Exception as e:
+        await message.answer(f"❌ Ошибка: {str(e)}")
+        log_bot.error(f"Ошибка публикации квартир: {e}")
+
+
+@router.message(AdminStates.publishing_menu, F.text == "🔄 Синхронизировать квартиры")
+async def sync_apartments_handler(message: Message):
+    """Инкрементальная синхронизация постов квартир"""
+    try:
+        # Импортируем здесь, чтобы избежать циклического импорта
+        from app.services.publishing import sync_apartments
+
+        result = await sync_apartments()
+        await message.answer(texts.Admin.sync_apartments_done.format(
+            created=result.created,
+            edited=result.edited,
+            deleted=result.deleted,
+            unchanged=result.unchanged,
+            failed=len(result.failed),
+        ))
+        log_bot.info(f"Квартиры синхронизированы: admin_id={message.from_user.id}")
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
-        log_bot.error("Ошибка публикации квартир", error=str(e))
+        log_bot.error(f"Ошибка синхронизации квартир: {e}")
 
 
 @router.message(AdminStates.publishing_menu, F.text == "📚 Обновить каталог")
@@ -161,36 +199,39 @@ async def publish_catalog_handler(message: Message):
     try:
         # Импортируем здесь, чтобы избежать циклического импорта
         from app.services.publishing import publish_catalog
-        
-        await publish_catalog()
-        await message.answer("✅ Каталог обновлен")
-        log_bot.info("Каталог опубликован", admin_id=message.from_user.id)
+
+        result = await publish_catalog()
+        await message.answer(
+            f"✅ Каталог обновлен\n\n"
+            f"Новых страниц: {result.created}, изменено: {result.edited}, "
+            f"удалено: {result.deleted}, без изменений: {result.unchanged}"
+        )
+        log_bot.info(f"Каталог опубликован: admin_id={message.from_user.id}")
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
-        log_bot.error("Ошибка публикации каталога", error=str(e))
+        log_bot.error(f"Ошибка публикации каталога: {e}")
 
 
 @router.message(AdminStates.main_menu, F.text == "📩 Лиды")
-async def admin_leads_menu(message: Message, state: FSMContext):
+async def admin_leads_menu(message: Message, state: FSMContext, session: AsyncSession):
     """Меню управления лидами"""
-    async with SessionLocal() as session:
-        result = await session.execute(
-            select(func.count(Lead.id)).where(Lead.status == "new")
-        )
-        new_count = result.scalar() or 0
-        
-        result = await session.execute(
-            select(Lead).where(Lead.status == "new").limit(5)
-        )
-        leads = result.scalars().all()
-    
+    result = await session.execute(
+        select(func.count(Lead.id)).where(Lead.status == "new")
+    )
+    new_count = result.scalar() or 0
+
+    result = await session.execute(
+        select(Lead).where(Lead.status == "new").limit(5)
+    )
+    leads = result.scalars().all()
+
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
-    
+
     for lead in leads:
         kb.button(text=f"📋 {lead.contact}", callback_data=f"lead_{lead.id}")
     kb.adjust(1)
-    
+
     await message.answer(
         texts.Admin.leads_menu.format(new_count=new_count),
         reply_markup=kb.as_markup(),
@@ -198,22 +239,21 @@ async def admin_leads_menu(message: Message, state: FSMContext):
 
 
 @router.message(AdminStates.main_menu, F.text == "📅 Брони")
-async def admin_bookings_menu(message: Message, state: FSMContext):
+async def admin_bookings_menu(message: Message, state: FSMContext, session: AsyncSession):
     """Меню управления бронями"""
-    async with SessionLocal() as session:
-        result = await session.execute(
-            select(func.count(Booking.id))
-        )
-        total = result.scalar() or 0
-        
-        result = await session.execute(
-            select(Booking).order_by(Booking.created_at.desc()).limit(5)
-        )
-        bookings = result.scalars().all()
-    
+    result = await session.execute(
+        select(func.count(Booking.id))
+    )
+    total = result.scalar() or 0
+
+    result = await session.execute(
+        select(Booking).order_by(Booking.created_at.desc()).limit(5)
+    )
+    bookings = result.scalars().all()
+
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
-    
+
     for booking in bookings:
         status_emoji = {
             "created": "📝",
@@ -221,13 +261,13 @@ async def admin_bookings_menu(message: Message, state: FSMContext):
             "paid": "💰",
             "canceled": "❌",
         }.get(booking.status, "❓")
-        
+
         kb.button(
             text=f"{status_emoji} {booking.external_id}",
             callback_data=f"booking_{booking.id}"
         )
     kb.adjust(1)
-    
+
     await message.answer(
         f"📅 **Брони**\n\nВсего: {total}\n\nПоследние:",
         reply_markup=kb.as_markup(),
@@ -243,7 +283,7 @@ async def admin_referrals_menu(message: Message, state: FSMContext):
     kb.button(text="💰 Выплаты")
     kb.button(text="🏠 В меню")
     kb.adjust(1)
-    
+
     await message.answer(
         "🎁 **Реферальная программа**",
         reply_markup=kb.as_markup(),
@@ -251,32 +291,31 @@ async def admin_referrals_menu(message: Message, state: FSMContext):
 
 
 @router.message(AdminStates.main_menu, F.text == "📊 Статистика")
-async def admin_stats_menu(message: Message, state: FSMContext):
+async def admin_stats_menu(message: Message, state: FSMContext, session: AsyncSession):
     """Статистика"""
-    async with SessionLocal() as session:
-        # Последние 30 дней
-        since = datetime.utcnow() - timedelta(days=30)
-        
-        leads_count = await session.execute(
-            select(func.count(Lead.id)).where(Lead.created_at >= since)
-        )
-        leads_count = leads_count.scalar() or 0
-        
-        bookings_result = await session.execute(
-            select(func.count(Booking.id)).where(Booking.created_at >= since)
-        )
-        bookings_count = bookings_result.scalar() or 0
-        
-        paid_result = await session.execute(
-            select(func.sum(Booking.total_amount)).where(
-                Booking.status == "paid",
-                Booking.created_at >= since,
-            )
+    # Последние 30 дней
+    since = datetime.utcnow() - timedelta(days=30)
+
+    leads_count = await session.execute(
+        select(func.count(Lead.id)).where(Lead.created_at >= since)
+    )
+    leads_count = leads_count.scalar() or 0
+
+    bookings_result = await session.execute(
+        select(func.count(Booking.id)).where(Booking.created_at >= since)
+    )
+    bookings_count = bookings_result.scalar() or 0
+
+    paid_result = await session.execute(
+        select(func.sum(Booking.total_amount)).where(
+            Booking.status == "paid",
+            Booking.created_at >= since,
         )
-        paid_amount = paid_result.scalar() or 0
-    
+    )
+    paid_amount = paid_result.scalar() or 0
+
     conversion = (bookings_count / leads_count * 100) if leads_count > 0 else 0
-    
+
     await message.answer(
         texts.Admin.stats_menu.format(
             period=30,
@@ -0,0 +1,99 @@
+"""
+Inline-режим: поиск квартир прямо из поля ввода (@bot центр 4 гостя).
+
+Ответ собирается из снапшота каталога в памяти (индекс префиксов слов),
+без запросов к БД. Telegram кеширует ответ на cache_time секунд, следующая
+страница запрашивается через next_offset.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from aiogram import Router
+from aiogram.types import (
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+
+from app.bot.cards import INLINE_SOURCE, card_cache
+from app.config import get_settings
+from app.services.catalog import ApartmentView, get_catalog, tokenize
+
+settings = get_settings()
+
+router = Router()
+
+# Telegram принимает до 50 результатов на ответ
+INLINE_PAGE_SIZE = 20
+
+GUESTS_WORDS = ("гост", "чел", "взр")
+STOP_WORDS = {"в", "на", "для", "и", "с", "до", "от", "квартира", "квартиры", "квартиру"}
+
+
+def parse_inline_query(query: str) -> Tuple[Tuple[str, ...], Optional[int]]:
+    """
+    Разобрать запрос на слова для поиска и число гостей.
+    Число считается гостями («4», «4 гостя», «на 3 человек»).
+    """
+    words = []
+    guests = None
+    for token in tokenize(query):
+        if token.isdigit():
+            guests = int(token)
+        elif token.startswith(GUESTS_WORDS) or token in STOP_WORDS:
+            continue
+        else:
+            # «4гостя» без пробела
+            match = re.fullmatch(r"(\d+)(\w+)", token)
+            if match and match.group(2).startswith(GUESTS_WORDS):
+                guests = int(match.group(1))
+            else:
+                words.append(token)
+    return tuple(words), guests
+
+
+def inline_result(apt: ApartmentView) -> InlineQueryResultArticle:
+    card = card_cache.get(apt, *INLINE_SOURCE)
+
+    description = [apt.district or "Район не указан", f"до {apt.guests_max} гостей"]
+    if apt.price_per_night:
+        description.append(f"от {apt.price_per_night}₽")
+
+    thumbnail = next((m.url for m in apt.media if m.type == "photo"), None)
+
+    # В сообщениях из inline-режима только кнопки-ссылки: callback-кнопкам
+    # нужен чат бота, а сообщение уходит в чужой чат
+    url_rows = [[button for button in row if button.url] for row in card.rows]
+
+    return InlineQueryResultArticle(
+        id=str(apt.id),
+        title=apt.title,
+        description=" · ".join(description),
+        thumbnail_url=thumbnail,
+        input_message_content=InputTextMessageContent(
+            message_text=card.text,
+            parse_mode="Markdown",
+        ),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[row for row in url_rows if row]),
+    )
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    """Поиск квартир в inline-режиме"""
+    words, guests = parse_inline_query(inline_query.query)
+    catalog = await get_catalog()
+    found = catalog.search(words, guests)
+
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page = found[offset:offset + INLINE_PAGE_SIZE]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(found) else ""
+
+    await inline_query.answer(
+        [inline_result(apt) for apt in page],
+        cache_time=settings.inline_cache_time,
+        is_personal=False,
+        next_offset=next_offset,
+    )
@@ -4,18 +4,25 @@
 """
 
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
 
 from app.bot.states import UserStates
 from app.bot import texts, keyboards, utils
+from app.bot.callbacks import ResultPage
+from app.bot.cards import card_cache
+from app.bot.middlewares import CurrentUser
 from app.db.crud import (
-    get_or_create_user, list_apartments, get_apartment,
+    get_apartment, search_apartments,
     create_lead, get_or_create_referral_code, get_referral_code, log_referral_event,
 )
-from app.db.session import SessionLocal
+from app.services.catalog import get_catalog
+from app.services.media import send_apartment_media
 from app.logger import log_bot
 
 router = Router()
@@ -24,14 +31,14 @@ router = Router()
 # ============= START & MAIN MENU =============
 
 @router.message(Command("start"))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    current_user: CurrentUser,
+):
     """Обработка /start с опциональными параметрами"""
-    async with SessionLocal() as session:
-        user = await get_or_create_user(
-            session,
-            telegram_id=message.from_user.id,
-            username=message.from_user.username,
-        )
+    user = await current_user.get()
     
     # Парсим параметр start
     args = message.text.split()
@@ -40,19 +47,18 @@ async def cmd_start(message: Message, state: FSMContext):
         param = args[1]
         if param.startswith("r_"):
             referral_code = param[2:]
-            async with SessionLocal() as session:
-                ref = await get_referral_code(session, referral_code)
-                if ref:
-                    # Логируем старт по рефссылке
-                    await log_referral_event(
-                        session, ref.id, "start", user_id=user.id
-                    )
-                    await message.answer(
-                        texts.Welcome.intro + "\n\n" + texts.Welcome.with_referral,
-                        reply_markup=keyboards.main_menu_keyboard(),
-                    )
-                    await state.set_state(UserStates.main_menu)
-                    return
+            ref = await get_referral_code(session, referral_code)
+            if ref:
+                # Логируем старт по рефссылке
+                await log_referral_event(
+                    session, ref.id, "start", user_id=user.id
+                )
+                await message.answer(
+                    texts.Welcome.intro + "\n\n" + texts.Welcome.with_referral,
+                    reply_markup=keyboards.main_menu_keyboard(),
+                )
+                await state.set_state(UserStates.main_menu)
+                return
     
     await message.answer(
         texts.Welcome.intro,
@@ -138,14 +144,12 @@ async def wizard_guests(message: Message, state: FSMContext):
     
     await state.update_data(guests=guests)
     
-    # Получить районы
-    async with SessionLocal() as session:
-        apartments = await list_apartments(session)
-        districts = sorted(set(apt.district for apt in apartments if apt.district))
+    # Получить районы (из снапшота каталога, без запроса к БД)
+    catalog = await get_catalog()
     
     await message.answer(
         texts.Wizard.district_help,
-        reply_markup=keyboards.wizard_district_keyboard(districts),
+        reply_markup=keyboards.wizard_district_keyboard(list(catalog.districts)),
     )
     await state.set_state(UserStates.wizard_district)
 
@@ -170,13 +174,13 @@ async def wizard_district(message: Message, state: FSMContext):
 
 
 @router.message(UserStates.wizard_budget)
-async def wizard_budget(message: Message, state: FSMContext):
+async def wizard_budget(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка выбора бюджета"""
     budget_map = {
         texts.Buttons.budget_2500: (0, 2500),
         texts.Buttons.budget_3500: (0, 3500),
         texts.Buttons.budget_4500: (0, 4500),
-        texts.Buttons.budget_any: (0, 999999),
+        texts.Buttons.budget_any: (0, None),
     }
     
     if message.text == texts.Buttons.back:
@@ -194,22 +198,26 @@ async def wizard_budget(message: Message, state: FSMContext):
         await message.answer(texts.Errors.invalid_input)
         return
     
-    await state.update_data(budget_min=budget[0], budget_max=budget[1])
+    # update_data возвращает итоговые данные — лишний get_data не нужен
+    data = await state.update_data(budget_min=budget[0], budget_max=budget[1])
     
     # Показываем результаты
-    data = await state.get_data()
     
-    async with SessionLocal() as session:
-        apartments = await list_apartments(session)
-        
-        # Фильтруем по критериям
-        filtered = [
-            apt for apt in apartments
-            if (data.get("district") is None or apt.district == data.get("district"))
-            and apt.guests_max >= data.get("guests", 1)
-        ]
-    
-    if not filtered:
+    # Фильтрация в SQL: получаем только id подходящих квартир в порядке выдачи
+    dates = (data["check_in"], data["check_out"]) if data.get("check_in") else None
+    ids = await search_apartments(
+        session,
+        district=data.get("district"),
+        guests=data.get("guests"),
+        budget=data.get("budget_max"),
+        dates=dates,
+    )
+    
+    # Карточки берем из снапшота каталога
+    catalog = await get_catalog()
+    ids = [apartment_id for apartment_id in ids if catalog.get(apartment_id)]
+    
+    if not ids:
         await message.answer(
             texts.Wizard.no_results + "\n\n" + texts.Wizard.contact_us,
             reply_markup=keyboards.back_menu_cancel_keyboard(),
@@ -218,16 +226,44 @@ async def wizard_budget(message: Message, state: FSMContext):
         return
     
     # Показываем результаты по одному
-    await state.update_data(results=filtered, result_index=0)
-    await show_result(message, state, filtered)
+    search_id = data.get("search_id", 0) + 1
+    await state.update_data(results=ids, result_index=0, search_id=search_id)
+    await show_result(message, state, ids)
+
+
+def result_view(catalog, results: list, index: int, search_id: int):
+    """Текст и клавиатура карточки results[index] или None, если ее нет в каталоге"""
+    apt = catalog.get(results[index]) if 0 <= index < len(results) else None
+    if apt is None:
+        return None
+    
+    # Готовая карточка из кеша, к ней — навигация по результатам
+    card = card_cache.get(apt)
+    
+    navigation = []
+    if index > 0:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=ResultPage(search=search_id, index=index - 1).pack(),
+        ))
+    if index < len(results) - 1:
+        navigation.append(InlineKeyboardButton(
+            text=f"➡️ Дальше ({index + 2}/{len(results)})",
+            callback_data=ResultPage(search=search_id, index=index + 1).pack(),
+        ))
+    
+    return card.text, card.markup([navigation])
 
 
 async def show_result(message: Message, state: FSMContext, results: list):
-    """Показать одну карточку квартиры"""
+    """Показать первую карточку подборки (results — список id из search_apartments)"""
     data = await state.get_data()
     index = data.get("result_index", 0)
     
-    if index >= len(results):
+    catalog = await get_catalog()
+    view = result_view(catalog, results, index, data.get("search_id", 0))
+    
+    if view is None:
         await message.answer(
             "✅ Это все варианты!",
             reply_markup=keyboards.main_menu_keyboard(),
@@ -235,26 +271,53 @@ async def show_result(message: Message, state: FSMContext, results: list):
         await state.set_state(UserStates.main_menu)
         return
     
-    apt = results[index]
-    booking_url = utils.build_booking_url(apt.id, source="tg_bot", medium="bot")
-    
-    card_text = utils.format_apartment_card(apt, booking_url)
+    text, markup = view
+    await message.answer(text, reply_markup=markup, parse_mode="Markdown")
+
+
+@router.callback_query(ResultPage.filter())
+async def result_page(callback: CallbackQuery, callback_data: ResultPage, state: FSMContext):
+    """
+    Карусель результатов: то же сообщение редактируется на месте.
+    Список id берется из FSM, карточка — из кеша: без запросов к БД.
+    """
+    data = await state.get_data()
+    results = data.get("results") or []
     
-    kb = InlineKeyboardBuilder()
-    kb.button(text="💰 Проверить цену", url=booking_url)
-    if apt.map_url:
-        kb.button(text="📍 На карте", url=apt.map_url)
-    kb.button(text="💬 Вопрос", callback_data=f"ask_apt_{apt.id}")
+    if callback_data.search != data.get("search_id"):
+        await callback.answer("Подборка устарела — начните поиск заново")
+        return
     
-    # Навигация по результатам
-    if index < len(results) - 1:
-        kb.button(text="➡️ Дальше", callback_data=f"next_apt_{index + 1}")
-    if index > 0:
-        kb.button(text="⬅️ Назад", callback_data=f"prev_apt_{index - 1}")
+    catalog = await get_catalog()
+    view = result_view(catalog, results, callback_data.index, callback_data.search)
+    if view is None:
+        await callback.answer("Квартира больше недоступна")
+        return
     
-    kb.adjust(2, 1, 2)
+    text, markup = view
+    try:
+        await callback.message.edit_text(text, reply_markup=markup, parse_mode="Markdown")
+    except TelegramBadRequest as e:
+        # Повторное нажатие той же кнопки
+        if "not modified" not in e.message:
+            raise
+    await state.update_data(result_index=callback_data.index)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("apt_media_"))
+async def apartment_media(callback: CallbackQuery, session: AsyncSession):
+    """Фото квартиры альбомом (по сохраненным file_id)"""
+    apartment_id = int(callback.data.removeprefix("apt_media_"))
+    catalog = await get_catalog()
+    apt = catalog.get(apartment_id)
+    
+    if apt is None or not apt.media:
+        await callback.answer("Фото пока нет")
+        return
     
-    await message.answer(card_text, reply_markup=kb.as_markup(), parse_mode="Markdown")
+    await callback.answer()
+    await send_apartment_media(callback.bot, callback.message.chat.id, apt.media, session=session)
 
 
 # ============= CATALOG & HOT OFFERS =============
@@ -262,26 +325,12 @@ async def show_result(message: Message, state: FSMContext, results: list):
 @router.message(StateFilter(UserStates.main_menu), F.text == "📚 Каталог")
 async def catalog_menu(message: Message, state: FSMContext):
     """Каталог по категориям"""
-    async with SessionLocal() as session:
-        apartments = await list_apartments(session)
-        
-        # Группируем по тегам
-        tags_dict = {}
-        for apt in apartments:
-            for tag in apt.tags:
-                if tag.tag not in tags_dict:
-                    tags_dict[tag.tag] = []
-                tags_dict[tag.tag].append(apt)
-    
-    kb = ReplyKeyboardBuilder()
-    for tag in tags_dict.keys():
-        kb.button(text=f"📍 {tag}")
-    kb.button(text="🏠 В меню")
-    kb.adjust(2)
+    # Квартиры уже сгруппированы по тегам в снапшоте каталога
+    catalog = await get_catalog()
     
     await message.answer(
         "📚 **Каталог по категориям:**",
-        reply_markup=kb.as_markup(),
+        reply_markup=keyboards.catalog_tags_keyboard(catalog.by_tag.keys()),
     )
 
 
@@ -300,19 +349,9 @@ async def hot_offers(message: Message, state: FSMContext):
 @router.message(StateFilter(UserStates.main_menu), F.text == "❓ Правила / FAQ")
 async def faq_menu(message: Message, state: FSMContext):
     """Меню FAQ"""
-    kb = ReplyKeyboardBuilder()
-    kb.button(text="🔑 Заезд/выезд")
-    kb.button(text="💳 Залог и платежи")
-    kb.button(text="❌ Отмена")
-    kb.button(text="🐕 Животные")
-    kb.button(text="🚭 Курение")
-    kb.button(text="📞 Правила")
-    kb.button(text="🏠 В меню")
-    kb.adjust(2, 2, 2, 1)
-    
     await message.answer(
         "❓ **Часто задаваемые вопросы:**",
-        reply_markup=kb.as_markup(),
+        reply_markup=keyboards.FAQ_MENU,
     )
 
 
@@ -361,15 +400,9 @@ async def faq_smoking(message: Message):
 @router.message(StateFilter(UserStates.main_menu), F.text == "💬 Связаться")
 async def contact_menu(message: Message, state: FSMContext):
     """Меню контактов"""
-    kb = ReplyKeyboardBuilder()
-    kb.button(text="📞 Менеджер")
-    kb.button(text="📝 Оставить заявку")
-    kb.button(text="🏠 В меню")
-    kb.adjust(2, 1)
-    
     await message.answer(
         "💬 **Как мы можем помочь?**",
-        reply_markup=kb.as_markup(),
+        reply_markup=keyboards.CONTACT_MENU,
     )
 
 
@@ -391,16 +424,9 @@ async def contact_manager(message: Message):
 @router.message(StateFilter(UserStates.main_menu), F.text == "📝 Оставить заявку")
 async def contact_form_start(message: Message, state: FSMContext):
     """Начало формы обратной связи"""
-    kb = ReplyKeyboardBuilder()
-    kb.button(text="🏠 Подобрать квартиру")
-    kb.button(text="❓ Вопрос")
-    kb.button(text="💬 Отзыв")
-    kb.button(text="🏠 В меню")
-    kb.adjust(2, 2)
-    
     await message.answer(
         "📝 **О чем вы хотите написать?**",
-        reply_markup=kb.as_markup(),
+        reply_markup=keyboards.CONTACT_FORM_TOPIC,
     )
     await state.set_state(UserStates.contact_form_topic)
 
@@ -419,11 +445,7 @@ async def contact_form_topic(message: Message, state: FSMContext):
     
     await message.answer(
         "✍️ **Расскажите подробнее** (или нажмите 'Пропустить')",
-        reply_markup=ReplyKeyboardBuilder()
-        .button(text="Пропустить")
-        .button(text="🏠 В меню")
-        .adjust(1, 1)
-        .as_markup(),
+        reply_markup=keyboards.CONTACT_FORM_MESSAGE,
     )
     await state.set_state(UserStates.contact_form_message)
 
@@ -436,32 +458,31 @@ async def contact_form_message(message: Message, state: FSMContext):
     
     await message.answer(
         "☎️ **Как с вами связаться?** (телефон или Telegram)",
-        reply_markup=ReplyKeyboardBuilder()
-        .button(text="📱 Поделиться контактом", request_contact=True)
-        .button(text="🏠 В меню")
-        .adjust(1, 1)
-        .as_markup(),
+        reply_markup=keyboards.CONTACT_FORM_CONTACT,
     )
     await state.set_state(UserStates.contact_form_contact)
 
 
 @router.message(UserStates.contact_form_contact)
-async def contact_form_finish(message: Message, state: FSMContext):
+async def contact_form_finish(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    current_user: CurrentUser,
+):
     """Завершение формы"""
     data = await state.get_data()
     
     contact = message.contact.phone_number if message.contact else message.text
     
-    async with SessionLocal() as session:
-        user = await get_or_create_user(session, message.from_user.id)
-        
-        lead = await create_lead(
-            session,
-            user_id=user.id,
-            contact=contact,
-            status="new",
-            source_tag="tg_bot_contact_form",
-        )
+    user = await current_user.get()
+    lead = await create_lead(
+        session,
+        user_id=user.id,
+        contact=contact,
+        status="new",
+        source_tag="tg_bot_contact_form",
+    )
     
     await message.answer(
         "✅ **Спасибо! Ваша заявка принята.**\n\n"
@@ -471,43 +492,43 @@ async def contact_form_finish(message: Message, state: FSMContext):
     await state.set_state(UserStates.main_menu)
     
     # Уведомляем менеджера
-    log_bot.info("Новая заявка", lead_id=lead.id, contact=contact)
+    log_bot.info(f"Новая заявка: lead_id={lead.id}, contact={contact}")
 
 
 # ============= REFERRAL PROGRAM =============
 
 @router.message(StateFilter(UserStates.main_menu), F.text == "🎁 Скидка / Рефералка")
-async def referral_menu(message: Message, state: FSMContext):
+async def referral_menu(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    current_user: CurrentUser,
+):
     """Меню реферальной программы"""
-    async with SessionLocal() as session:
-        user = await get_or_create_user(session, message.from_user.id)
-        ref_code = await get_or_create_referral_code(session, user.id)
+    user = await current_user.get()
+    ref_code = await get_or_create_referral_code(session, user.id)
     
     ref_url = f"https://t.me/your_bot?start=r_{ref_code.code}"
     
-    kb = ReplyKeyboardBuilder()
-    kb.button(text="📋 Моя ссылка")
-    kb.button(text="📊 Статистика")
-    kb.button(text="💰 Мои выплаты")
-    kb.button(text="🏠 В меню")
-    kb.adjust(2, 2)
-    
     await message.answer(
         f"🎁 **Реферальная программа**\n\n"
         f"Приглашайте друзей и получайте бонусы!\n\n"
         f"• За каждого приглашенного друга: 500₽\n"
         f"• За его первую оплаченную бронь: 5% от суммы\n\n"
         f"👇 Ваша уникальная ссылка",
-        reply_markup=kb.as_markup(),
+        reply_markup=keyboards.REFERRAL_MENU,
     )
 
 
 @router.message(StateFilter(UserStates.main_menu), F.text == "📋 Моя ссылка")
-async def referral_link(message: Message):
+async def referral_link(
+    message: Message,
+    session: AsyncSession,
+    current_user: CurrentUser,
+):
     """Показать реферальную ссылку"""
-    async with SessionLocal() as session:
-        user = await get_or_create_user(session, message.from_user.id)
-        ref_code = await get_or_create_referral_code(session, user.id)
+    user = await current_user.get()
+    ref_code = await get_or_create_referral_code(session, user.id)
     
     ref_url = f"https://t.me/your_bot?start=r_{ref_code.code}"
     
@@ -143,6 +143,23 @@ class Admin:
 {count} объектов выложено в канал.
     """
     
+    sync_apartments_done = """
+🔄 **Синхронизация завершена**
+
+Новых постов: {created}
+Обновлено: {edited}
+Удалено: {deleted}
+Без изменений: {unchanged}
+С ошибкой: {failed}
+    """
+    
+    publish_apartments_partial = """
+⚠️ **Публикация прервана**
+
+Опубликовано: {done}, с ошибкой: {failed}.
+Нажмите «🏠 Опубликовать все» еще раз — уже опубликованные квартиры будут пропущены.
+    """
+    
     leads_menu = """
 📩 **Лиды (заявки)**
 
@@ -0,0 +1,171 @@
+"""
+Асинхронная обработка Telegram updates.
+
+Webhook только валидирует update и кладет его в очередь, сразу отвечая 200.
+Пул воркеров разбирает очереди: у каждого воркера своя очередь, и все
+апдейты одного чата попадают в одну и ту же — порядок внутри чата
+сохраняется, а разные чаты обрабатываются параллельно.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.logger import log_bot
+
+
+def update_chat_key(update_data: Dict[str, Any]) -> int:
+    """Ключ упорядочивания: id чата (или пользователя) из сырого update"""
+    for field, value in update_data.items():
+        if field == "update_id" or not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+        user = value.get("from") or value.get("user")
+        if user and "id" in user:
+            return user["id"]
+    return update_data.get("update_id", 0)
+
+
+class LatencyStats:
+    """Счетчик и среднее/максимум длительностей"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {"avg_ms": round(avg * 1000, 3), "max_ms": round(self.max * 1000, 3)}
+
+
+class UpdateWorkerPool:
+    """Ограниченный пул воркеров с очередью на каждый воркер"""
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        workers: int = 8,
+        queue_size: int = 1000,
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.shard_size = max(1, queue_size // self.workers)
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait = LatencyStats()
+        self.processing = LatencyStats()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.shard_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"tg-update-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+        log_bot.info(f"Пул обработки updates запущен: workers={self.workers} shard_size={self.shard_size}")
+
+    async def stop(self, timeout: float = 10.0):
+        """Дождаться разбора очередей (не дольше timeout) и остановить воркеров"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            log_bot.warning(f"Остановка пула: не обработано {self.depth()} updates")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, chat_key: int, item: Any) -> bool:
+        """
+        Положить update в очередь его чата. False — очередь переполнена
+        или пул не запущен (update некому обработать)
+        """
+        if not self.running:
+            self.rejected += 1
+            return False
+        queue = self._queues[hash(chat_key) % self.workers]
+        try:
+            queue.put_nowait((time.perf_counter(), item))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            enqueued_at, item = await queue.get()
+            started = time.perf_counter()
+            self.wait.add(started - enqueued_at)
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                log_bot.error(f"Ошибка обработки update: {e}")
+            finally:
+                self.processing.add(time.perf_counter() - started)
+                queue.task_done()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_depth": self.depth(),
+            "queue_capacity": self.shard_size * self.workers,
+            "max_shard_depth": max((queue.qsize() for queue in self._queues), default=0),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": self.wait.as_dict(),
+            "processing": self.processing.as_dict(),
+        }
+
+
+_pool: Optional[UpdateWorkerPool] = None
+
+
+async def feed_update(update):
+    """Передать update в диспетчер aiogram"""
+    from app.bot.main import bot, dp
+    await dp.feed_update(bot, update)
+
+
+def get_update_pool() -> UpdateWorkerPool:
+    global _pool
+    if _pool is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _pool = UpdateWorkerPool(
+            feed_update,
+            workers=settings.tg_update_workers,
+            queue_size=settings.tg_update_queue_size,
+        )
+    return _pool
@@ -27,6 +27,54 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    db_pool_mode: str = "queue"  # queue | null
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # секунды, 0 = не пересоздавать
+    db_pool_pre_ping: bool = True
+    db_max_connections: int = 0  # бюджет соединений на все воркеры, 0 = без лимита
+    web_concurrency: int = 1  # число воркеров uvicorn (WEB_CONCURRENCY)
+
+    # Telegram updates
+    tg_update_mode: str = "inline"  # inline | queue
+    tg_update_workers: int = 8
+    tg_update_queue_size: int = 1000
+    tg_dedup_backend: str = "memory"  # memory | redis | off
+    tg_dedup_window: int = 600  # секунды
+    tg_dedup_max_size: int = 100000
+
+    # Booking webhooks
+    webhook_mode: str = "inline"  # inline | inbox
+    webhook_workers: int = 2
+    webhook_batch_size: int = 50
+    webhook_poll_interval: float = 1.0  # секунды между опросами пустого inbox
+    webhook_max_attempts: int = 5
+    webhook_providers_file: str = ""  # JSON с маппингами дополнительных провайдеров
+
+    # Bot FSM storage
+    fsm_storage: str = "memory"  # memory | redis
+    redis_url: str = "redis://localhost:6379/0"
+    fsm_state_ttl: int = 86400  # секунды
+
+    # Cache
+    catalog_cache_ttl: int = 300  # секунды
+    inline_cache_time: int = 300  # секунды, кеш ответов inline-режима на стороне Telegram
+
+    # Channel publishing (лимиты Telegram Bot API)
+    tg_global_rate: float = 30.0  # сообщений в секунду на бота
+    tg_chat_rate_per_minute: int = 20  # сообщений в минуту в одну группу/канал
+    tg_max_retries: int = 5  # повторов на 429 (retry_after)
+    publish_concurrency: int = 4
+    publish_checkpoint_size: int = 25  # постов на одну запись в БД
+    catalog_page_size: int = 20  # квартир на страницу каталога в канале
+
+    # Scheduler (фоновые задачи, выполняет один воркер-лидер)
+    scheduler_enabled: bool = False
+    scheduler_catalog_sync_minutes: int = 60
+    scheduler_menu_refresh_minutes: int = 360
+    scheduler_stats_rollup_minutes: int = 30
+    scheduler_leader_check: int = 30  # секунды между попытками стать лидером
 
     # Referral
     attribution_window_days: int = 30
@@ -4,34 +4,70 @@ CRUD операции для часто используемых сущност
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select, update, func, and_
-from datetime import datetime, timedelta
-from typing import Optional, List
+from sqlalchemy import select, update, func, and_, or_, exists, case
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, List
 
 from app.db.models import (
-    User, Apartment, Lead, Booking, ReferralCode, ReferralEvent,
-    WebhookEvent, Payout, ChannelPost,
+    User, Apartment, Lead, Booking, BookingStatus, BOOKING_STATUS_RANK, ReferralCode, ReferralEvent,
+    WebhookEvent, Payout, ChannelPost, JobRun, DailyStats, ApartmentMedia,
 )
+from app.db.session import commit_or_flush
 from app.config import get_settings
 
 settings = get_settings()
 
+# Для upsert возвращаем ORM-объекты из RETURNING, перезаписывая identity map
+UPSERT_OPTIONS = {"populate_existing": True}
 
-# ============= USER =============
 
-async def get_or_create_user(session: AsyncSession, telegram_id: int, **kwargs) -> User:
-    """Получить или создать пользователя"""
-    user = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = user.scalar_one_or_none()
+def upsert_insert(session: AsyncSession, model):
+    """INSERT с поддержкой ON CONFLICT для диалекта сессии (Postgres / SQLite)"""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def get_or_insert(session: AsyncSession, model, key: str, values: dict) -> tuple:
+    """
+    Получить или создать запись: SELECT по key, а при промахе —
+    INSERT ... ON CONFLICT (key) DO NOTHING RETURNING.
+
+    Существующая строка (горячий путь: поиск пользователя на каждый update)
+    стоит одного SELECT и никогда не перезаписывается. Если параллельный
+    запрос успел вставить тот же key, INSERT ничего не вернет — тогда
+    строку перечитываем (вставка другого уже закоммичена: конфликт на
+    уникальном индексе ждет ее commit). Commit — только для новой строки.
+
+    Возвращает (obj, created: bool)
+    """
+    by_key = select(model).where(getattr(model, key) == values[key])
+    obj = (await session.execute(by_key)).scalar_one_or_none()
+    if obj is not None:
+        return obj, False
     
-    if not user:
-        user = User(telegram_id=telegram_id, **kwargs)
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
+    stmt = (
+        upsert_insert(session, model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[key])
+        .returning(model)
+    )
+    result = await session.execute(stmt, execution_options=UPSERT_OPTIONS)
+    obj = result.scalar_one_or_none()
+    if obj is not None:
+        await commit_or_flush(session)
+        return obj, True
     
+    result = await session.execute(by_key)
+    return result.scalar_one(), False
+
+
+# ============= USER =============
+
+async def get_or_create_user(session: AsyncSession, telegram_id: int, **kwargs) -> User:
+    """Получить или создать пользователя (один INSERT ... ON CONFLICT)"""
+    user, _ = await get_or_insert(session, User, "telegram_id", {"telegram_id": telegram_id, **kwargs})
     return user
 
 
@@ -61,14 +97,65 @@ async def get_apartment(session: AsyncSession, apartment_id: int) -> Optional[Ap
     return result.unique().scalar_one_or_none()
 
 
+async def search_apartments(
+    session: AsyncSession,
+    district: Optional[str] = None,
+    guests: Optional[int] = None,
+    budget: Optional[int] = None,
+    dates: Optional[tuple[str, str]] = None,
+) -> List[int]:
+    """
+    Поиск квартир для wizard. Возвращает id в порядке выдачи (sort_order, id).
+
+    - district: точное совпадение района
+    - guests: вместимость не меньше
+    - budget: цена за ночь не выше (квартиры без цены не отсекаем)
+    - dates: (check_in, check_out) YYYY-MM-DD — без пересекающихся броней
+    """
+    query = select(Apartment.id).where(Apartment.is_active == True)
+    
+    if district:
+        query = query.where(Apartment.district == district)
+    if guests:
+        query = query.where(Apartment.guests_max >= guests)
+    if budget:
+        query = query.where(
+            or_(Apartment.price_per_night.is_(None), Apartment.price_per_night <= budget)
+        )
+    if dates:
+        check_in, check_out = dates
+        query = query.where(
+            ~exists().where(
+                Booking.apartment_id == Apartment.id,
+                Booking.status != BookingStatus.CANCELED,
+                Booking.check_in < check_out,
+                Booking.check_out > check_in,
+            )
+        )
+    
+    query = query.order_by(Apartment.sort_order, Apartment.id)
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def save_media_file_ids(session: AsyncSession, file_ids: dict):
+    """Сохранить Telegram file_id медиа одним bulk UPDATE по первичному ключу"""
+    if not file_ids:
+        return
+    await session.execute(
+        update(ApartmentMedia),
+        [{"id": media_id, "file_id": file_id} for media_id, file_id in file_ids.items()],
+    )
+    await commit_or_flush(session)
+
+
 # ============= LEAD =============
 
 async def create_lead(session: AsyncSession, **kwargs) -> Lead:
     """Создать лид"""
     lead = Lead(**kwargs)
     session.add(lead)
-    await session.commit()
-    await session.refresh(lead)
+    await commit_or_flush(session, lead)
     return lead
 
 
@@ -88,22 +175,114 @@ async def get_new_leads(session: AsyncSession, limit: int = 10) -> List[Lead]:
 
 async def get_or_create_booking(session: AsyncSession, external_id: str, **kwargs) -> tuple[Booking, bool]:
     """
-    Получить или создать бронь (идемпотентно).
+    Получить или создать бронь (идемпотентно, один INSERT ... ON CONFLICT).
     Возвращает (booking, created: bool)
     """
-    booking = await session.execute(
-        select(Booking).where(Booking.external_id == external_id)
+    return await get_or_insert(session, Booking, "external_id", {"external_id": external_id, **kwargs})
+
+
+def _is_newer_booking(new: dict, current: dict) -> bool:
+    """
+    Правило upsert_bookings на Python: время провайдера, иначе порядок
+    статусов (при равном ранге побеждает пришедшее позже)
+    """
+    if new.get("provider_updated_at") and current.get("provider_updated_at"):
+        return new["provider_updated_at"] > current["provider_updated_at"]
+    return new["status_rank"] >= current["status_rank"]
+
+
+def collapse_booking_rows(rows: List[dict]) -> Dict[str, dict]:
+    """
+    Самая новая строка на каждый external_id (с проставленным status_rank).
+    Одна команда ON CONFLICT не может обновить строку дважды.
+    """
+    newest: Dict[str, dict] = {}
+    for row in rows:
+        row.setdefault("status_rank", BOOKING_STATUS_RANK[BookingStatus(row["status"])])
+        current = newest.get(row["external_id"])
+        if current is None or _is_newer_booking(row, current):
+            newest[row["external_id"]] = row
+    return newest
+
+
+async def upsert_bookings(session: AsyncSession, rows: List[dict]) -> Dict[str, tuple]:
+    """
+    Upsert броней с монотонным статусом — один INSERT ... ON CONFLICT DO UPDATE
+    ... RETURNING на все строки, без чтения перед записью.
+
+    Существующая бронь меняется, только если событие новее: по
+    provider_updated_at, когда время есть у обеих сторон, иначе по
+    BOOKING_STATUS_RANK (confirmed не откатывает paid). Событие того же
+    ранга без времени применяется: так доходят исправления суммы и дат
+    у уже подтвержденной брони. Условие считается
+    в самом UPDATE по заблокированной строке, поэтому параллельные и
+    пришедшие не по порядку события не перетирают друг друга. Пустые поля
+    события не затирают известные значения.
+
+    Применение и смена статуса различаются меткой updated_at: событие,
+    которое только обновило поля (тот же статус), получает stamp, а
+    сменившее статус — moved (stamp + 1 мкс). transitioned — статус
+    брони изменило именно это событие (или бронь им создана): от него
+    зависят выплата и событие реферала, повтор paid их не дублирует.
+    Возвращает {external_id: (booking, created, transitioned)}.
+    """
+    newest = collapse_booking_rows(rows)
+    if not newest:
+        return {}
+    
+    stamp = datetime.utcnow()
+    moved = stamp + timedelta(microseconds=1)
+    values = [
+        {"provider_updated_at": None, **row, "created_at": stamp, "updated_at": stamp}
+        for row in newest.values()
+    ]
+    stmt = upsert_insert(session, Booking).values(values)
+    excluded = stmt.excluded
+    current = Booking.__table__.c
+    
+    newer = case(
+        (
+            and_(excluded.provider_updated_at.is_not(None), current.provider_updated_at.is_not(None)),
+            excluded.provider_updated_at > current.provider_updated_at,
+        ),
+        else_=excluded.status_rank >= current.status_rank,
+    )
+    set_ = {
+        key: case((newer, func.coalesce(excluded[key], current[key])), else_=current[key])
+        for key in values[0]
+        if key not in ("external_id", "created_at", "updated_at")
+    }
+    set_["updated_at"] = case(
+        (and_(newer, excluded.status != current.status), moved),
+        (newer, stamp),
+        else_=current.updated_at,
     )
-    booking = booking.scalar_one_or_none()
     
-    if booking:
-        return booking, False
+    stmt = stmt.on_conflict_do_update(index_elements=["external_id"], set_=set_).returning(Booking)
+    result = await session.execute(stmt, execution_options=UPSERT_OPTIONS)
+    bookings = {}
+    applied = False
+    for booking in result.scalars().all():
+        created = booking.created_at == stamp
+        applied = applied or booking.updated_at in (stamp, moved)
+        bookings[booking.external_id] = (booking, created, created or booking.updated_at == moved)
     
-    booking = Booking(external_id=external_id, **kwargs)
-    session.add(booking)
-    await session.commit()
-    await session.refresh(booking)
-    return booking, True
+    if applied:
+        await commit_or_flush(session)
+    return bookings
+
+
+async def upsert_booking(
+    session: AsyncSession, external_id: str, status: str, **kwargs
+) -> tuple[Booking, bool, bool]:
+    """
+    Upsert одной брони (см. upsert_bookings): один запрос на событие.
+    Возвращает (booking, created, transitioned)
+    """
+    bookings = await upsert_bookings(
+        session, [{"external_id": external_id, "status": status, **kwargs}]
+    )
+    return bookings[external_id]
 
 
 async def update_booking_status(session: AsyncSession, booking_id: int, status: str):
@@ -113,7 +292,7 @@ async def update_booking_status(session: AsyncSession, booking_id: int, status:
         .where(Booking.id == booking_id)
         .values(status=status, updated_at=datetime.utcnow())
     )
-    await session.commit()
+    await commit_or_flush(session)
 
 
 # ============= REFERRAL =============
@@ -128,23 +307,12 @@ async def get_referral_code(session: AsyncSession, code: str) -> Optional[Referr
 
 
 async def get_or_create_referral_code(session: AsyncSession, user_id: int) -> ReferralCode:
-    """Получить или создать реферальный код"""
-    code = await session.execute(
-        select(ReferralCode).where(ReferralCode.user_id == user_id)
-    )
-    code = code.scalar_one_or_none()
-    
-    if code:
-        return code
-    
-    # Генерируем уникальный код
+    """Получить или создать реферальный код (один INSERT ... ON CONFLICT)"""
+    # Генерируем уникальный код (используется, только если кода еще нет)
     import secrets
     base_code = f"ref_{user_id}_{secrets.token_hex(4)}"
     
-    code = ReferralCode(user_id=user_id, code=base_code)
-    session.add(code)
-    await session.commit()
-    await session.refresh(code)
+    code, _ = await get_or_insert(session, ReferralCode, "user_id", {"user_id": user_id, "code": base_code})
     return code
 
 
@@ -152,7 +320,7 @@ async def log_referral_event(session: AsyncSession, referral_code_id: int, event
     """Логировать событие реферальной программы"""
     event = ReferralEvent(referral_code_id=referral_code_id, type=event_type, **kwargs)
     session.add(event)
-    await session.commit()
+    await commit_or_flush(session)
 
 
 async def get_attributed_referral_code(
@@ -184,11 +352,57 @@ async def save_webhook_event(session: AsyncSession, **kwargs) -> WebhookEvent:
     """Сохранить сырое событие вебхука"""
     event = WebhookEvent(**kwargs)
     session.add(event)
-    await session.commit()
-    await session.refresh(event)
+    await commit_or_flush(session, event)
     return event
 
 
+async def claim_webhook_event(
+    session: AsyncSession, provider: str, payload_hash: str, **kwargs
+) -> Optional[WebhookEvent]:
+    """
+    Захватить событие вебхука: INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Дубликат определяется самим конфликтом по уникальному индексу
+    (provider, payload_hash) — без предварительного SELECT. Параллельный
+    повтор ждет на индексе и получает конфликт после commit первого.
+    Возвращает None для дубликата.
+    """
+    stmt = (
+        upsert_insert(session, WebhookEvent)
+        .values(provider=provider, payload_hash=payload_hash, **kwargs)
+        .on_conflict_do_nothing(index_elements=["provider", "payload_hash"])
+        .returning(WebhookEvent)
+    )
+    result = await session.execute(stmt, execution_options=UPSERT_OPTIONS)
+    event = result.scalar_one_or_none()
+    
+    if event:
+        await commit_or_flush(session)
+    return event
+
+
+async def claim_webhook_events(session: AsyncSession, rows: List[dict]) -> Dict[str, int]:
+    """
+    Пакетный claim_webhook_event: один INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Возвращает {payload_hash: id} только для новых событий — остальные дубликаты.
+    """
+    if not rows:
+        return {}
+    
+    stmt = (
+        upsert_insert(session, WebhookEvent)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["provider", "payload_hash"])
+        .returning(WebhookEvent.payload_hash, WebhookEvent.id)
+    )
+    result = await session.execute(stmt)
+    claimed = dict(result.all())
+    
+    if claimed:
+        await commit_or_flush(session)
+    return claimed
+
+
 async def get_webhook_event_by_hash(
     session: AsyncSession, provider: str, payload_hash: str
 ) -> Optional[WebhookEvent]:
@@ -211,4 +425,117 @@ async def mark_webhook_processed(session: AsyncSession, webhook_event_id: int):
         .where(WebhookEvent.id == webhook_event_id)
         .values(processed_at=datetime.utcnow())
     )
-    await session.commit()
\ No newline at end of file
+    await commit_or_flush(session)
+
+
+async def claim_pending_webhook_events(
+    session: AsyncSession, limit: int, max_attempts: int
+) -> List[WebhookEvent]:
+    """
+    Захватить пачку необработанных событий (processed_at IS NULL).
+
+    SELECT ... FOR UPDATE SKIP LOCKED: строки, уже взятые другим воркером,
+    пропускаются без ожидания, блокировка держится до commit транзакции.
+    События, исчерпавшие max_attempts, больше не берутся.
+    """
+    result = await session.execute(
+        select(WebhookEvent)
+        .where(
+            WebhookEvent.processed_at.is_(None),
+            WebhookEvent.attempts < max_attempts,
+        )
+        .order_by(WebhookEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+
+async def record_webhook_failure(session: AsyncSession, webhook_event_id: int, error: str):
+    """Увеличить счетчик попыток и сохранить ошибку обработки"""
+    await session.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id == webhook_event_id)
+        .values(attempts=WebhookEvent.attempts + 1, last_error=error[:1000])
+    )
+    await commit_or_flush(session)
+
+
+async def count_webhook_inbox(session: AsyncSession, max_attempts: int) -> Dict[str, int]:
+    """
+    Необработанные события inbox: pending — ждут воркеров, dead — исчерпали
+    max_attempts и больше не берутся (нужен разбор вручную). Один запрос
+    по частичному индексу ix_webhook_events_pending.
+    """
+    exhausted = WebhookEvent.attempts >= max_attempts
+    row = (await session.execute(
+        select(
+            func.count(case((~exhausted, 1))),
+            func.count(case((exhausted, 1))),
+        ).where(WebhookEvent.processed_at.is_(None))
+    )).one()
+    return {"pending": row[0], "dead": row[1]}
+
+
+# ============= JOBS & STATS =============
+
+async def record_job_run(session: AsyncSession, **kwargs) -> JobRun:
+    """Записать запуск фоновой задачи"""
+    run = JobRun(**kwargs)
+    session.add(run)
+    await commit_or_flush(session, run)
+    return run
+
+
+async def get_last_job_runs(session: AsyncSession) -> List[JobRun]:
+    """Последний запуск каждой задачи"""
+    last = (
+        select(JobRun.job_id, func.max(JobRun.id).label("id"))
+        .group_by(JobRun.job_id)
+        .subquery()
+    )
+    result = await session.execute(
+        select(JobRun).join(last, JobRun.id == last.c.id).order_by(JobRun.job_id)
+    )
+    return result.scalars().all()
+
+
+async def rollup_daily_stats(session: AsyncSession, day: date) -> DailyStats:
+    """
+    Пересчитать агрегаты за день и записать одним upsert по day.
+    Повторный запуск за тот же день перезаписывает значения.
+    """
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    
+    leads_count = await session.scalar(
+        select(func.count(Lead.id)).where(Lead.created_at >= start, Lead.created_at < end)
+    )
+    bookings = (await session.execute(
+        select(
+            func.count(Booking.id),
+            func.count(Booking.id).filter(Booking.status == BookingStatus.PAID),
+            func.coalesce(
+                func.sum(Booking.total_amount).filter(Booking.status == BookingStatus.PAID), 0
+            ),
+        ).where(Booking.created_at >= start, Booking.created_at < end)
+    )).one()
+    
+    values = {
+        "day": day,
+        "leads_count": leads_count or 0,
+        "bookings_count": bookings[0],
+        "paid_count": bookings[1],
+        "paid_amount": bookings[2],
+        "updated_at": datetime.utcnow(),
+    }
+    stmt = upsert_insert(session, DailyStats).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day"],
+        set_={key: stmt.excluded[key] for key in values if key != "day"},
+    ).returning(DailyStats)
+    
+    result = await session.execute(stmt, execution_options=UPSERT_OPTIONS)
+    stats = result.scalar_one()
+    await commit_or_flush(session)
+    return stats
@@ -0,0 +1,41 @@
+"""Unique (provider, payload_hash) index on webhook_events.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    # Удаляем накопившиеся дубликаты, оставляя самое раннее событие
+    op.execute(
+        """
+        DELETE FROM webhook_events
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM webhook_events GROUP BY provider, payload_hash
+        )
+        """
+    )
+    
+    op.create_index(
+        'uq_webhook_events_provider_payload_hash',
+        'webhook_events',
+        ['provider', 'payload_hash'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_index('uq_webhook_events_provider_payload_hash', table_name='webhook_events')
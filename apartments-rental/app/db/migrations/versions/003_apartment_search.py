@@ -0,0 +1,34 @@
+"""Apartment price and search index.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.add_column('apartments', sa.Column('price_per_night', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_apartments_search',
+        'apartments',
+        ['is_active', 'district', 'guests_max', 'price_per_night'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_index('ix_apartments_search', table_name='apartments')
+    op.drop_column('apartments', 'price_per_night')
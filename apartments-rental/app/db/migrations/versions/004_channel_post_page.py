@@ -0,0 +1,30 @@
+"""Channel post page index for the paginated catalog.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.add_column(
+        'channel_posts',
+        sa.Column('page', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_column('channel_posts', 'page')
@@ -0,0 +1,53 @@
+"""Scheduler job runs and daily stats rollup.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.create_table(
+        'job_runs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('job_id', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_job_runs_job_id_started_at', 'job_runs', ['job_id', 'started_at'], unique=False)
+    
+    op.create_table(
+        'daily_stats',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('leads_count', sa.Integer(), nullable=False),
+        sa.Column('bookings_count', sa.Integer(), nullable=False),
+        sa.Column('paid_count', sa.Integer(), nullable=False),
+        sa.Column('paid_amount', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_table('daily_stats')
+    op.drop_index('ix_job_runs_job_id_started_at', table_name='job_runs')
+    op.drop_table('job_runs')
@@ -0,0 +1,27 @@
+"""Telegram file_id for apartment media.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.add_column('apartment_media', sa.Column('file_id', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_column('apartment_media', 'file_id')
@@ -0,0 +1,40 @@
+"""Webhook inbox: attempts, last error and pending index.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.add_column(
+        'webhook_events',
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column('webhook_events', sa.Column('last_error', sa.Text(), nullable=True))
+    op.create_index(
+        'ix_webhook_events_pending',
+        'webhook_events',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('processed_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_index('ix_webhook_events_pending', table_name='webhook_events')
+    op.drop_column('webhook_events', 'last_error')
+    op.drop_column('webhook_events', 'attempts')
@@ -0,0 +1,44 @@
+"""Booking status rank and provider timestamp for monotonic upserts.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database."""
+    
+    op.add_column(
+        'bookings',
+        sa.Column('status_rank', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column('bookings', sa.Column('provider_updated_at', sa.DateTime(), nullable=True))
+    
+    # Ранг для существующих броней (см. BOOKING_STATUS_RANK)
+    op.execute(
+        """
+        UPDATE bookings SET status_rank = CASE CAST(status AS VARCHAR)
+            WHEN 'confirmed' THEN 1
+            WHEN 'paid' THEN 2
+            WHEN 'canceled' THEN 3
+            ELSE 0
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database."""
+    
+    op.drop_column('bookings', 'provider_updated_at')
+    op.drop_column('bookings', 'status_rank')
@@ -11,6 +11,7 @@ from datetime import datetime
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum as SAEnum,
     ForeignKey,
@@ -21,6 +22,7 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -57,6 +59,7 @@ class Apartment(Base):
     __tablename__ = "apartments"
     __table_args__ = (
         Index("ix_apartments_is_active", "is_active"),
+        Index("ix_apartments_search", "is_active", "district", "guests_max", "price_per_night"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -64,6 +67,7 @@ class Apartment(Base):
     district = Column(String(100), nullable=True)
     address_short = Column(String(255), nullable=True)
     guests_max = Column(Integer, nullable=False, default=2)
+    price_per_night = Column(Integer, nullable=True)  # RUB, None = цена по кнопке
     beds_text = Column(String(100), nullable=True)
     features_json = Column(JSON, nullable=True)  # ["wifi", "ac", "kitchen", ...]
     rules_short = Column(Text, nullable=True)
@@ -89,6 +93,7 @@ class ApartmentMedia(Base):
     apartment_id = Column(Integer, ForeignKey("apartments.id"), nullable=False)
     type = Column(String(20), nullable=False)  # "photo" или "video"
     url = Column(String(500), nullable=False)
+    file_id = Column(String(255), nullable=True)  # Telegram file_id после первой загрузки
     sort_order = Column(Integer, nullable=False, default=0)
 
     apartment = relationship("Apartment", back_populates="media")
@@ -127,6 +132,7 @@ class ChannelPost(Base):
     kind = Column(SAEnum(ChannelPostKind, name="channel_post_kind"), nullable=False)
     channel_id = Column(String(50), nullable=False)  # @channel или -100...
     message_id = Column(Integer, nullable=True)
+    page = Column(Integer, nullable=False, default=0, server_default="0")  # страница каталога
     last_published_at = Column(DateTime, nullable=True)
     content_hash = Column(String(64), nullable=True)  # sha256
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -174,6 +180,16 @@ class BookingStatus(str, enum.Enum):
     CANCELED = "canceled"
 
 
+# Порядок статусов брони: без времени изменения у провайдера переход
+# применяется, только если новый статус "позже" текущего
+BOOKING_STATUS_RANK = {
+    BookingStatus.CREATED: 0,
+    BookingStatus.CONFIRMED: 1,
+    BookingStatus.PAID: 2,
+    BookingStatus.CANCELED: 3,
+}
+
+
 class Booking(Base):
     __tablename__ = "bookings"
     __table_args__ = (
@@ -196,6 +212,8 @@ class Booking(Base):
     currency = Column(String(3), nullable=False, default="RUB")
     source_tag = Column(String(100), nullable=True)
     raw_payload_json = Column(JSON, nullable=True)
+    status_rank = Column(Integer, nullable=False, default=0, server_default="0")  # BOOKING_STATUS_RANK
+    provider_updated_at = Column(DateTime, nullable=True)  # время изменения у провайдера (UTC)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -278,6 +296,13 @@ class WebhookEvent(Base):
         Index("ix_webhook_events_provider", "provider"),
         Index("ix_webhook_events_event_id", "event_id"),
         Index("ix_webhook_events_received_at", "received_at"),
+        Index("uq_webhook_events_provider_payload_hash", "provider", "payload_hash", unique=True),
+        # Очередь inbox: только необработанные события
+        Index(
+            "ix_webhook_events_pending", "id",
+            postgresql_where=text("processed_at IS NULL"),
+            sqlite_where=text("processed_at IS NULL"),
+        ),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -288,3 +313,34 @@ class WebhookEvent(Base):
     received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
     raw_payload_json = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+
+class JobRun(Base):
+    """Запуск фоновой задачи планировщика"""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index("ix_job_runs_job_id_started_at", "job_id", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False)  # ok | error
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Integer, nullable=False)
+    error = Column(Text, nullable=True)
+
+
+class DailyStats(Base):
+    """Дневные агрегаты по лидам и броням"""
+    __tablename__ = "daily_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, unique=True)
+    leads_count = Column(Integer, nullable=False, default=0)
+    bookings_count = Column(Integer, nullable=False, default=0)
+    paid_count = Column(Integer, nullable=False, default=0)
+    paid_amount = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -2,25 +2,128 @@
 Асинхронная сессия SQLAlchemy с пулом подключений.
 """
 
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncSession,
     async_sessionmaker,
 )
-from sqlalchemy.pool import NullPool
-from app.config import get_settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.config import get_settings, Settings
 import logging
 
 log = logging.getLogger("db")
 settings = get_settings()
 
+
+class PoolStats:
+    """Счетчики пула для /health/db"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds
+
+    def as_dict(self) -> dict:
+        avg = self.wait_total / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(avg * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет время ожидания соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def pool_limits(cfg: Settings) -> tuple[int, int]:
+    """
+    Размер пула и overflow для одного воркера.
+
+    Если задан db_max_connections, бюджет делится между web_concurrency
+    воркерами, чтобы все процессы вместе не превысили max_connections Postgres.
+    """
+    size, overflow = cfg.db_pool_size, cfg.db_max_overflow
+    if cfg.db_max_connections > 0:
+        per_worker = max(1, cfg.db_max_connections // max(1, cfg.web_concurrency))
+        size = min(size, per_worker)
+        overflow = max(0, min(overflow, per_worker - size))
+    return size, overflow
+
+
+def engine_options(cfg: Settings) -> dict:
+    """Параметры create_async_engine по настройкам пула"""
+    options = {"echo": cfg.debug, "pool_pre_ping": cfg.db_pool_pre_ping}
+
+    if cfg.db_pool_mode == "null":
+        options["poolclass"] = NullPool
+        return options
+
+    # SQLite (тесты, локальная разработка) — оставляем пул по умолчанию для диалекта
+    if make_url(cfg.database_url).get_backend_name() == "sqlite":
+        return options
+
+    size, overflow = pool_limits(cfg)
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=cfg.db_pool_timeout,
+        pool_recycle=cfg.db_pool_recycle or -1,
+    )
+    return options
+
+
+def instrument_engine(async_engine):
+    """Подписываемся на события пула для телеметрии"""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_stats.connects += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.invalidations += 1
+
+
 # Создаём асинхронный движок
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    poolclass=NullPool,
-)
+engine = create_async_engine(settings.database_url, **engine_options(settings))
+instrument_engine(engine)
 
 # Фабрика сессий
 SessionLocal = async_sessionmaker(
@@ -28,12 +131,68 @@ SessionLocal = async_sessionmaker(
 )
 
 
+def pool_status() -> dict:
+    """Текущее состояние пула: занятые/свободные/overflow соединения и ожидание"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool_limits(settings)[1],
+            workers=settings.web_concurrency,
+        )
+
+    status.update(pool_stats.as_dict())
+    return status
+
+
 async def get_session() -> AsyncSession:
     """Dependency для FastAPI"""
     async with SessionLocal() as session:
         yield session
 
 
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession):
+    """
+    Одна транзакция на весь сценарий.
+
+    Внутри блока CRUD-хелперы только делают flush, а commit выполняется
+    один раз на выходе. При исключении всё откатывается целиком.
+    Вложенные блоки присоединяются к внешней транзакции.
+    """
+    if session.info.get("unit_of_work"):
+        yield session
+        return
+
+    session.info["unit_of_work"] = True
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        session.info.pop("unit_of_work", None)
+
+
+async def commit_or_flush(session: AsyncSession, *instances):
+    """
+    Зафиксировать изменения: flush внутри unit_of_work, иначе commit + refresh.
+    """
+    if session.info.get("unit_of_work"):
+        await session.flush()
+        return
+
+    await session.commit()
+    for instance in instances:
+        await session.refresh(instance)
+
+
 async def init_db():
     """Инициализация БД и добавление тестовых данных"""
     from app.db.models import Base, User, Apartment, ApartmentTag, ApartmentMedia
@@ -0,0 +1,48 @@
+"""
+Быстрый JSON для горячих путей (вебхуки бронирований, Telegram updates).
+
+orjson, если установлен (`pip install orjson`), иначе stdlib json.
+То, что orjson не принимает (NaN, Infinity), дочитывает stdlib; ошибка
+разбора в обоих случаях — ValueError (JSONDecodeError). Отличие при разборе
+одно: целые за пределами 64 бит orjson читает как float. Сериализация
+совпадает не байт в байт:
+float с экспонентой orjson пишет как 1e-7 / 1e16, stdlib — 1e-07 / 1e+16.
+Поэтому для хешей (идемпотентность) dumps не подходит — там нужен один
+фиксированный сериализатор (см. canonical_payload_hash).
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Разобрать JSON из bytes или str"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Компактный JSON в bytes (UTF-8 без экранирования)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # Например, int за пределами 64 бит — stdlib справится
+            pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(obj: Any) -> str:
+    """Компактный JSON в str"""
+    return dumps_bytes(obj).decode()
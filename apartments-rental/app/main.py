@@ -12,6 +12,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from contextlib import asynccontextmanager
 import logging
 
+from app import fastjson
 from app.config import get_settings
 from app.logger import setup_logging, log_api
 from app.db.session import init_db
@@ -43,10 +44,45 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         log_api.error(f"❌ Ошибка регистрации роутеров: {e}")
     
+    # Пул обработки Telegram updates (режим queue)
+    if settings.tg_update_mode == "queue":
+        from app.bot.updates import get_update_pool
+        get_update_pool().start()
+    
+    # Воркеры inbox вебхуков бронирования (режим inbox)
+    if settings.webhook_mode == "inbox":
+        from app.services.booking_events import get_webhook_inbox
+        get_webhook_inbox().start()
+    
+    # Фоновые задачи (выполняет один воркер-лидер)
+    if settings.scheduler_enabled:
+        from app.services.scheduler import get_scheduler
+        get_scheduler().start()
+    
     yield
     
     log_api.info("🛑 Приложение останавливается")
 
+    if settings.scheduler_enabled:
+        from app.services.scheduler import get_scheduler
+        await get_scheduler().stop()
+
+    if settings.tg_update_mode == "queue":
+        from app.bot.updates import get_update_pool
+        await get_update_pool().stop()
+
+    if settings.webhook_mode == "inbox":
+        from app.services.booking_events import get_webhook_inbox
+        await get_webhook_inbox().stop()
+
+    # Закрываем FSM storage (соединение с Redis)
+    from app.bot.main import dp
+    await dp.storage.close()
+
+    # Закрываем соединения пула
+    from app.db.session import engine
+    await engine.dispose()
+
 
 app = FastAPI(
     title="Квартиры посуточно Краснодар",
@@ -65,27 +101,114 @@ async def health_check():
     return {"status": "ok", "version": "0.1.0"}
 
 
+@app.get("/health/db")
+async def health_db():
+    """Состояние пула соединений к БД (для подбора размеров под нагрузкой)"""
+    from app.db.session import pool_status
+    return {"status": "ok", "pool": pool_status()}
+
+
+@app.get("/health/updates")
+async def health_updates():
+    """Очередь Telegram updates: глубина, задержка в очереди и время обработки"""
+    from app.bot.dedup import get_deduplicator
+    from app.bot.updates import get_update_pool
+    deduplicator = get_deduplicator()
+    return {
+        "status": "ok",
+        "mode": settings.tg_update_mode,
+        "queue": get_update_pool().metrics(),
+        "dedup": deduplicator.metrics() if deduplicator else None,
+    }
+
+
+@app.get("/health/jobs")
+async def health_jobs():
+    """Планировщик: лидерство, следующие запуски и последний запуск каждой задачи"""
+    from app.db.crud import get_last_job_runs
+    from app.db.session import SessionLocal
+    from app.services.scheduler import get_scheduler
+    async with SessionLocal() as session:
+        runs = await get_last_job_runs(session)
+    return {
+        "status": "ok",
+        "scheduler": get_scheduler().status(),
+        "last_runs": {
+            run.job_id: {
+                "status": run.status,
+                "started_at": run.started_at.isoformat(),
+                "duration_ms": run.duration_ms,
+                "error": run.error,
+            }
+            for run in runs
+        },
+    }
+
+
+@app.get("/health/webhooks")
+async def health_webhooks():
+    """
+    Inbox вебхуков бронирования: ждущие и "мертвые" (исчерпали попытки)
+    события, задержка и ошибки
+    """
+    from app.db.crud import count_webhook_inbox
+    from app.db.session import SessionLocal
+    from app.services.booking_events import get_webhook_inbox
+    async with SessionLocal() as session:
+        counts = await count_webhook_inbox(session, settings.webhook_max_attempts)
+    return {
+        "status": "ok",
+        "mode": settings.webhook_mode,
+        "pending": counts["pending"],
+        "dead": counts["dead"],
+        "inbox": get_webhook_inbox().metrics(),
+    }
+
+
 # Telegram webhook (Aiogram)
 @app.post(settings.tg_webhook_path)
 async def tg_webhook(request: Request):
-    """Webhook для Telegram bot updates (Aiogram)"""
+    """
+    Webhook для Telegram bot updates (Aiogram).
+
+    В режиме queue update только валидируется и ставится в очередь —
+    ответ уходит сразу, обработка идет в пуле воркеров (app/bot/updates.py).
+    """
     from aiogram.types import Update
     from app.bot.main import bot, dp
-    from app.logger import log_api
+    from app.bot.dedup import extract_update_id, get_deduplicator
+    from app.bot.updates import get_update_pool, update_chat_key
 
     try:
-        update_data = await request.json()
+        body = await request.body()
+
+        # Повторная доставка — отбрасываем до разбора JSON и работы с БД
+        deduplicator = get_deduplicator()
+        update_id = extract_update_id(body)
+        if deduplicator and update_id is not None and await deduplicator.is_duplicate(update_id):
+            return {"ok": True}
+
+        update_data = fastjson.loads(body)
 
         # Превращаем dict -> Update (aiogram v3 на pydantic v2)
         update = Update.model_validate(update_data, context={"bot": bot})
 
-        # Передаём в диспетчер
-        await dp.feed_update(bot, update)
+        if settings.tg_update_mode == "queue":
+            if not get_update_pool().submit(update_chat_key(update_data), update):
+                # Очередь переполнена или пул не запущен: Telegram повторит
+                # доставку позже, и этот update_id не должен считаться дубликатом
+                log_api.warning(f"Update не принят в очередь, update_id={update.update_id}")
+                if deduplicator:
+                    await deduplicator.forget(update.update_id)
+                return JSONResponse({"ok": False}, status_code=503)
+        else:
+            # Передаём в диспетчер
+            await dp.feed_update(bot, update)
 
     except Exception as e:
         # Важно: отвечаем 200, чтобы Telegram не ретраил бесконечно,
         # но логируем ошибку.
-        log_api.error("Ошибка обработки Telegram webhook", error=str(e))
+        log_api.error(f"Ошибка обработки Telegram webhook: {e}")
 
     return {"ok": True}
 
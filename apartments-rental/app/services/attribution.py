@@ -4,6 +4,7 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -44,32 +45,24 @@ async def attribute_booking(
         
         if referral_code:
             log_service.info(
-                "Атрибутирована по source_tag",
-                booking_id=booking.id,
-                code=referral_code.code,
+                f"Атрибутирована по source_tag: booking_id={booking.id} code={referral_code.code}"
             )
             return referral_code
     
     # Правило 2: По телефону
     if phone:
         result = await session.execute(
-            select(User).where(User.phone == phone)
+            select(User).options(selectinload(User.referral_code)).where(User.phone == phone)
         )
         user = result.scalar_one_or_none()
         
         if user and user.referral_code:
             log_service.info(
-                "Атрибутирована по телефону",
-                booking_id=booking.id,
-                phone=phone,
-                code=user.referral_code.code,
+                f"Атрибутирована по телефону: booking_id={booking.id} code={user.referral_code.code}"
             )
             return user.referral_code
     
-    log_service.info(
-        "Бронирование не атрибутировано",
-        booking_id=booking.id,
-    )
+    log_service.info(f"Бронирование не атрибутировано: booking_id={booking.id}")
     
     return None
 
@@ -90,11 +83,7 @@ async def check_attribution_window(
     # Self-ref check
     code = await session.get(ReferralCode, referral_code_id)
     if code and code.user_id == user_id:
-        log_service.warning(
-            "Попытка self-ref",
-            code_id=referral_code_id,
-            user_id=user_id,
-        )
+        log_service.warning(f"Попытка self-ref: code_id={referral_code_id} user_id={user_id}")
         return False
     
     # Attribution window check
@@ -115,10 +104,8 @@ async def check_attribution_window(
     
     if not event:
         log_service.warning(
-            "User не в окне атрибуции",
-            code_id=referral_code_id,
-            user_id=user_id,
-            window_days=settings.attribution_window_days,
+            f"User не в окне атрибуции: code_id={referral_code_id} user_id={user_id} "
+            f"window_days={settings.attribution_window_days}"
         )
         return False
     
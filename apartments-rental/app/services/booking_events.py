@@ -0,0 +1,370 @@
+"""
+Обработка событий бронирования из вебхуков.
+
+Бизнес-логика (upsert брони, атрибуция, выплата, событие реферала) общая
+для двух режимов:
+- inline — вебхук обрабатывается прямо в запросе;
+- inbox — endpoint только сохраняет сырой WebhookEvent и отвечает 202,
+  а пул воркеров разбирает необработанные события пачками
+  (SELECT ... FOR UPDATE SKIP LOCKED), так что прием вебхуков не ждет БД.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.updates import LatencyStats
+from app.db.crud import (
+    claim_pending_webhook_events, claim_webhook_events, collapse_booking_rows,
+    log_referral_event, record_webhook_failure, upsert_booking, upsert_bookings,
+)
+from app.db.models import Booking, BookingStatus, WebhookEvent
+from app.db.session import unit_of_work
+from app.services.attribution import attribute_booking
+from app.services.referrals import create_payout_for_booking
+from app.services.webhook_parser import WebhookParser
+from app.logger import log_webhook
+
+
+def booking_status(event_type: str) -> BookingStatus:
+    """Статус брони по типу события; незнакомый тип не двигает статус вперед"""
+    try:
+        return BookingStatus(event_type)
+    except ValueError:
+        return BookingStatus.CREATED
+
+
+def parse_booking_event(provider: str, payload: Any) -> Optional[Dict[str, Any]]:
+    """
+    Распарсить событие; None — применить нельзя: не объект JSON или без id
+    брони (повтор тоже не поможет). Общая проверка для всех путей приема.
+    """
+    if not isinstance(payload, dict):
+        return None
+    parsed = WebhookParser(provider=provider, payload=payload).parse()
+    if not parsed or not parsed["event_id"]:
+        return None
+    return parsed
+
+
+def booking_values(parsed: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Колонки брони из распарсенного события"""
+    return {
+        "external_id": parsed["event_id"],
+        "status": booking_status(parsed["event_type"]),
+        "provider_updated_at": parsed.get("updated_at"),
+        "check_in": parsed["check_in"],
+        "check_out": parsed["check_out"],
+        "total_amount": parsed["total_amount"],
+        "currency": parsed["currency"],
+        "source_tag": parsed.get("source_tag"),
+        "raw_payload_json": payload,
+    }
+
+
+async def settle_booking(
+    session: AsyncSession,
+    booking: Booking,
+    parsed: Dict[str, Any],
+    payload: Dict[str, Any],
+    transitioned: bool,
+) -> bool:
+    """
+    Атрибуция брони и выплата, если событие перевело бронь в PAID.
+    Опоздавший paid после canceled не применяется и выплату не создает.
+    Возвращает payout_created
+    """
+    source_tag = payload.get("source_tag") or payload.get("utm_source")
+    ref_code = await attribute_booking(
+        session,
+        booking,
+        source_tag=source_tag,
+        phone=parsed.get("phone"),
+    )
+
+    # Если бронь только что стала PAID — создаем Payout
+    paid = transitioned and booking.status == BookingStatus.PAID
+    if paid and ref_code:
+        # TODO: Получить user_id из phone или другого способа
+        payout = await create_payout_for_booking(session, ref_code, booking)
+
+        if payout:
+            log_webhook.info(f"Выплата создана: payout_id={payout.id} booking_id={booking.id}")
+
+        # Логируем событие для реферала
+        await log_referral_event(
+            session,
+            ref_code.id,
+            "booking_paid",
+            booking_id=booking.id,
+        )
+
+    return paid and ref_code is not None
+
+
+async def apply_booking_event(
+    session: AsyncSession, parsed: Dict[str, Any], payload: Dict[str, Any]
+) -> Tuple[Booking, bool, bool]:
+    """
+    Применить распарсенное событие: upsert брони (монотонный статус),
+    атрибуция, выплата. Возвращает (booking, transitioned, payout_created).
+    Только flush — commit делает вызывающий.
+    """
+    booking, created, transitioned = await upsert_booking(session, **booking_values(parsed, payload))
+    if not transitioned:
+        log_webhook.info(
+            f"Событие не изменило статус брони: booking_id={booking.id} "
+            f"status={booking.status} event_type={parsed['event_type']}"
+        )
+    payout_created = await settle_booking(session, booking, parsed, payload, transitioned)
+    return booking, transitioned, payout_created
+
+
+async def ingest_booking_batch(
+    session: AsyncSession,
+    provider: str,
+    items: List[Tuple[str, Any]],
+    queue_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Принять пачку событий [(payload_hash, payload)] одной транзакцией.
+
+    Дубликаты (внутри пачки и уже сохраненные) отсекаются одним
+    INSERT ... ON CONFLICT DO NOTHING, брони создаются одним пакетным upsert.
+    queue_only — режим inbox: события только сохраняются для воркеров.
+    Возвращает результат по каждому элементу в исходном порядке.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    fresh: Dict[str, int] = {}
+    for index, (payload_hash, payload) in enumerate(items):
+        if not isinstance(payload, dict):
+            results[index] = {"ok": False, "error": "Invalid JSON"}
+        elif payload_hash in fresh:
+            results[index] = {"ok": True, "duplicate": True}
+        else:
+            fresh[payload_hash] = index
+
+    parsed: Dict[str, Optional[Dict[str, Any]]] = {}
+    rows = []
+    for payload_hash, index in fresh.items():
+        payload = items[index][1]
+        row = {
+            "provider": provider,
+            "payload_hash": payload_hash,
+            "event_id": payload.get("id"),
+            "event_type": "unknown",
+            "raw_payload_json": payload,
+        }
+        if not queue_only:
+            event = parse_booking_event(provider, payload)
+            if event:
+                parsed[payload_hash] = event
+                row.update(event_id=event["event_id"], event_type=event["event_type"])
+            row["processed_at"] = datetime.utcnow()
+        rows.append(row)
+
+    async with unit_of_work(session):
+        claimed = await claim_webhook_events(session, rows)
+
+        rows = {
+            h: booking_values(parsed[h], items[fresh[h]][1])
+            for h in fresh if h in claimed and h in parsed
+        }
+        # На каждую бронь применяется самое новое событие пачки
+        newest = collapse_booking_rows(list(rows.values()))
+        bookings = await upsert_bookings(session, list(newest.values()))
+
+        for payload_hash, index in fresh.items():
+            if payload_hash not in claimed:
+                results[index] = {"ok": True, "duplicate": True}
+            elif queue_only:
+                results[index] = {"ok": True, "queued": True, "event_id": claimed[payload_hash]}
+            elif payload_hash not in parsed:
+                results[index] = {"ok": False, "error": "Could not parse webhook"}
+            else:
+                event, payload = parsed[payload_hash], items[index][1]
+                booking, _, transitioned = bookings[event["event_id"]]
+                transitioned = transitioned and newest[event["event_id"]] is rows[payload_hash]
+                results[index] = {
+                    "ok": True,
+                    "booking_id": booking.id,
+                    "status_applied": transitioned,
+                    "payout_created": await settle_booking(
+                        session, booking, event, payload, transitioned
+                    ),
+                }
+
+    log_webhook.info(
+        f"Пачка вебхуков принята: provider={provider} items={len(items)} "
+        f"new={len(claimed)} bookings={len(bookings)}"
+    )
+    return results
+
+
+async def process_webhook_event(session: AsyncSession, event: WebhookEvent) -> bool:
+    """
+    Обработать сохраненное событие из inbox. False — payload не распознан
+    (событие все равно закрывается, чтобы не разбирать его снова).
+    """
+    payload = event.raw_payload_json
+    parsed = parse_booking_event(event.provider, payload)
+
+    event.processed_at = datetime.utcnow()
+    if not parsed:
+        event.last_error = "Could not parse webhook"
+        await session.flush()
+        return False
+
+    event.event_id = parsed["event_id"]
+    event.event_type = parsed["event_type"]
+    booking, _, _ = await apply_booking_event(session, parsed, payload)
+
+    log_webhook.info(
+        f"Вебхук обработан из inbox: event_id={event.id} booking_id={booking.id} "
+        f"event_type={parsed['event_type']}"
+    )
+    return True
+
+
+# ============= INBOX WORKERS =============
+
+class WebhookInbox:
+    """Пул воркеров, разбирающих необработанные WebhookEvent пачками"""
+
+    def __init__(
+        self,
+        sessionmaker=None,
+        workers: int = 2,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+    ):
+        self.sessionmaker = sessionmaker
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.batches = 0
+        self.processed = 0
+        self.unparsed = 0
+        self.failed = 0
+        # received_at -> processed_at: сколько событие ждало в inbox
+        self.latency = LatencyStats()
+        self.processing = LatencyStats()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _sessionmaker(self):
+        if self.sessionmaker is None:
+            from app.db.session import SessionLocal
+            return SessionLocal
+        return self.sessionmaker
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-inbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+        log_webhook.info(
+            f"Inbox вебхуков запущен: workers={self.workers} batch_size={self.batch_size}"
+        )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Разбудить воркеров: в inbox появилось новое событие"""
+        self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """
+        Захватить и обработать одну пачку. Каждое событие — в своем savepoint:
+        ошибка одного не откатывает остальные, а только увеличивает attempts.
+        Возвращает размер пачки.
+        """
+        async with self._sessionmaker()() as session:
+            async with unit_of_work(session):
+                events = await claim_pending_webhook_events(
+                    session, self.batch_size, self.max_attempts
+                )
+                for event in events:
+                    await self._process(session, event)
+
+        if events:
+            self.batches += 1
+        return len(events)
+
+    async def _process(self, session: AsyncSession, event: WebhookEvent):
+        event_id, received_at = event.id, event.received_at
+        started = time.perf_counter()
+        try:
+            async with session.begin_nested():
+                if await process_webhook_event(session, event):
+                    self.processed += 1
+                else:
+                    self.unparsed += 1
+            self.latency.add((datetime.utcnow() - received_at).total_seconds())
+        except Exception as e:
+            self.failed += 1
+            log_webhook.error(f"Ошибка обработки вебхука из inbox: event_id={event_id} error={e}")
+            await record_webhook_failure(session, event_id, str(e))
+        finally:
+            self.processing.add(time.perf_counter() - started)
+
+    async def _worker(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                log_webhook.error(f"Ошибка воркера inbox: {e}")
+                claimed = 0
+
+            # Полная пачка — сразу берем следующую, иначе ждем нового события
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "batches": self.batches,
+            "processed": self.processed,
+            "unparsed": self.unparsed,
+            "failed": self.failed,
+            "latency": self.latency.as_dict(),
+            "processing": self.processing.as_dict(),
+        }
+
+
+_inbox: Optional[WebhookInbox] = None
+
+
+def get_webhook_inbox() -> WebhookInbox:
+    global _inbox
+    if _inbox is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _inbox = WebhookInbox(
+            workers=settings.webhook_workers,
+            batch_size=settings.webhook_batch_size,
+            poll_interval=settings.webhook_poll_interval,
+            max_attempts=settings.webhook_max_attempts,
+        )
+    return _inbox
@@ -0,0 +1,256 @@
+"""
+In-memory снапшот каталога квартир.
+
+Каталог меняется несколько раз в день, а читается почти на каждом шаге
+бота. Держим неизменяемый снапшот (квартиры + теги + медиа) в памяти
+процесса и пересобираем его:
+- сразу после commit, который изменил квартиры/теги/медиа (события сессии);
+- по TTL — чтобы подхватить правки, сделанные в других воркерах.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.models import Apartment, ApartmentMedia, ApartmentTag
+from app.logger import log_service
+
+settings = get_settings()
+
+CATALOG_MODELS = (Apartment, ApartmentTag, ApartmentMedia)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Префиксы короче не индексируем: слишком много совпадений
+MIN_PREFIX = 3
+
+
+def tokenize(text: Optional[str]) -> Tuple[str, ...]:
+    """Слова в нижнем регистре (ё -> е)"""
+    if not text:
+        return ()
+    return tuple(TOKEN_RE.findall(text.lower().replace("ё", "е")))
+
+
+@dataclass(frozen=True)
+class MediaView:
+    id: int
+    type: str
+    url: str
+    file_id: Optional[str]
+    sort_order: int
+
+
+@dataclass(frozen=True)
+class ApartmentView:
+    """Отвязанная от сессии копия Apartment (те же имена атрибутов)"""
+
+    id: int
+    title: str
+    district: Optional[str]
+    address_short: Optional[str]
+    guests_max: int
+    price_per_night: Optional[int]
+    beds_text: Optional[str]
+    features_json: Tuple[str, ...]
+    rules_short: Optional[str]
+    map_url: Optional[str]
+    sort_order: int
+    updated_at: Optional[datetime]
+    tags: Tuple[str, ...]
+    media: Tuple[MediaView, ...]
+
+    @classmethod
+    def from_model(cls, apt: Apartment) -> "ApartmentView":
+        return cls(
+            id=apt.id,
+            title=apt.title,
+            district=apt.district,
+            address_short=apt.address_short,
+            guests_max=apt.guests_max,
+            price_per_night=apt.price_per_night,
+            beds_text=apt.beds_text,
+            features_json=tuple(apt.features_json or ()),
+            rules_short=apt.rules_short,
+            map_url=apt.map_url,
+            sort_order=apt.sort_order,
+            updated_at=apt.updated_at,
+            tags=tuple(tag.tag for tag in apt.tags),
+            media=tuple(
+                MediaView(id=m.id, type=m.type, url=m.url, file_id=m.file_id, sort_order=m.sort_order)
+                for m in sorted(apt.media, key=lambda m: (m.sort_order, m.id))
+            ),
+        )
+
+
+class CatalogSnapshot:
+    """Неизменяемый снимок активных квартир с готовыми индексами"""
+
+    def __init__(self, version: int, apartments: Tuple[ApartmentView, ...]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.apartments = apartments
+        self.by_id: Dict[int, ApartmentView] = {apt.id: apt for apt in apartments}
+        self.districts: Tuple[str, ...] = tuple(sorted({apt.district for apt in apartments if apt.district}))
+
+        by_tag: Dict[str, list] = {}
+        for apt in apartments:
+            for tag in apt.tags:
+                by_tag.setdefault(tag, []).append(apt)
+        self.by_tag: Dict[str, Tuple[ApartmentView, ...]] = {tag: tuple(apts) for tag, apts in by_tag.items()}
+
+        # Индекс префиксов слов из названия, района, тегов и удобств:
+        # поиск по тексту — пересечение множеств, без обращения к БД
+        token_index: Dict[str, set] = {}
+        for apt in apartments:
+            words = set()
+            for text in (apt.title, apt.district, apt.address_short, *apt.tags, *apt.features_json):
+                words.update(tokenize(text))
+            for word in words:
+                for end in range(min(MIN_PREFIX, len(word)), len(word) + 1):
+                    token_index.setdefault(word[:end], set()).add(apt.id)
+        self.token_index: Dict[str, frozenset] = {
+            token: frozenset(ids) for token, ids in token_index.items()
+        }
+
+    def get(self, apartment_id: int) -> Optional[ApartmentView]:
+        return self.by_id.get(apartment_id)
+
+    def match_token(self, token: str) -> frozenset:
+        """
+        Квартиры, где есть слово с префиксом token. Окончание запроса
+        отбрасывается до двух букв: «центре» находит «Центр».
+        """
+        shortest = max(min(MIN_PREFIX, len(token)), len(token) - 2)
+        for end in range(len(token), shortest - 1, -1):
+            ids = self.token_index.get(token[:end])
+            if ids:
+                return ids
+        return frozenset()
+
+    def search(self, words: Tuple[str, ...] = (), guests: Optional[int] = None) -> Tuple[ApartmentView, ...]:
+        """Квартиры, подходящие под все слова и вместимость, в порядке каталога"""
+        ids = None
+        for word in words:
+            matched = self.match_token(word)
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                return ()
+        return tuple(
+            apt for apt in self.apartments
+            if (ids is None or apt.id in ids) and (guests is None or apt.guests_max >= guests)
+        )
+
+
+class CatalogCache:
+    """Версионированный кеш каталога с инвалидацией и TTL"""
+
+    def __init__(self, sessionmaker=None, ttl: float = 300):
+        self._sessionmaker = sessionmaker
+        self.ttl = ttl
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+
+    def add_listener(self, listener: Callable[["CatalogSnapshot"], None]):
+        """Вызывать listener(snapshot) после каждой загрузки (прогрев производных кешей)"""
+        self._listeners.append(listener)
+
+    def invalidate(self):
+        """Пометить снапшот устаревшим (пересоберется при следующем чтении)"""
+        self._stale = True
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._snapshot.loaded_at < self.ttl
+        )
+
+    async def get(self) -> CatalogSnapshot:
+        """Текущий снапшот; в БД ходим только если он устарел"""
+        if self._is_fresh():
+            return self._snapshot
+
+        async with self._lock:
+            if self._is_fresh():
+                return self._snapshot
+
+            # Сбрасываем флаг до загрузки: правка во время загрузки снова его выставит
+            self._stale = False
+            try:
+                apartments = await self._load()
+            except BaseException:
+                self._stale = True
+                raise
+
+            self.version += 1
+            self._snapshot = CatalogSnapshot(self.version, apartments)
+            log_service.info(f"Каталог загружен: version={self.version} apartments={len(apartments)}")
+            for listener in self._listeners:
+                listener(self._snapshot)
+            return self._snapshot
+
+    async def _load(self) -> Tuple[ApartmentView, ...]:
+        from app.db.crud import list_apartments
+
+        sessionmaker = self._sessionmaker
+        if sessionmaker is None:
+            from app.db.session import SessionLocal
+            sessionmaker = SessionLocal
+
+        async with sessionmaker() as session:
+            apartments = await list_apartments(session)
+            return tuple(ApartmentView.from_model(apt) for apt in apartments)
+
+
+catalog = CatalogCache(ttl=settings.catalog_cache_ttl)
+
+
+async def get_catalog() -> CatalogSnapshot:
+    return await catalog.get()
+
+
+def invalidate_catalog():
+    catalog.invalidate()
+
+
+# ============= ИНВАЛИДАЦИЯ ПО ИЗМЕНЕНИЯМ =============
+
+def _touches_catalog(instances) -> bool:
+    return any(isinstance(obj, CATALOG_MODELS) for obj in instances)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_catalog_dirty(session, flush_context):
+    if _touches_catalog(session.new) or _touches_catalog(session.dirty) or _touches_catalog(session.deleted):
+        session.info["catalog_dirty"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_catalog_dirty_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in CATALOG_MODELS:
+        orm_execute_state.session.info["catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("catalog_dirty", False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _reset_on_rollback(session, previous_transaction):
+    session.info.pop("catalog_dirty", None)
@@ -0,0 +1,99 @@
+"""
+Отправка медиа квартир в Telegram.
+
+После первой загрузки по URL Telegram возвращает file_id — сохраняем его в
+apartment_media.file_id и дальше отправляем по нему: Telegram не скачивает
+и не обрабатывает файл заново, отправка быстрее и без лишнего трафика.
+"""
+
+from typing import List, Optional, Sequence
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMediaPhoto, InputMediaVideo, Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.crud import save_media_file_ids
+from app.logger import log_service
+
+# Telegram принимает в media group от 2 до 10 элементов
+MEDIA_GROUP_LIMIT = 10
+
+
+def message_file_id(message: Message) -> Optional[str]:
+    """file_id из отправленного сообщения (для фото — самый большой размер)"""
+    if message.photo:
+        return message.photo[-1].file_id
+    if message.video:
+        return message.video.file_id
+    return None
+
+
+async def _send_chunk(bot, chat_id, chunk, sources, caption, limiter) -> List[Message]:
+    async def call():
+        if len(chunk) == 1:
+            item, source = chunk[0], sources[0]
+            if item.type == "video":
+                return [await bot.send_video(chat_id=chat_id, video=source, caption=caption)]
+            return [await bot.send_photo(chat_id=chat_id, photo=source, caption=caption)]
+
+        media = []
+        for index, (item, source) in enumerate(zip(chunk, sources)):
+            media_class = InputMediaVideo if item.type == "video" else InputMediaPhoto
+            media.append(media_class(media=source, caption=caption if index == 0 else None))
+        return await bot.send_media_group(chat_id=chat_id, media=media)
+
+    if limiter is not None:
+        return await limiter.call(chat_id, call)
+    return await call()
+
+
+async def send_apartment_media(
+    bot,
+    chat_id,
+    media: Sequence,
+    caption: Optional[str] = None,
+    session: Optional[AsyncSession] = None,
+    limiter=None,
+) -> List[Message]:
+    """
+    Отправить медиа квартиры: одно — отдельным сообщением, несколько —
+    альбомами по 10. media — ApartmentMedia или MediaView из каталога
+    (нужны id, type, url, file_id), уже в порядке показа.
+
+    Если сохраненный file_id отвергнут (например, сменили бота), альбом
+    отправляется заново по URL и file_id перезаписываются. Новые file_id
+    пишутся в session (сессия update в хендлерах) или в отдельной сессии.
+    """
+    messages: List[Message] = []
+    new_file_ids = {}
+
+    for start in range(0, len(media), MEDIA_GROUP_LIMIT):
+        chunk = list(media[start:start + MEDIA_GROUP_LIMIT])
+        sources = [item.file_id or item.url for item in chunk]
+        chunk_caption = caption if start == 0 else None
+
+        try:
+            sent = await _send_chunk(bot, chat_id, chunk, sources, chunk_caption, limiter)
+        except TelegramBadRequest as e:
+            if not any(item.file_id for item in chunk):
+                raise
+            log_service.warning(f"file_id отвергнут Telegram, отправляем по URL: {e.message}")
+            sources = [item.url for item in chunk]
+            sent = await _send_chunk(bot, chat_id, chunk, sources, chunk_caption, limiter)
+
+        for item, source, message in zip(chunk, sources, sent):
+            file_id = message_file_id(message)
+            if file_id and source != item.file_id:
+                new_file_ids[item.id] = file_id
+        messages.extend(sent)
+
+    if new_file_ids:
+        if session is not None:
+            await save_media_file_ids(session, new_file_ids)
+        else:
+            from app.db.session import SessionLocal
+            async with SessionLocal() as own_session:
+                await save_media_file_ids(own_session, new_file_ids)
+        log_service.info(f"Сохранены file_id для {len(new_file_ids)} медиа")
+
+    return messages
@@ -4,14 +4,20 @@
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import delete, insert, select, update
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import hashlib
 
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
 from app.config import get_settings
 from app.db.models import Apartment, ChannelPost, ChannelPostKind
 from app.db.session import SessionLocal
-from app.bot.utils import build_booking_url, format_apartment_card
+from app.bot.utils import build_booking_url
+from app.services.rate_limit import get_rate_limiter
 from app.logger import log_service
 
 settings = get_settings()
@@ -23,9 +29,12 @@ async def get_bot():
     return bot
 
 
-async def publish_channel_menu():
+async def publish_channel_menu(force: bool = True):
     """
     Опубликовать главное меню в канал и закрепить.
+    
+    force=False (плановое обновление): если меню уже опубликовано, пост
+    редактируется на месте, а при неизменном content_hash не трогается.
     """
     bot = await get_bot()
     
@@ -45,8 +54,6 @@ async def publish_channel_menu():
     """.strip()
     
     # Inline кнопки
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    
     buttons = [
         [InlineKeyboardButton(text="✅ Забронировать", url=booking_url)],
         [InlineKeyboardButton(text="🏠 Каталог", url="https://t.me/my_apartments_bot?start=catalog")],
@@ -58,31 +65,52 @@ async def publish_channel_menu():
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     
-    # Публикуем
-    msg = await bot.send_message(
-        chat_id=settings.channel_id,
-        text=menu_text,
-        reply_markup=keyboard,
-        parse_mode="Markdown",
-    )
-    
-    # Закрепляем
-    await bot.pin_chat_message(
-        chat_id=settings.channel_id,
-        message_id=msg.message_id,
-    )
+    limiter = get_rate_limiter()
+    content_hash = post_content_hash(menu_text, keyboard)
     
-    # Сохраняем в БД
     async with SessionLocal() as session:
-        # Ищем старый меню
+        # Ищем старое меню
         existing = await session.execute(
             select(ChannelPost).where(ChannelPost.kind == ChannelPostKind.MENU)
         )
         old_post = existing.scalar_one_or_none()
         
+        if not force and old_post and old_post.message_id:
+            if old_post.content_hash == content_hash:
+                return old_post.message_id
+            
+            # Меню изменилось — правим закрепленный пост на месте
+            await limiter.call(settings.channel_id, lambda: bot.edit_message_text(
+                chat_id=settings.channel_id,
+                message_id=old_post.message_id,
+                text=menu_text,
+                reply_markup=keyboard,
+                parse_mode="Markdown",
+            ))
+            old_post.content_hash = content_hash
+            old_post.last_published_at = datetime.utcnow()
+            await session.commit()
+            log_service.info(f"Меню обновлено: message_id={old_post.message_id}")
+            return old_post.message_id
+        
+        # Публикуем
+        msg = await limiter.call(settings.channel_id, lambda: bot.send_message(
+            chat_id=settings.channel_id,
+            text=menu_text,
+            reply_markup=keyboard,
+            parse_mode="Markdown",
+        ))
+        
+        # Закрепляем
+        await limiter.call(settings.channel_id, lambda: bot.pin_chat_message(
+            chat_id=settings.channel_id,
+            message_id=msg.message_id,
+        ))
+        
+        # Сохраняем в БД
         if old_post:
-            old_post.message_id = msg.message_id
-            old_post.last_published_at = None
+            post = old_post
+            post.message_id = msg.message_id
         else:
             post = ChannelPost(
                 kind=ChannelPostKind.MENU,
@@ -90,37 +118,25 @@ async def publish_channel_menu():
                 message_id=msg.message_id,
             )
             session.add(post)
+        post.content_hash = content_hash
+        post.last_published_at = datetime.utcnow()
         
         await session.commit()
     
-    log_service.info("Меню опубликовано", message_id=msg.message_id)
+    log_service.info(f"Меню опубликовано: message_id={msg.message_id}")
     
     return msg.message_id
 
 
-async def publish_all_apartments():
-    """
-    Опубликовать все активные квартиры отдельными постами.
-    """
-    bot = await get_bot()
-    
-    async with SessionLocal() as session:
-        result = await session.execute(
-            select(Apartment).where(Apartment.is_active == True)
-            .order_by(Apartment.sort_order)
-        )
-        apartments = result.scalars().all()
+def render_apartment_post(apt: Apartment) -> Tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура поста квартиры в канале"""
+    booking_url = build_booking_url(apt.id, source="tg_channel", medium="channel")
     
-    count = 0
+    # Текст карточки
+    features = apt.features_json or []
+    features_text = "\n".join([f"✨ {f}" for f in features[:5]])
     
-    for apt in apartments:
-        booking_url = build_booking_url(apt.id, source="tg_channel", medium="channel")
-        
-        # Текст карточки
-        features = apt.features_json or []
-        features_text = "\n".join([f"✨ {f}" for f in features[:5]])
-        
-        text = f"""
+    text = f"""
 🏠 **{apt.title}** — {apt.district}
 
 {features_text}
@@ -129,83 +145,391 @@ async def publish_all_apartments():
 🛏️ {apt.beds_text}
 
 💰 Точная цена и свободные даты — по кнопке
-        """.strip()
-        
-        # Inline кнопки
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        
-        buttons = [
-            [InlineKeyboardButton(text="✅ Забронировать", url=booking_url)],
-        ]
-        
-        if apt.map_url:
-            buttons.append([InlineKeyboardButton(text="📍 На карте", url=apt.map_url)])
+    """.strip()
+    
+    # Inline кнопки
+    buttons = [
+        [InlineKeyboardButton(text="✅ Забронировать", url=booking_url)],
+    ]
+    
+    if apt.map_url:
+        buttons.append([InlineKeyboardButton(text="📍 На карте", url=apt.map_url)])
+    
+    return text, InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def post_content_hash(text: str, keyboard=None) -> str:
+    """sha256 содержимого поста: текст + кнопки"""
+    payload = text
+    if keyboard is not None:
+        payload += "\n" + keyboard.model_dump_json(exclude_none=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PublishResult:
+    """Итог прогона публикации"""
+    started_at: datetime
+    total: int = 0
+    published: int = 0
+    skipped: int = 0
+    failed: List[int] = field(default_factory=list)
+    
+    @property
+    def done(self) -> int:
+        return self.published + self.skipped
+    
+    @property
+    def complete(self) -> bool:
+        return not self.failed
+
+
+class ChannelPostBatch:
+    """
+    Накопитель изменений ChannelPost за прогон публикации.
+    
+    Существующие посты канала загружаются одним запросом в словарь
+    apartment_id -> ChannelPost. Изменения копятся в памяти и пишутся
+    пачкой: bulk UPDATE по первичному ключу, bulk INSERT новых строк и один
+    DELETE — с одним commit. Сброс делается на каждом checkpoint_size-м
+    изменении (прогресс для продолжения прерванного прогона) и в конце.
+    """
+    
+    def __init__(self, session: AsyncSession, checkpoint_size: int = 25):
+        self.session = session
+        self.checkpoint_size = max(1, checkpoint_size)
+        self.posts: Dict[int, ChannelPost] = {}
+        self._updates: Dict[int, dict] = {}
+        self._inserts: Dict[int, dict] = {}
+        self._deletes: List[int] = []
+        self._lock = asyncio.Lock()
+    
+    async def load(self, kind: ChannelPostKind = ChannelPostKind.APARTMENT) -> Dict[int, ChannelPost]:
+        result = await self.session.execute(
+            select(ChannelPost).where(
+                ChannelPost.kind == kind,
+                ChannelPost.channel_id == settings.channel_id,
+            )
+        )
+        self.posts = {post.apartment_id: post for post in result.scalars().all()}
+        return self.posts
+    
+    @property
+    def pending(self) -> int:
+        return len(self._updates) + len(self._inserts) + len(self._deletes)
+    
+    def save(
+        self,
+        apartment_id: int,
+        message_id: int,
+        published_at: datetime,
+        content_hash: Optional[str] = None,
+    ):
+        """Запомнить message_id и хеш поста квартиры"""
+        values = {
+            "message_id": message_id,
+            "last_published_at": published_at,
+            "content_hash": content_hash,
+            "updated_at": published_at,
+        }
+        post = self.posts.get(apartment_id)
+        if post is not None:
+            self._updates[post.id] = {"id": post.id, **values}
+        else:
+            self._inserts[apartment_id] = {
+                "apartment_id": apartment_id,
+                "kind": ChannelPostKind.APARTMENT,
+                "channel_id": settings.channel_id,
+                "created_at": published_at,
+                **values,
+            }
+    
+    def delete(self, post: ChannelPost):
+        self._updates.pop(post.id, None)
+        self._deletes.append(post.id)
+    
+    async def checkpoint(self):
+        if self.pending >= self.checkpoint_size:
+            await self.flush()
+    
+    async def flush(self):
+        """Записать накопленное одной транзакцией"""
+        async with self._lock:
+            updates, self._updates = list(self._updates.values()), {}
+            inserts, self._inserts = list(self._inserts.values()), {}
+            deletes, self._deletes = self._deletes, []
+            if not (updates or inserts or deletes):
+                return
+            
+            if updates:
+                await self.session.execute(update(ChannelPost), updates)
+            if inserts:
+                rows = await self.session.execute(
+                    insert(ChannelPost).returning(ChannelPost), inserts,
+                )
+                # Вставленные посты на следующем checkpoint уже обновляются
+                for post in rows.scalars().all():
+                    self.posts[post.apartment_id] = post
+            if deletes:
+                await self.session.execute(
+                    delete(ChannelPost).where(ChannelPost.id.in_(deletes))
+                )
+            await self.session.commit()
+
+
+async def publish_all_apartments(resume_since: Optional[datetime] = None) -> PublishResult:
+    """
+    Опубликовать все активные квартиры отдельными постами.
+    
+    Отправка идет параллельно (publish_concurrency) через общий лимитер:
+    темп ограничен лимитами Telegram, на 429 выжидается retry_after.
+    Посты сохраняются пачками (ChannelPostBatch), поэтому прерванный
+    прогон можно продолжить: с resume_since пропускаются квартиры,
+    опубликованные после этого момента. Ошибка на одной квартире не
+    останавливает остальные — она попадает в result.failed.
+    """
+    bot = await get_bot()
+    limiter = get_rate_limiter()
+    result = PublishResult(started_at=datetime.utcnow())
+    
+    async with SessionLocal() as session:
+        apartments = (await session.execute(
+            select(Apartment).where(Apartment.is_active == True)
+            .order_by(Apartment.sort_order)
+        )).scalars().all()
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+        batch = ChannelPostBatch(session, settings.publish_checkpoint_size)
+        posts = await batch.load()
         
-        # Публикуем
-        msg = await bot.send_message(
-            chat_id=settings.channel_id,
-            text=text,
-            reply_markup=keyboard,
-            parse_mode="Markdown",
-        )
+        result.total = len(apartments)
+        semaphore = asyncio.Semaphore(max(1, settings.publish_concurrency))
         
-        # Сохраняем в БД
-        async with SessionLocal() as session:
-            existing = await session.execute(
-                select(ChannelPost).where(
-                    ChannelPost.apartment_id == apt.id,
-                    ChannelPost.kind == ChannelPostKind.APARTMENT,
-                )
-            )
-            post = existing.scalar_one_or_none()
+        async def publish_one(apt: Apartment):
+            post = posts.get(apt.id)
+            if resume_since and post and post.last_published_at and post.last_published_at >= resume_since:
+                result.skipped += 1
+                return
             
-            if post:
-                post.message_id = msg.message_id
-            else:
-                post = ChannelPost(
-                    apartment_id=apt.id,
-                    kind=ChannelPostKind.APARTMENT,
-                    channel_id=settings.channel_id,
-                    message_id=msg.message_id,
-                )
-                session.add(post)
+            text, keyboard = render_apartment_post(apt)
+            async with semaphore:
+                try:
+                    msg = await limiter.call(settings.channel_id, lambda: bot.send_message(
+                        chat_id=settings.channel_id,
+                        text=text,
+                        reply_markup=keyboard,
+                        parse_mode="Markdown",
+                    ))
+                except Exception as e:
+                    result.failed.append(apt.id)
+                    log_service.error(f"Ошибка публикации квартиры {apt.id}: {e}")
+                    return
             
-            await session.commit()
+            batch.save(
+                apt.id, msg.message_id, datetime.utcnow(),
+                content_hash=post_content_hash(text, keyboard),
+            )
+            result.published += 1
+            log_service.info(f"Квартира опубликована: apartment_id={apt.id}, message_id={msg.message_id}")
+            await batch.checkpoint()
         
-        count += 1
-        log_service.info("Квартира опубликована", apartment_id=apt.id, message_id=msg.message_id)
+        try:
+            await asyncio.gather(*(publish_one(apt) for apt in apartments))
+        finally:
+            await batch.flush()
+    
+    log_service.info(
+        f"Публикация квартир: {result.published} опубликовано, "
+        f"{result.skipped} пропущено, {len(result.failed)} с ошибкой"
+    )
+    return result
+
+
+@dataclass
+class SyncResult:
+    """Итог инкрементальной синхронизации постов квартир"""
+    created: int = 0
+    edited: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    failed: List[int] = field(default_factory=list)
     
-    return count
+    @property
+    def api_calls(self) -> int:
+        return self.created + self.edited + self.deleted
 
 
-async def publish_catalog():
+async def sync_apartments() -> SyncResult:
     """
-    Опубликовать каталог всех квартир в один пост.
+    Инкрементальная синхронизация постов квартир с каналом.
+    
+    Каждый пост рендерится и хешируется; запрос к Telegram делается только
+    при расхождении с ChannelPost.content_hash: пост редактируется, если
+    изменился, отправляется, если его нет, и удаляется, если квартира
+    больше не активна. Число вызовов API пропорционально изменениям.
     """
+    from aiogram.exceptions import TelegramBadRequest
+    
     bot = await get_bot()
+    limiter = get_rate_limiter()
+    result = SyncResult()
     
     async with SessionLocal() as session:
-        result = await session.execute(
+        apartments = (await session.execute(
             select(Apartment).where(Apartment.is_active == True)
-        )
-        apartments = result.scalars().all()
+            .order_by(Apartment.sort_order)
+        )).scalars().all()
         
-        # Ищем пост каталога
-        catalog_post = await session.execute(
-            select(ChannelPost).where(ChannelPost.kind == ChannelPostKind.CATALOG)
-        )
-        catalog_post = catalog_post.scalar_one_or_none()
+        batch = ChannelPostBatch(session, settings.publish_checkpoint_size)
+        posts = await batch.load()
+        
+        active_ids = {apt.id for apt in apartments}
+        semaphore = asyncio.Semaphore(max(1, settings.publish_concurrency))
+        
+        async def send(apt: Apartment, text: str, keyboard, content_hash: str):
+            msg = await limiter.call(settings.channel_id, lambda: bot.send_message(
+                chat_id=settings.channel_id,
+                text=text,
+                reply_markup=keyboard,
+                parse_mode="Markdown",
+            ))
+            batch.save(apt.id, msg.message_id, datetime.utcnow(), content_hash)
+            result.created += 1
+        
+        async def sync_one(apt: Apartment):
+            text, keyboard = render_apartment_post(apt)
+            content_hash = post_content_hash(text, keyboard)
+            post = posts.get(apt.id)
+            
+            if post and post.message_id and post.content_hash == content_hash:
+                result.unchanged += 1
+                return
+            
+            async with semaphore:
+                try:
+                    if not (post and post.message_id):
+                        await send(apt, text, keyboard, content_hash)
+                    else:
+                        try:
+                            await limiter.call(settings.channel_id, lambda: bot.edit_message_text(
+                                chat_id=settings.channel_id,
+                                message_id=post.message_id,
+                                text=text,
+                                reply_markup=keyboard,
+                                parse_mode="Markdown",
+                            ))
+                            result.edited += 1
+                            batch.save(apt.id, post.message_id, datetime.utcnow(), content_hash)
+                        except TelegramBadRequest as e:
+                            if "not modified" in e.message:
+                                result.unchanged += 1
+                                batch.save(apt.id, post.message_id, datetime.utcnow(), content_hash)
+                            elif "not found" in e.message:
+                                # Пост удалили из канала вручную — публикуем заново
+                                await send(apt, text, keyboard, content_hash)
+                            else:
+                                raise
+                except Exception as e:
+                    result.failed.append(apt.id)
+                    log_service.error(f"Ошибка синхронизации квартиры {apt.id}: {e}")
+                    return
+            await batch.checkpoint()
+        
+        async def remove_one(post: ChannelPost):
+            async with semaphore:
+                try:
+                    if post.message_id:
+                        try:
+                            await limiter.call(settings.channel_id, lambda: bot.delete_message(
+                                chat_id=settings.channel_id,
+                                message_id=post.message_id,
+                            ))
+                        except TelegramBadRequest as e:
+                            # Уже удален из канала
+                            log_service.warning(f"Пост {post.message_id} не удален: {e.message}")
+                except Exception as e:
+                    result.failed.append(post.apartment_id)
+                    log_service.error(f"Ошибка удаления поста квартиры {post.apartment_id}: {e}")
+                    return
+            batch.delete(post)
+            result.deleted += 1
+            await batch.checkpoint()
+        
+        stale = [post for apartment_id, post in posts.items() if apartment_id not in active_ids]
+        try:
+            await asyncio.gather(
+                *(sync_one(apt) for apt in apartments),
+                *(remove_one(post) for post in stale),
+            )
+        finally:
+            await batch.flush()
+    
+    log_service.info(
+        f"Синхронизация квартир: {result.created} создано, {result.edited} изменено, "
+        f"{result.deleted} удалено, {result.unchanged} без изменений, "
+        f"{len(result.failed)} с ошибкой"
+    )
+    return result
+
+
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+def render_catalog_pages(
+    apartments: List[Apartment],
+    page_size: int = 20,
+    limit: int = TELEGRAM_TEXT_LIMIT,
+) -> List[str]:
+    """
+    Разбить каталог на страницы.
+    
+    На странице не больше page_size квартир, поэтому изменение одной
+    квартиры затрагивает только ее страницу. Если текст страницы не влезает
+    в лимит сообщения Telegram, страница закрывается раньше. Заголовок не
+    содержит общего числа страниц — иначе добавление страницы меняло бы все.
+    Текст собирается через join, без повторных конкатенаций.
+    """
+    pages: List[str] = []
     
-    # Строим текст каталога
-    catalog_text = "📚 **Полный каталог квартир:**\n\n"
+    def header(index: int) -> str:
+        if index == 0:
+            return "📚 **Полный каталог квартир:**\n\n"
+        return f"📚 **Каталог квартир — страница {index + 1}**\n\n"
+    
+    parts: List[str] = [header(0)]
+    length = len(parts[0])
+    count = 0
     
     for apt in apartments:
-        catalog_text += f"🏠 {apt.title}\n"
-        catalog_text += f"   📍 {apt.district} | 👥 {apt.guests_max} гостей\n\n"
+        entry = (
+            f"🏠 {apt.title}\n"
+            f"   📍 {apt.district} | 👥 {apt.guests_max} гостей\n\n"
+        )
+        if count and (count >= page_size or length + len(entry) > limit):
+            pages.append("".join(parts))
+            parts = [header(len(pages))]
+            length = len(parts[0])
+            count = 0
+        parts.append(entry)
+        length += len(entry)
+        count += 1
+    
+    pages.append("".join(parts))
+    return pages
+
+
+async def publish_catalog() -> SyncResult:
+    """
+    Опубликовать каталог всех квартир постами-страницами.
+    
+    Каждая страница — отдельный ChannelPost(kind=CATALOG, page=N) со своим
+    content_hash: редактируются только изменившиеся страницы, недостающие
+    отправляются, лишние (каталог стал короче) удаляются.
+    """
+    from aiogram.exceptions import TelegramBadRequest
     
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    bot = await get_bot()
+    limiter = get_rate_limiter()
+    result = SyncResult()
     
     booking_url = build_booking_url(0, source="tg_channel", medium="channel")
     buttons = [
@@ -215,32 +539,103 @@ async def publish_catalog():
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     
-    if catalog_post and catalog_post.message_id:
-        # Обновляем
-        await bot.edit_message_text(
-            chat_id=settings.channel_id,
-            message_id=catalog_post.message_id,
-            text=catalog_text,
-            reply_markup=keyboard,
-            parse_mode="Markdown",
-        )
-        log_service.info("Каталог обновлен")
-    else:
-        # Создаем
-        msg = await bot.send_message(
-            chat_id=settings.channel_id,
-            text=catalog_text,
-            reply_markup=keyboard,
-            parse_mode="Markdown",
-        )
+    async with SessionLocal() as session:
+        apartments = (await session.execute(
+            select(Apartment).where(Apartment.is_active == True)
+            .order_by(Apartment.sort_order, Apartment.id)
+        )).scalars().all()
         
-        async with SessionLocal() as session:
-            post = ChannelPost(
-                kind=ChannelPostKind.CATALOG,
-                channel_id=settings.channel_id,
-                message_id=msg.message_id,
+        # Страницы каталога одним запросом
+        posts = (await session.execute(
+            select(ChannelPost).where(
+                ChannelPost.kind == ChannelPostKind.CATALOG,
+                ChannelPost.channel_id == settings.channel_id,
             )
-            session.add(post)
-            await session.commit()
+        )).scalars().all()
+        posts_by_page = {post.page: post for post in posts}
+        
+        pages = render_catalog_pages(apartments, settings.catalog_page_size)
         
-        log_service.info("Каталог опубликован", message_id=msg.message_id)
\ No newline at end of file
+        async def send(index: int, text: str, content_hash: str):
+            msg = await limiter.call(settings.channel_id, lambda: bot.send_message(
+                chat_id=settings.channel_id,
+                text=text,
+                reply_markup=keyboard,
+                parse_mode="Markdown",
+            ))
+            post = posts_by_page.get(index)
+            if post is None:
+                post = ChannelPost(
+                    kind=ChannelPostKind.CATALOG,
+                    channel_id=settings.channel_id,
+                    page=index,
+                )
+                session.add(post)
+            post.message_id = msg.message_id
+            post.content_hash = content_hash
+            post.last_published_at = datetime.utcnow()
+            result.created += 1
+        
+        # Страницы по порядку: в канале они должны идти друг за другом
+        for index, text in enumerate(pages):
+            content_hash = post_content_hash(text, keyboard)
+            post = posts_by_page.get(index)
+            
+            if post and post.message_id and post.content_hash == content_hash:
+                result.unchanged += 1
+                continue
+            
+            try:
+                if not (post and post.message_id):
+                    await send(index, text, content_hash)
+                    continue
+                
+                try:
+                    await limiter.call(settings.channel_id, lambda: bot.edit_message_text(
+                        chat_id=settings.channel_id,
+                        message_id=post.message_id,
+                        text=text,
+                        reply_markup=keyboard,
+                        parse_mode="Markdown",
+                    ))
+                    result.edited += 1
+                except TelegramBadRequest as e:
+                    if "not modified" in e.message:
+                        result.unchanged += 1
+                    elif "not found" in e.message:
+                        await send(index, text, content_hash)
+                        continue
+                    else:
+                        raise
+                post.content_hash = content_hash
+                post.last_published_at = datetime.utcnow()
+            except Exception as e:
+                result.failed.append(index)
+                log_service.error(f"Ошибка публикации страницы каталога {index}: {e}")
+        
+        # Каталог стал короче — лишние страницы удаляем
+        for post in posts:
+            if post.page < len(pages):
+                continue
+            try:
+                if post.message_id:
+                    try:
+                        await limiter.call(settings.channel_id, lambda: bot.delete_message(
+                            chat_id=settings.channel_id,
+                            message_id=post.message_id,
+                        ))
+                    except TelegramBadRequest as e:
+                        log_service.warning(f"Пост {post.message_id} не удален: {e.message}")
+                await session.delete(post)
+                result.deleted += 1
+            except Exception as e:
+                result.failed.append(post.page)
+                log_service.error(f"Ошибка удаления страницы каталога {post.page}: {e}")
+        
+        await session.commit()
+    
+    log_service.info(
+        f"Каталог: {len(pages)} страниц, {result.created} создано, "
+        f"{result.edited} изменено, {result.deleted} удалено"
+    )
+    return result
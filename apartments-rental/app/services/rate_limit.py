@@ -0,0 +1,135 @@
+"""
+Ограничение частоты запросов к Telegram Bot API.
+
+Лимиты Telegram: около 30 сообщений в секунду на бота и около 20 сообщений
+в минуту в одну группу или канал. При превышении API отвечает 429 с
+retry_after — до его истечения запросы в этот чат бессмысленны.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, TypeVar, Union
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.logger import log_service
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Token bucket: rate токенов в секунду, не больше capacity про запас.
+
+    Ожидающие выстраиваются в очередь на lock, поэтому токены выдаются
+    в порядке обращения.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько ждать до следующего токена (0 — токен взят)"""
+        now = self.clock()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                wait = self.delay()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    def block(self, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд (ответ 429)"""
+        now = self.clock()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = max(self.updated, now)
+
+
+class TelegramRateLimiter:
+    """Глобальный лимит бота плюс лимит на каждый чат"""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate_per_minute: int = 20,
+        max_retries: int = 5,
+    ):
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate_per_minute / 60.0
+        self.max_retries = max_retries
+        self.chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+        self.retries = 0
+
+    def bucket_for(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    async def acquire(self, chat_id: Union[int, str]):
+        await self.bucket_for(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+    async def call(
+        self,
+        chat_id: Union[int, str],
+        method: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Выполнить запрос в чат с учетом лимитов.
+
+        На TelegramRetryAfter чат блокируется на retry_after (для всех
+        конкурентных отправителей сразу), запрос повторяется.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(chat_id)
+            try:
+                return await method()
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.retries += 1
+                log_service.warning(
+                    f"Telegram 429 в чате {chat_id}: ждем {e.retry_after} с "
+                    f"(попытка {attempt}/{self.max_retries})"
+                )
+                self.bucket_for(chat_id).block(e.retry_after)
+
+
+_limiter = None
+
+
+def get_rate_limiter() -> TelegramRateLimiter:
+    """Общий лимитер на процесс: все отправки бота делят одни и те же лимиты"""
+    global _limiter
+    if _limiter is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _limiter = TelegramRateLimiter(
+            global_rate=settings.tg_global_rate,
+            chat_rate_per_minute=settings.tg_chat_rate_per_minute,
+            max_retries=settings.tg_max_retries,
+        )
+    return _limiter
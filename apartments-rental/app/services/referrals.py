@@ -10,6 +10,7 @@ from typing import Optional
 from app.db.models import (
     ReferralCode, Booking, Payout, PayoutStatus, ReferralEvent,
 )
+from app.db.session import commit_or_flush
 from app.config import get_settings
 from app.logger import log_service
 
@@ -35,10 +36,7 @@ async def create_payout_for_booking(
     )
     
     if existing.scalar_one_or_none():
-        log_service.warning(
-            "Выплата уже существует",
-            booking_id=booking.id,
-        )
+        log_service.warning(f"Выплата уже существует: booking_id={booking.id}")
         return None
     
     # Расчет суммы
@@ -58,14 +56,10 @@ async def create_payout_for_booking(
     )
     
     session.add(payout)
-    await session.commit()
-    await session.refresh(payout)
+    await commit_or_flush(session, payout)
     
     log_service.info(
-        "Выплата создана",
-        payout_id=payout.id,
-        booking_id=booking.id,
-        amount=amount,
+        f"Выплата создана: payout_id={payout.id} booking_id={booking.id} amount={amount}"
     )
     
     return payout
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Планировщик фоновых задач (APScheduler).
+
+Расписание хранится в БД (SQLAlchemyJobStore, таблица apscheduler_jobs),
+так что время следующего запуска переживает рестарты. Выполняет задачи
+только один воркер — лидер, удерживающий advisory lock в Postgres; остальные
+периодически пытаются перехватить лидерство. Каждый запуск записывается в
+job_runs с длительностью и результатом.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import get_settings
+from app.db.crud import record_job_run, rollup_daily_stats
+from app.db.session import SessionLocal, engine
+from app.logger import log_service
+
+settings = get_settings()
+
+# Ключ pg_advisory_lock лидера планировщика (любой постоянный bigint)
+LEADER_LOCK_KEY = 0x41505453
+
+
+# ============= JOBS =============
+
+async def job_catalog_sync():
+    """Синхронизация постов квартир и страниц каталога"""
+    from app.services.publishing import publish_catalog, sync_apartments
+    await sync_apartments()
+    await publish_catalog()
+
+
+async def job_menu_refresh():
+    """Обновление закрепленного меню канала (без перепубликации)"""
+    from app.services.publishing import publish_channel_menu
+    await publish_channel_menu(force=False)
+
+
+async def job_stats_rollup():
+    """Дневные агрегаты за вчера и сегодня"""
+    today = datetime.utcnow().date()
+    async with SessionLocal() as session:
+        for day in (today - timedelta(days=1), today):
+            await rollup_daily_stats(session, day)
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    func: Callable[[], Awaitable[None]]
+    minutes: int
+
+
+JOBS: Dict[str, JobSpec] = {
+    "catalog_sync": JobSpec(job_catalog_sync, settings.scheduler_catalog_sync_minutes),
+    "menu_refresh": JobSpec(job_menu_refresh, settings.scheduler_menu_refresh_minutes),
+    "stats_rollup": JobSpec(job_stats_rollup, settings.scheduler_stats_rollup_minutes),
+}
+
+
+async def run_job(job_id: str, sessionmaker=None):
+    """
+    Точка входа всех задач планировщика.
+
+    Задачи сохраняются в job store ссылкой на эту функцию и id задачи,
+    поэтому переименование job_* функций не ломает сохраненное расписание.
+    """
+    sessionmaker = sessionmaker or SessionLocal
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    status, error = "ok", None
+
+    try:
+        await JOBS[job_id].func()
+    except Exception as e:
+        status, error = "error", str(e)[:1000]
+        log_service.error(f"Задача {job_id} завершилась ошибкой: {e}")
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    async with sessionmaker() as session:
+        await record_job_run(
+            session,
+            job_id=job_id,
+            status=status,
+            started_at=started_at,
+            finished_at=datetime.utcnow(),
+            duration_ms=duration_ms,
+            error=error,
+        )
+    log_service.info(f"Задача {job_id}: {status}, {duration_ms} мс")
+
+
+# ============= LEADER ELECTION =============
+
+def sync_database_url(url: str) -> str:
+    """URL для синхронного драйвера (job store APScheduler не асинхронный)"""
+    return url.replace("+asyncpg", "+psycopg").replace("+aiosqlite", "")
+
+
+class LeaderLock:
+    """
+    Лидерство через сессионный pg_try_advisory_lock.
+
+    Lock живет, пока открыто соединение: если воркер упал или соединение
+    оборвалось, Postgres снимает его сам, и лидером становится другой воркер.
+    Соединение отдельное (NullPool, слот основного пула не занимает) и в
+    AUTOCOMMIT: lock сессионный, открытая транзакция ему не нужна, а
+    "idle in transaction" держало бы горизонт VACUUM и обрывалось бы по
+    idle_in_transaction_session_timeout вместе с лидерством.
+    Без Postgres (SQLite в разработке) воркер один — он всегда лидер.
+    """
+
+    def __init__(self, engine, key: int = LEADER_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self.conn = None
+        self._lock_engine = None
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    async def acquire(self) -> bool:
+        if not self.supported:
+            return True
+        if self._lock_engine is None:
+            self._lock_engine = create_async_engine(
+                self.engine.url, poolclass=NullPool, isolation_level="AUTOCOMMIT"
+            )
+        conn = await self._lock_engine.connect()
+        try:
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            )
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self.conn = conn
+        return True
+
+    async def check(self) -> bool:
+        """Соединение с lock еще живо"""
+        if not self.supported:
+            return True
+        if self.conn is None:
+            return False
+        try:
+            await self.conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            await self.release()
+            return False
+
+    async def release(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        except Exception:
+            pass
+        finally:
+            await conn.close()
+
+    async def close(self):
+        """Снять lock и закрыть engine соединения lock"""
+        await self.release()
+        if self._lock_engine is not None:
+            await self._lock_engine.dispose()
+            self._lock_engine = None
+
+
+# ============= SCHEDULER =============
+
+class JobScheduler:
+    """Планировщик, который запускается только на воркере-лидере"""
+
+    def __init__(self, lock: LeaderLock, check_interval: int = 30):
+        self.lock = lock
+        self.check_interval = check_interval
+        self.scheduler = None
+        self._jobstore = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.scheduler is not None
+
+    def build(self):
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        # Job store создает свой sync engine — закрывается в _shutdown_scheduler
+        self._jobstore = SQLAlchemyJobStore(url=sync_database_url(settings.database_url))
+        scheduler = AsyncIOScheduler(
+            jobstores={"default": self._jobstore},
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300},
+            timezone="UTC",
+        )
+        return scheduler
+
+    def ensure_jobs(self):
+        """
+        Добавить недостающие задачи. Уже сохраненные не пересоздаются —
+        иначе каждый рестарт сдвигал бы время следующего запуска; меняется
+        только интервал, если его поменяли в настройках.
+        """
+        for job_id, spec in JOBS.items():
+            job = self.scheduler.get_job(job_id)
+            if job is None:
+                self.scheduler.add_job(
+                    run_job, "interval", minutes=spec.minutes, args=[job_id], id=job_id,
+                )
+            elif job.trigger.interval != timedelta(minutes=spec.minutes):
+                self.scheduler.reschedule_job(job_id, trigger="interval", minutes=spec.minutes)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._leader_loop())
+
+    async def _leader_loop(self):
+        while True:
+            await self.elect()
+            await asyncio.sleep(self.check_interval)
+
+    async def elect(self):
+        """
+        Один шаг выбора лидера. Если запуск планировщика не удался (job store
+        не подключился, ensure_jobs упал), lock отпускается — иначе воркер
+        остался бы "лидером" без задач, а следующий шаг не повторил бы запуск.
+        """
+        try:
+            if not self.is_leader:
+                if await self.lock.acquire():
+                    self.scheduler = self.build()
+                    self.scheduler.start()
+                    self.ensure_jobs()
+                    log_service.info("Планировщик запущен: воркер стал лидером")
+            elif not await self.lock.check():
+                self._shutdown_scheduler()
+                log_service.warning("Лидерство планировщика потеряно")
+        except Exception as e:
+            log_service.error(f"Ошибка выбора лидера планировщика: {e}")
+            self._shutdown_scheduler()
+            await self.lock.release()
+
+    def _shutdown_scheduler(self):
+        scheduler, self.scheduler = self.scheduler, None
+        jobstore, self._jobstore = self._jobstore, None
+        try:
+            if scheduler is not None and scheduler.running:
+                scheduler.shutdown(wait=False)
+        finally:
+            # shutdown закрывает job store только у запущенного планировщика
+            if jobstore is not None:
+                jobstore.engine.dispose()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._shutdown_scheduler()
+        await self.lock.close()
+
+    def status(self) -> dict:
+        jobs = {}
+        if self.scheduler is not None:
+            for job in self.scheduler.get_jobs():
+                jobs[job.id] = job.next_run_time.isoformat() if job.next_run_time else None
+        return {"enabled": settings.scheduler_enabled, "leader": self.is_leader, "next_runs": jobs}
+
+
+_scheduler: Optional[JobScheduler] = None
+
+
+def get_scheduler() -> JobScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(LeaderLock(engine), settings.scheduler_leader_check)
+    return _scheduler
@@ -3,58 +3,277 @@
 Конфигурируемое маппинг полей.
 """
 
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Optional
 import hashlib
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.logger import log_webhook
 
 
+# Встроенные провайдеры: поле результата -> путь в payload (через точку).
+# volatile_fields — поля, меняющиеся при повторной отправке того же события
+# (время отправки и т.п.): в хеш идемпотентности они не входят
+
+BUILTIN_MAPPINGS: Dict[str, Dict[str, Any]] = {
+    "homereserve": {
+        "event_id": "booking_id",
+        "event_type": "status",  # Маппим значение статуса
+        "apartment_id": "apartment_id",
+        "check_in": "check_in_date",
+        "check_out": "check_out_date",
+        "total_amount": "price",
+        "currency": "currency",
+        "phone": "guest_phone",
+        "email": "guest_email",
+        "updated_at": "updated_at",  # время изменения брони у провайдера
+        "status_values": {
+            "confirmed": "confirmed",
+            "paid": "paid",
+            "cancelled": "canceled",
+        },
+        "volatile_fields": ["timestamp", "sent_at"],
+    },
+    "booking_com": {
+        "event_id": "reservation_id",
+        "event_type": "event_type",
+        "apartment_id": "property_id",
+        "check_in": "arrival_date",
+        "check_out": "departure_date",
+        "total_amount": "total_price",
+        "currency": "currency_code",
+        "phone": "guest_phone",
+        "email": "guest_email",
+        "updated_at": "modified_at",
+        "status_values": {
+            "RESERVATION_ACCEPTED": "confirmed",
+            "RESERVATION_CONFIRMED": "confirmed",
+            "RESERVATION_CANCELLED": "canceled",
+            "PAYMENT_RECEIVED": "paid",
+        },
+        "volatile_fields": ["timestamp", "sent_at"],
+    },
+}
+
+FIELDS = (
+    "event_id", "event_type", "apartment_id", "check_in", "check_out",
+    "total_amount", "currency", "phone", "email", "updated_at",
+)
+
+Extractor = Callable[[Any], Any]
+
+
+def _missing(payload: Any) -> Any:
+    return None
+
+
+def compile_path(key: Optional[str]) -> Extractor:
+    """
+    Скомпилировать путь "a.b.c" в функцию payload -> значение (или None).
+    Ключ разбивается один раз, а не на каждое поле каждого вебхука.
+    """
+    if not key:
+        return _missing
+    
+    keys = tuple(key.split("."))
+    if len(keys) == 1:
+        (single,) = keys
+        
+        def extract(payload: Any) -> Any:
+            return payload.get(single) if isinstance(payload, dict) else None
+        return extract
+    
+    def extract_nested(payload: Any) -> Any:
+        value = payload
+        for k in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(k)
+        return value
+    return extract_nested
+
+
+def compile_volatile(paths: Iterable[str]) -> Dict[str, Any]:
+    """
+    Пути volatile-полей в дерево {ключ: поддерево}; None — удалить поле целиком.
+    "meta.sent_at" -> {"meta": {"sent_at": None}}
+    """
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        *parents, leaf = path.split(".")
+        node = tree
+        for key in parents:
+            node = node.setdefault(key, {})
+            if node is None:
+                break
+        else:
+            node[leaf] = None
+    return tree
+
+
+def canonicalize(value: Any, volatile: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Каноническая форма payload: без volatile-полей, целые float -> int
+    (5000.0 и 5000 — одно и то же). Порядок ключей задает сериализация.
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            sub = None
+            if volatile and key in volatile:
+                sub = volatile[key]
+                if sub is None:
+                    continue
+            result[key] = canonicalize(item, sub)
+        return result
+    if isinstance(value, list):
+        return [canonicalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_payload_hash(payload: Any, volatile: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Хеш идемпотентности по смыслу события: порядок ключей, пробелы и форма
+    чисел не влияют, volatile-поля исключены. Повторная отправка того же
+    события отсекается уникальным индексом без дополнительных запросов.
+
+    Сериализатор всегда stdlib json, независимо от fastjson-бэкенда:
+    хеш — ключ дедупликации в БД и должен совпадать на всех воркерах
+    (orjson и stdlib по-разному пишут float с экспонентой).
+    """
+    canonical = json.dumps(
+        canonicalize(payload, volatile), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def _safe_int(value: Any) -> Optional[int]:
+    """Безопасно конвертировать в int"""
+    try:
+        return int(value) if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _safe_datetime(value: Any) -> Optional[datetime]:
+    """ISO-строка или unix-время -> naive UTC datetime (как в колонках БД)"""
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.utcfromtimestamp(value)
+        if isinstance(value, str) and value:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    except (ValueError, OverflowError, OSError):
+        pass
+    return None
+
+
+class ProviderSpec:
+    """Маппинг провайдера, скомпилированный в экстракторы полей"""
+    
+    def __init__(self, name: str, mapping: Dict[str, Any]):
+        self.name = name
+        self.mapping = mapping
+        self.status_values: Dict[str, str] = dict(mapping.get("status_values", {}))
+        self.extractors: Dict[str, Extractor] = {
+            field: compile_path(mapping.get(field)) for field in FIELDS
+        }
+        self.volatile = compile_volatile(mapping.get("volatile_fields", ()))
+    
+    def payload_hash(self, payload: Any) -> str:
+        """Канонический хеш payload для идемпотентности"""
+        return canonical_payload_hash(payload, self.volatile)
+    
+    def normalize_event_type(self, event_type: Any) -> str:
+        """Нормализовать тип события"""
+        if not event_type:
+            return "unknown"
+        
+        return self.status_values.get(event_type, str(event_type).lower())
+    
+    def extract(self, payload: Any) -> Dict[str, Any]:
+        """Нормализованные поля события"""
+        get = self.extractors
+        currency = get["currency"](payload)
+        return {
+            "provider": self.name,
+            "event_id": get["event_id"](payload),
+            "event_type": self.normalize_event_type(get["event_type"](payload)),
+            "apartment_id": _safe_int(get["apartment_id"](payload)),
+            "check_in": get["check_in"](payload),
+            "check_out": get["check_out"](payload),
+            "total_amount": _safe_int(get["total_amount"](payload)),
+            "currency": currency if currency is not None else "RUB",
+            "phone": get["phone"](payload),
+            "email": get["email"](payload),
+            "updated_at": _safe_datetime(get["updated_at"](payload)),
+        }
+
+
+class ProviderRegistry:
+    """Провайдеры вебхуков: маппинги компилируются один раз при регистрации"""
+    
+    def __init__(self, mappings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._providers: Dict[str, ProviderSpec] = {}
+        for name, mapping in (mappings or {}).items():
+            self.register(name, mapping)
+    
+    def register(self, name: str, mapping: Dict[str, Any]) -> ProviderSpec:
+        spec = ProviderSpec(name, mapping)
+        self._providers[name] = spec
+        return spec
+    
+    def get(self, name: str) -> Optional[ProviderSpec]:
+        return self._providers.get(name)
+    
+    def names(self) -> list:
+        return sorted(self._providers)
+    
+    def load_file(self, path: str) -> int:
+        """
+        Дозагрузить провайдеров из JSON-файла вида {"provider": {маппинг}}.
+        Провайдер из файла переопределяет встроенный с тем же именем.
+        """
+        with open(path, encoding="utf-8") as f:
+            mappings = json.load(f)
+        for name, mapping in mappings.items():
+            self.register(name, mapping)
+        log_webhook.info(f"Провайдеры вебхуков загружены из {path}: {', '.join(mappings)}")
+        return len(mappings)
+
+
+_registry: Optional[ProviderRegistry] = None
+
+
+def get_provider_registry() -> ProviderRegistry:
+    global _registry
+    if _registry is None:
+        from app.config import get_settings
+        settings = get_settings()
+        registry = ProviderRegistry(BUILTIN_MAPPINGS)
+        if settings.webhook_providers_file:
+            try:
+                registry.load_file(settings.webhook_providers_file)
+            except Exception as e:
+                log_webhook.error(f"Ошибка загрузки провайдеров вебхуков: {e}")
+        _registry = registry
+    return _registry
+
+
 class WebhookConfig:
     """Конфигурация маппинга полей для конкретного провайдера"""
     
     def __init__(self, provider: str):
         self.provider = provider
-        self.mappings = {
-            "homereserve": {
-                "event_id": "booking_id",
-                "event_type": "status",  # Маппим значение статуса
-                "apartment_id": "apartment_id",
-                "check_in": "check_in_date",
-                "check_out": "check_out_date",
-                "total_amount": "price",
-                "currency": "currency",
-                "phone": "guest_phone",
-                "email": "guest_email",
-                "status_values": {
-                    "confirmed": "confirmed",
-                    "paid": "paid",
-                    "cancelled": "canceled",
-                },
-            },
-            "booking_com": {
-                "event_id": "reservation_id",
-                "event_type": "event_type",
-                "apartment_id": "property_id",
-                "check_in": "arrival_date",
-                "check_out": "departure_date",
-                "total_amount": "total_price",
-                "currency": "currency_code",
-                "phone": "guest_phone",
-                "email": "guest_email",
-                "status_values": {
-                    "RESERVATION_ACCEPTED": "confirmed",
-                    "RESERVATION_CONFIRMED": "confirmed",
-                    "RESERVATION_CANCELLED": "canceled",
-                    "PAYMENT_RECEIVED": "paid",
-                },
-            },
-        }
+        self.spec = get_provider_registry().get(provider)
     
     def get_mapping(self) -> Dict[str, str]:
         """Получить маппинг для провайдера"""
-        return self.mappings.get(self.provider, {})
+        return self.spec.mapping if self.spec else {}
 
 
 class WebhookParser:
@@ -63,89 +282,36 @@ class WebhookParser:
     def __init__(self, provider: str, payload: Dict[str, Any]):
         self.provider = provider
         self.payload = payload
-        self.config = WebhookConfig(provider)
-        self.mapping = self.config.get_mapping()
+        self.spec = get_provider_registry().get(provider)
     
     def parse(self) -> Optional[Dict[str, Any]]:
         """
         Распарсить вебхук и вернуть нормализованные поля.
         """
         try:
-            mapping = self.mapping
-            
-            if not mapping:
-                log_webhook.warning(
-                    "Неизвестный провайдер",
-                    provider=self.provider,
-                )
+            if not self.spec:
+                log_webhook.warning(f"Неизвестный провайдер: {self.provider}")
                 return None
             
-            result = {
-                "provider": self.provider,
-                "event_id": self._get_value(mapping.get("event_id")),
-                "event_type": self._normalize_event_type(
-                    self._get_value(mapping.get("event_type")),
-                    mapping.get("status_values", {}),
-                ),
-                "apartment_id": self._safe_int(self._get_value(mapping.get("apartment_id"))),
-                "check_in": self._get_value(mapping.get("check_in")),
-                "check_out": self._get_value(mapping.get("check_out")),
-                "total_amount": self._safe_int(self._get_value(mapping.get("total_amount"))),
-                "currency": self._get_value(mapping.get("currency"), "RUB"),
-                "phone": self._get_value(mapping.get("phone")),
-                "email": self._get_value(mapping.get("email")),
-            }
+            result = self.spec.extract(self.payload)
             
             log_webhook.info(
-                "Вебхук распарсен",
-                provider=self.provider,
-                event_id=result["event_id"],
-                event_type=result["event_type"],
+                f"Вебхук распарсен: provider={self.provider} "
+                f"event_id={result['event_id']} event_type={result['event_type']}"
             )
             
             return result
         
         except Exception as e:
-            log_webhook.error(
-                "Ошибка парсинга вебхука",
-                provider=self.provider,
-                error=str(e),
-            )
+            log_webhook.error(f"Ошибка парсинга вебхука: provider={self.provider} error={e}")
             return None
     
     def _get_value(self, key: str, default: Any = None) -> Any:
         """Получить значение из payload по ключу (поддерживаем nested)"""
-        if not key:
-            return default
-        
-        keys = key.split(".")
-        value = self.payload
-        
-        for k in keys:
-            if isinstance(value, dict):
-                value = value.get(k)
-            else:
-                return default
-        
+        value = compile_path(key)(self.payload)
         return value if value is not None else default
-    
-    def _safe_int(self, value: Any) -> Optional[int]:
-        """Безопасно конвертировать в int"""
-        try:
-            return int(value) if value else None
-        except (ValueError, TypeError):
-            return None
-    
-    def _normalize_event_type(
-        self, event_type: str, status_values: Dict[str, str]
-    ) -> str:
-        """Нормализовать тип события"""
-        if not event_type:
-            return "unknown"
-        
-        return status_values.get(event_type, event_type.lower())
 
 
 def calculate_payload_hash(payload: bytes) -> str:
-    """Вычислить хеш payload для идемпотентности"""
+    """Хеш сырых байтов (для тела, которое не разобрать как JSON)"""
     return hashlib.sha256(payload).hexdigest()
\ No newline at end of file
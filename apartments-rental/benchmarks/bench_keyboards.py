@@ -0,0 +1,108 @@
+"""
+Бенчмарк клавиатур: аллокации и время на один ответ до/после сборки
+статических клавиатур при импорте.
+
+Запуск (из корня проекта, с заполненным .env):
+    python -m benchmarks.bench_keyboards
+"""
+
+import time
+import tracemalloc
+
+from aiogram.utils.keyboard import ReplyKeyboardBuilder
+
+from app.bot import keyboards, texts
+
+CALLS = 2000
+DISTRICTS = ["Центр", "ФМР", "ЮМР", "Гидрострой", "Кубанская набережная"]
+
+
+# --- Старая реализация (builder на каждый ответ) ---
+
+def legacy_main_menu_keyboard():
+    kb = ReplyKeyboardBuilder()
+    kb.button(text="🏠 Подобрать квартиру")
+    kb.button(text="📚 Каталог")
+    kb.button(text="🔥 Горящие даты")
+    kb.button(text="📍 Районы")
+    kb.button(text="❓ Правила / FAQ")
+    kb.button(text="💬 Связаться")
+    kb.button(text="🎁 Скидка / Рефералка")
+    kb.adjust(2, 2, 2, 1)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=False)
+
+
+def legacy_back_menu_cancel_keyboard():
+    kb = ReplyKeyboardBuilder()
+    kb.button(text=texts.Buttons.back)
+    kb.button(text=texts.Buttons.menu)
+    kb.button(text=texts.Buttons.cancel)
+    kb.adjust(3)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=False)
+
+
+def legacy_wizard_dates_keyboard():
+    kb = ReplyKeyboardBuilder()
+    kb.button(text=texts.Buttons.today)
+    kb.button(text=texts.Buttons.tomorrow)
+    kb.button(text=texts.Buttons.custom)
+    kb.add(
+        legacy_back_menu_cancel_keyboard().keyboard[0][0],
+        legacy_back_menu_cancel_keyboard().keyboard[0][1],
+        legacy_back_menu_cancel_keyboard().keyboard[0][2],
+    )
+    kb.adjust(3, 3)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
+
+
+def legacy_wizard_district_keyboard(districts):
+    kb = ReplyKeyboardBuilder()
+    for district in districts:
+        kb.button(text=f"📍 {district}")
+    kb.button(text=texts.Buttons.district_any)
+    kb.adjust(2)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
+
+
+def measure(fn):
+    """Микросекунд на вызов"""
+    fn()  # прогрев (кеши)
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - started) / CALLS * 1_000_000
+
+
+def measure_peak(fn):
+    """Пиковая аллокация одного вызова (объекты, созданные и отброшенные)"""
+    fn()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base
+
+
+def main():
+    cases = [
+        ("main_menu", legacy_main_menu_keyboard, keyboards.main_menu_keyboard),
+        ("wizard_dates", legacy_wizard_dates_keyboard, keyboards.wizard_dates_keyboard),
+        (
+            "district",
+            lambda: legacy_wizard_district_keyboard(DISTRICTS),
+            lambda: keyboards.wizard_district_keyboard(DISTRICTS),
+        ),
+    ]
+
+    print(f"{'keyboard':<14} {'impl':<8} {'peak B/reply':>13} {'us/reply':>9}")
+    for name, legacy, current in cases:
+        for impl, fn in (("before", legacy), ("after", current)):
+            peak = measure_peak(fn)
+            us = measure(fn)
+            print(f"{name:<14} {impl:<8} {peak:>13} {us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
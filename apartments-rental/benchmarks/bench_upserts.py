@@ -0,0 +1,97 @@
+"""
+Бенчмарк get-or-create хелперов: запросов к БД на вызов до/после перехода
+на INSERT ... ON CONFLICT.
+
+Запуск (из корня проекта, с заполненным .env):
+    python -m benchmarks.bench_upserts
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.crud import get_or_create_user, get_or_create_booking
+from app.db.models import Base, User, Booking
+
+CALLS = 200
+
+
+# --- Старая реализация (select, затем insert + commit + refresh) ---
+
+async def legacy_get_or_create_user(session, telegram_id, **kwargs):
+    user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
+    if not user:
+        user = User(telegram_id=telegram_id, **kwargs)
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+    return user
+
+
+async def legacy_get_or_create_booking(session, external_id, **kwargs):
+    booking = (await session.execute(select(Booking).where(Booking.external_id == external_id))).scalar_one_or_none()
+    if booking:
+        return booking, False
+    booking = Booking(external_id=external_id, **kwargs)
+    session.add(booking)
+    await session.commit()
+    await session.refresh(booking)
+    return booking, True
+
+
+class RoundTrips:
+    """Считаем выполненные SQL-запросы и commit-ы"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._inc)
+        event.listen(engine.sync_engine, "commit", self._inc)
+
+    def _inc(self, *args, **kwargs):
+        self.count += 1
+
+
+async def measure(sessionmaker, trips, fn, keys):
+    trips.count = 0
+    started = time.perf_counter()
+    async with sessionmaker() as session:
+        for key in keys:
+            await fn(session, key)
+    elapsed = time.perf_counter() - started
+    return trips.count / len(keys), elapsed / len(keys) * 1000
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        trips = RoundTrips(engine)
+
+        cases = [
+            ("user", legacy_get_or_create_user, get_or_create_user, "telegram_id", lambda i: i),
+            ("booking", legacy_get_or_create_booking, get_or_create_booking, "external_id", lambda i: f"BK-{i}"),
+        ]
+
+        print(f"{'helper':<10} {'path':<8} {'impl':<8} {'trips/call':>10} {'ms/call':>9}")
+        for name, legacy, current, field, make_key in cases:
+            for impl, fn, offset in (("before", legacy, 0), ("after", current, 100_000)):
+                keys = [make_key(offset + i) for i in range(CALLS)]
+
+                async def call(session, key, fn=fn, field=field):
+                    await fn(session, **{field: key})
+
+                for path in ("new", "existing"):
+                    per_call, ms = await measure(sessionmaker, trips, call, keys)
+                    print(f"{name:<10} {path:<8} {impl:<8} {per_call:>10.1f} {ms:>9.3f}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Бенчмарк WebhookParser.parse: событий в секунду до/после компиляции
+маппингов провайдеров в экстракторы.
+
+Запуск (из корня проекта, с заполненным .env):
+    python -m benchmarks.bench_webhook_parser
+"""
+
+import logging
+import time
+
+from app.logger import log_webhook
+from app.services.webhook_parser import BUILTIN_MAPPINGS, WebhookParser
+
+CALLS = 50000
+
+PAYLOADS = {
+    "homereserve": {
+        "booking_id": "BK-12345",
+        "status": "paid",
+        "apartment_id": 42,
+        "check_in_date": "2026-02-15",
+        "check_out_date": "2026-02-17",
+        "price": 5000,
+        "currency": "RUB",
+        "guest_phone": "+79001234567",
+        "guest_email": "guest@example.com",
+    },
+    "booking_com": {
+        "reservation_id": "R-1",
+        "event_type": "PAYMENT_RECEIVED",
+        "property_id": "42",
+        "arrival_date": "2026-02-15",
+        "departure_date": "2026-02-17",
+        "total_price": "5000",
+        "currency_code": "RUB",
+    },
+}
+
+
+# --- Старая реализация (маппинги на каждый запрос, split на каждое поле) ---
+
+class LegacyWebhookParser:
+    def __init__(self, provider, payload):
+        self.provider = provider
+        self.payload = payload
+        # Как раньше WebhookConfig.__init__: весь словарь заново
+        mappings = {
+            name: {**mapping, "status_values": dict(mapping["status_values"])}
+            for name, mapping in BUILTIN_MAPPINGS.items()
+        }
+        self.mapping = mappings.get(provider, {})
+
+    def parse(self):
+        mapping = self.mapping
+        return {
+            "provider": self.provider,
+            "event_id": self._get_value(mapping.get("event_id")),
+            "event_type": self._normalize_event_type(
+                self._get_value(mapping.get("event_type")),
+                mapping.get("status_values", {}),
+            ),
+            "apartment_id": self._safe_int(self._get_value(mapping.get("apartment_id"))),
+            "check_in": self._get_value(mapping.get("check_in")),
+            "check_out": self._get_value(mapping.get("check_out")),
+            "total_amount": self._safe_int(self._get_value(mapping.get("total_amount"))),
+            "currency": self._get_value(mapping.get("currency"), "RUB"),
+            "phone": self._get_value(mapping.get("phone")),
+            "email": self._get_value(mapping.get("email")),
+        }
+
+    def _get_value(self, key, default=None):
+        if not key:
+            return default
+        value = self.payload
+        for k in key.split("."):
+            if isinstance(value, dict):
+                value = value.get(k)
+            else:
+                return default
+        return value if value is not None else default
+
+    def _safe_int(self, value):
+        try:
+            return int(value) if value else None
+        except (ValueError, TypeError):
+            return None
+
+    def _normalize_event_type(self, event_type, status_values):
+        if not event_type:
+            return "unknown"
+        return status_values.get(event_type, event_type.lower())
+
+
+def measure(parser_cls, provider, payload) -> float:
+    """Событий в секунду"""
+    parser_cls(provider, payload).parse()  # прогрев (реестр провайдеров)
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        parser_cls(provider, payload).parse()
+    return CALLS / (time.perf_counter() - started)
+
+
+def main():
+    # Логирование одинаково для обеих реализаций — меряем только разбор
+    log_webhook.setLevel(logging.WARNING)
+
+    print(f"{'provider':<12} {'impl':<8} {'events/s':>10}")
+    for provider, payload in PAYLOADS.items():
+        for impl, parser_cls in (("before", LegacyWebhookParser), ("after", WebhookParser)):
+            # Результаты совпадают (новая реализация добавляет только updated_at)
+            legacy = LegacyWebhookParser(provider, payload).parse()
+            assert legacy.items() <= WebhookParser(provider, payload).parse().items()
+            print(f"{provider:<12} {impl:<8} {measure(parser_cls, provider, payload):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
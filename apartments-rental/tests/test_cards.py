@@ -0,0 +1,64 @@
+"""
+Тесты кеша карточек квартир.
+"""
+
+from dataclasses import replace
+from datetime import datetime
+
+from app.bot.cards import WARM_SOURCES, CardCache
+from app.services.catalog import ApartmentView, CatalogSnapshot, MediaView
+
+
+def make_view(apartment_id=1, **kwargs):
+    values = dict(
+        id=apartment_id, title=f"Квартира {apartment_id}", district="Центр", address_short=None,
+        guests_max=2, price_per_night=None, beds_text="1 кровать", features_json=("Wi-Fi",),
+        rules_short=None, map_url=None, sort_order=0, updated_at=datetime(2026, 1, 1),
+        tags=(), media=(),
+    )
+    values.update(kwargs)
+    return ApartmentView(**values)
+
+
+def test_card_cache_warm_and_lookup():
+    """Прогрев при загрузке каталога, показ — поиск в словаре"""
+    cache = CardCache()
+    apt = make_view()
+    cache.warm(CatalogSnapshot(1, (apt,)))
+    assert len(cache) == len(WARM_SOURCES)
+
+    card = cache.get(apt)
+    assert card is cache.get(apt)
+    assert "Квартира 1" in card.text
+    assert card.rows[0][0].url.endswith("utm_campaign=apartment_1")
+
+    # Другой источник — отдельная карточка со своей ссылкой
+    channel_card = cache.get(apt, source="tg_channel", medium="channel")
+    assert channel_card is not card
+    assert "utm_medium=channel" in channel_card.rows[0][0].url
+
+
+def test_card_cache_rerenders_changed_apartments():
+    """Изменения квартиры (даже без updated_at) перерисовывают карточку, снятые удаляются"""
+    cache = CardCache()
+    apt, other = make_view(1), make_view(2)
+    cache.warm(CatalogSnapshot(1, (apt, other)))
+    card = cache.get(apt)
+
+    with_media = replace(apt, media=(MediaView(id=1, type="photo", url="u", file_id=None, sort_order=0),))
+    cache.warm(CatalogSnapshot(2, (with_media,)))
+
+    assert len(cache) == len(WARM_SOURCES)
+    new_card = cache.get(with_media)
+    assert new_card is not card
+    assert new_card.rows[1][-1].callback_data == "apt_media_1"
+
+
+def test_card_markup_appends_navigation():
+    cache = CardCache()
+    card = cache.get(make_view())
+    from aiogram.types import InlineKeyboardButton
+
+    markup = card.markup([[InlineKeyboardButton(text="➡️ Дальше", callback_data="next_apt_1")]])
+    assert len(markup.inline_keyboard) == len(card.rows) + 1
+    assert len(card.markup([[]]).inline_keyboard) == len(card.rows)
@@ -0,0 +1,80 @@
+"""
+Тесты карусели результатов: редактирование сообщения по callback data.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.bot import router_user
+from app.bot.callbacks import ResultPage
+from app.services.catalog import ApartmentView, CatalogSnapshot
+
+
+def make_view(apartment_id):
+    return ApartmentView(
+        id=apartment_id, title=f"Квартира {apartment_id}", district="Центр", address_short=None,
+        guests_max=2, price_per_night=None, beds_text=None, features_json=(), rules_short=None,
+        map_url=None, sort_order=apartment_id, updated_at=datetime(2026, 1, 1), tags=(), media=(),
+    )
+
+
+class FakeCallback:
+    def __init__(self):
+        self.edits = []
+        self.answers = []
+        self.message = SimpleNamespace(edit_text=self.edit_text)
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((text, kwargs["reply_markup"]))
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    snapshot = CatalogSnapshot(1, tuple(make_view(i) for i in range(1, 4)))
+
+    async def get_catalog():
+        return snapshot
+
+    monkeypatch.setattr(router_user, "get_catalog", get_catalog)
+    return snapshot
+
+
+def test_result_page_callback_data_is_compact():
+    packed = ResultPage(search=12, index=9).pack()
+    assert packed == "res:12:9"
+    assert ResultPage.unpack(packed) == ResultPage(search=12, index=9)
+
+
+def test_result_view_navigation(snapshot):
+    text, markup = router_user.result_view(snapshot, [1, 2, 3], 1, search_id=5)
+    assert "Квартира 2" in text
+    navigation = markup.inline_keyboard[-1]
+    assert [ResultPage.unpack(button.callback_data).index for button in navigation] == [0, 2]
+
+    _, markup = router_user.result_view(snapshot, [1, 2, 3], 2, search_id=5)
+    assert [button.text for button in markup.inline_keyboard[-1]] == ["⬅️ Назад"]
+
+
+async def test_result_page_edits_in_place(snapshot):
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.update_data(results=[1, 2, 3], result_index=0, search_id=5)
+
+    callback = FakeCallback()
+    await router_user.result_page(callback, ResultPage(search=5, index=1), state)
+
+    assert len(callback.edits) == 1
+    assert "Квартира 2" in callback.edits[0][0]
+    assert (await state.get_data())["result_index"] == 1
+
+    # Кнопка из прошлой подборки ничего не редактирует
+    await router_user.result_page(callback, ResultPage(search=4, index=2), state)
+    assert len(callback.edits) == 1
+    assert "устарела" in callback.answers[-1]
@@ -0,0 +1,75 @@
+"""
+Тесты снапшота каталога.
+"""
+
+from sqlalchemy import update
+
+from app.db.models import Apartment, ApartmentTag
+from app.services import catalog as catalog_module
+from app.services.catalog import CatalogCache
+
+
+async def seed(sessionmaker):
+    async with sessionmaker() as session:
+        center = Apartment(title="Центр", district="Центр", guests_max=4, sort_order=1)
+        park = Apartment(title="Парк", district="Парк", guests_max=2, sort_order=2)
+        hidden = Apartment(title="Скрыта", district="Окраина", guests_max=2, is_active=False)
+        session.add_all([center, park, hidden])
+        await session.flush()
+        session.add_all([
+            ApartmentTag(apartment_id=center.id, tag="business"),
+            ApartmentTag(apartment_id=park.id, tag="family"),
+        ])
+        await session.commit()
+        return center.id, park.id
+
+
+async def test_snapshot_contents(test_db):
+    center_id, park_id = await seed(test_db)
+    cache = CatalogCache(sessionmaker=test_db, ttl=60)
+
+    snapshot = await cache.get()
+
+    assert [apt.id for apt in snapshot.apartments] == [center_id, park_id]
+    assert snapshot.districts == ("Парк", "Центр")
+    assert snapshot.get(center_id).tags == ("business",)
+    assert [apt.id for apt in snapshot.by_tag["family"]] == [park_id]
+
+
+async def test_snapshot_is_reused_until_invalidated(test_db):
+    await seed(test_db)
+    cache = CatalogCache(sessionmaker=test_db, ttl=60)
+
+    first = await cache.get()
+    assert await cache.get() is first
+
+    cache.invalidate()
+    second = await cache.get()
+    assert second is not first
+    assert second.version == first.version + 1
+
+
+async def test_snapshot_expires_by_ttl(test_db):
+    await seed(test_db)
+    cache = CatalogCache(sessionmaker=test_db, ttl=0)
+
+    first = await cache.get()
+    assert await cache.get() is not first
+
+
+async def test_commit_touching_catalog_invalidates(test_db):
+    center_id, _ = await seed(test_db)
+    cache = catalog_module.catalog
+    cache._stale = False
+
+    # commit без изменений каталога не трогает снапшот
+    async with test_db() as session:
+        await session.commit()
+    assert cache._stale is False
+
+    async with test_db() as session:
+        await session.execute(
+            update(Apartment).where(Apartment.id == center_id).values(title="Центр 2")
+        )
+        await session.commit()
+    assert cache._stale is True
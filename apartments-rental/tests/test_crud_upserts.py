@@ -0,0 +1,184 @@
+"""
+Тесты get-or-create хелперов на INSERT ... ON CONFLICT.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, func
+
+from app.db.crud import (
+    get_or_create_user, get_or_create_booking, get_or_create_referral_code, claim_webhook_event,
+    upsert_booking, upsert_bookings,
+)
+from app.db.models import User, Booking, BookingStatus, UserRole
+
+
+async def test_get_or_create_user_is_idempotent(test_db):
+    async with test_db() as session:
+        user = await get_or_create_user(session, telegram_id=42, username="first")
+        again = await get_or_create_user(session, telegram_id=42, username="second")
+
+        assert user.id == again.id
+        assert again.role == UserRole.GUEST
+        # существующий пользователь не перезаписывается
+        assert again.username == "first"
+
+        count = await session.execute(select(func.count(User.id)))
+        assert count.scalar() == 1
+
+
+async def test_get_or_create_does_not_write_existing_row(test_db):
+    """Повторный get-or-create — один SELECT: ни INSERT, ни UPDATE, ни commit"""
+    async with test_db() as session:
+        await get_or_create_user(session, telegram_id=42)
+
+        statements = []
+        engine = session.bind.sync_engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            user = await get_or_create_user(session, telegram_id=42)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert user.telegram_id == 42
+        assert len(statements) == 1
+        assert statements[0].lstrip().upper().startswith("SELECT")
+
+
+async def test_get_or_create_booking_reports_created(test_db):
+    async with test_db() as session:
+        booking, created = await get_or_create_booking(
+            session, external_id="BK-1", status="paid", total_amount=5000,
+        )
+        assert created is True
+        assert booking.total_amount == 5000
+
+        same, created = await get_or_create_booking(session, external_id="BK-1", status="canceled")
+        assert created is False
+        assert same.id == booking.id
+
+        count = await session.execute(select(func.count(Booking.id)))
+        assert count.scalar() == 1
+
+
+async def test_get_or_create_referral_code_is_stable(test_db):
+    async with test_db() as session:
+        user = await get_or_create_user(session, telegram_id=7)
+        code = await get_or_create_referral_code(session, user.id)
+        again = await get_or_create_referral_code(session, user.id)
+
+        assert code.id == again.id
+        assert code.code == again.code
+        assert code.code.startswith(f"ref_{user.id}_")
+
+
+async def test_claim_webhook_event_detects_duplicate(test_db):
+    """Повтор того же payload — конфликт по (provider, payload_hash)"""
+    async with test_db() as session:
+        event = await claim_webhook_event(
+            session, provider="homereserve", payload_hash="abc", event_type="paid",
+        )
+        assert event is not None
+
+        duplicate = await claim_webhook_event(
+            session, provider="homereserve", payload_hash="abc", event_type="paid",
+        )
+        assert duplicate is None
+
+        # тот же хеш у другого провайдера — не дубликат
+        other = await claim_webhook_event(
+            session, provider="booking_com", payload_hash="abc", event_type="paid",
+        )
+        assert other is not None
+
+
+async def test_upsert_booking_status_is_monotonic(test_db):
+    """Статус двигается только вперед; пустые поля не затирают известные"""
+    async with test_db() as session:
+        booking, created, transitioned = await upsert_booking(
+            session, external_id="BK-1", status=BookingStatus.CONFIRMED, total_amount=5000,
+        )
+        assert (created, transitioned) == (True, True)
+
+        booking, created, transitioned = await upsert_booking(
+            session, external_id="BK-1", status=BookingStatus.PAID, total_amount=None, check_in="2026-02-15",
+        )
+        assert (created, transitioned) == (False, True)
+        assert (booking.status, booking.total_amount, booking.check_in) == (BookingStatus.PAID, 5000, "2026-02-15")
+
+        # Опоздавший confirmed не откатывает paid
+        booking, _, transitioned = await upsert_booking(
+            session, external_id="BK-1", status=BookingStatus.CONFIRMED, total_amount=1,
+        )
+        assert transitioned is False
+        assert (booking.status, booking.total_amount) == (BookingStatus.PAID, 5000)
+
+        booking, _, transitioned = await upsert_booking(session, external_id="BK-1", status=BookingStatus.CANCELED)
+        assert transitioned is True
+        assert booking.status == BookingStatus.CANCELED
+
+
+async def test_upsert_booking_applies_same_rank_changes(test_db):
+    """Повтор статуса без времени провайдера обновляет поля брони"""
+    async with test_db() as session:
+        await upsert_booking(
+            session, external_id="BK-5", status=BookingStatus.CONFIRMED,
+            total_amount=5000, check_in="2026-02-15",
+        )
+
+        booking, created, transitioned = await upsert_booking(
+            session, external_id="BK-5", status=BookingStatus.CONFIRMED,
+            total_amount=6000, check_in="2026-02-16",
+        )
+        # Поля обновлены, но статус не сменился
+        assert (created, transitioned) == (False, False)
+        assert (booking.total_amount, booking.check_in) == (6000, "2026-02-16")
+
+        # В пачке при равном ранге побеждает последнее событие
+        bookings = await upsert_bookings(session, [
+            {"external_id": "BK-5", "status": BookingStatus.CONFIRMED, "total_amount": 6500},
+            {"external_id": "BK-5", "status": BookingStatus.CONFIRMED, "total_amount": 7000},
+        ])
+        assert bookings["BK-5"][0].total_amount == 7000
+
+
+async def test_upsert_booking_prefers_provider_timestamp(test_db):
+    """Когда время изменения известно, порядок решает оно, а не ранг статуса"""
+    later, earlier = datetime(2026, 2, 2), datetime(2026, 2, 1)
+    async with test_db() as session:
+        await upsert_booking(session, external_id="BK-2", status=BookingStatus.CONFIRMED, provider_updated_at=later)
+
+        booking, _, transitioned = await upsert_booking(
+            session, external_id="BK-2", status=BookingStatus.PAID, provider_updated_at=earlier,
+        )
+        assert transitioned is False
+        assert booking.status == BookingStatus.CONFIRMED
+
+        booking, _, transitioned = await upsert_booking(
+            session, external_id="BK-2", status=BookingStatus.CONFIRMED,
+            provider_updated_at=later + timedelta(hours=1), total_amount=7000,
+        )
+        assert transitioned is False
+        assert booking.total_amount == 7000
+
+        booking, _, transitioned = await upsert_booking(
+            session, external_id="BK-2", status=BookingStatus.PAID,
+            provider_updated_at=later + timedelta(hours=2),
+        )
+        assert transitioned is True
+        assert booking.status == BookingStatus.PAID
+
+
+async def test_upsert_bookings_applies_newest_event_per_booking(test_db):
+    async with test_db() as session:
+        rows = [
+            {"external_id": "BK-3", "status": BookingStatus.PAID, "total_amount": 5000},
+            {"external_id": "BK-3", "status": BookingStatus.CONFIRMED, "total_amount": 4000},
+            {"external_id": "BK-4", "status": BookingStatus.CREATED, "total_amount": None},
+        ]
+        bookings = await upsert_bookings(session, rows)
+
+        booking, created, transitioned = bookings["BK-3"]
+        assert (booking.status, booking.total_amount, created, transitioned) == (BookingStatus.PAID, 5000, True, True)
+        assert bookings["BK-4"][0].status == BookingStatus.CREATED
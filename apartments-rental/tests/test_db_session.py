@@ -0,0 +1,73 @@
+"""
+Тесты настройки пула соединений.
+"""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import get_settings
+from app.db.session import InstrumentedAsyncQueuePool, engine_options, pool_limits, pool_stats
+
+
+def make_settings(**overrides):
+    return get_settings().model_copy(update=overrides)
+
+
+def test_pool_limits_without_budget():
+    """Без общего бюджета берем настройки как есть"""
+    cfg = make_settings(db_pool_size=5, db_max_overflow=10, db_max_connections=0)
+    assert pool_limits(cfg) == (5, 10)
+
+
+def test_pool_limits_split_between_workers():
+    """Бюджет соединений делится между воркерами"""
+    cfg = make_settings(
+        db_pool_size=10, db_max_overflow=10, db_max_connections=40, web_concurrency=4,
+    )
+    size, overflow = pool_limits(cfg)
+    assert size == 10
+    assert overflow == 0
+    assert (size + overflow) * 4 <= 40
+
+
+def test_engine_options_postgres():
+    cfg = make_settings(
+        database_url="postgresql+asyncpg://u:p@localhost/db",
+        db_pool_size=3, db_max_overflow=2, db_pool_recycle=0,
+    )
+    options = engine_options(cfg)
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["pool_size"] == 3
+    assert options["max_overflow"] == 2
+    assert options["pool_recycle"] == -1
+
+
+def test_engine_options_null_mode():
+    cfg = make_settings(database_url="postgresql+asyncpg://u:p@localhost/db", db_pool_mode="null")
+    assert engine_options(cfg)["poolclass"] is NullPool
+
+
+async def test_instrumented_pool_records_wait(tmp_path):
+    """Пул считает выдачи соединений и время ожидания"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    pool_stats.reset()
+
+    async def query():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(query(), query())
+    await engine.dispose()
+
+    stats = pool_stats.as_dict()
+    assert stats["checkouts"] == 2
+    assert stats["wait_max_ms"] > 0
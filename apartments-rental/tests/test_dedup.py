@@ -0,0 +1,70 @@
+"""
+Тесты отсева повторных Telegram updates.
+"""
+
+import json
+
+from app.bot import dedup
+from app.bot.dedup import MemoryUpdateDeduplicator, RedisUpdateDeduplicator, extract_update_id
+
+
+def test_extract_update_id():
+    body = json.dumps({"update_id": 123456789, "message": {"text": "hi"}}).encode()
+    assert extract_update_id(body) == 123456789
+    assert extract_update_id(b'{"update_id":5}') == 5
+    assert extract_update_id(b'{"message": {}}') is None
+
+
+def test_extract_update_id_ignores_escaped_text():
+    body = json.dumps({"message": {"text": '"update_id": 1'}, "update_id": 77}).encode()
+    assert extract_update_id(body) == 77
+
+
+async def test_memory_deduplicator_drops_redelivery():
+    dedup = MemoryUpdateDeduplicator(window=60)
+    assert await dedup.is_duplicate(1) is False
+    assert await dedup.is_duplicate(1) is True
+    assert await dedup.is_duplicate(2) is False
+    assert dedup.metrics()["dropped"] == 1
+
+    await dedup.forget(2)
+    assert await dedup.is_duplicate(2) is False
+
+
+async def test_memory_deduplicator_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+
+    window = MemoryUpdateDeduplicator(window=10, max_size=3)
+    for update_id in range(5):
+        await window.is_duplicate(update_id)
+    assert window.metrics()["tracked"] == 3
+    # самые старые вытеснены и снова считаются новыми
+    assert await window.is_duplicate(0) is False
+
+    now[0] += 11
+    assert await window.is_duplicate(4) is False
+    assert window.metrics()["tracked"] == 1
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+async def test_redis_deduplicator_shared_between_workers():
+    redis = FakeRedis()
+    worker_a = RedisUpdateDeduplicator(redis, window=60)
+    worker_b = RedisUpdateDeduplicator(redis, window=60)
+
+    assert await worker_a.is_duplicate(10) is False
+    assert await worker_b.is_duplicate(10) is True
@@ -0,0 +1,70 @@
+"""
+Тесты выбора FSM storage.
+"""
+
+import json
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.bot.main import build_storage
+from app.bot.states import UserStates
+from app.config import get_settings
+
+pytest.importorskip("redis")
+
+
+class FakeRedis:
+    """Минимальный клиент с redis-протоколом: get/set(ex)/delete"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ex
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+def test_memory_storage_by_default():
+    cfg = get_settings().model_copy(update={"fsm_storage": "memory"})
+    assert isinstance(build_storage(cfg), MemoryStorage)
+
+
+async def test_redis_storage_roundtrip_with_ttl():
+    cfg = get_settings().model_copy(update={"fsm_storage": "redis", "fsm_state_ttl": 600})
+    redis = FakeRedis()
+    storage = build_storage(cfg, redis=redis)
+
+    await storage.set_state(KEY, UserStates.wizard_results)
+    await storage.set_data(KEY, {"results": [3, 1, 2], "result_index": 1})
+
+    assert await storage.get_state(KEY) == UserStates.wizard_results.state
+    assert await storage.get_data(KEY) == {"results": [3, 1, 2], "result_index": 1}
+    assert set(redis.ttls.values()) == {600}
+
+
+async def test_redis_storage_writes_compact_state():
+    """Состояние wizard — только id и курсор, пишется компактным JSON"""
+    cfg = get_settings().model_copy(update={"fsm_storage": "redis"})
+    redis = FakeRedis()
+    storage = build_storage(cfg, redis=redis)
+
+    data = {"guests": 2, "district": "Центр", "results": [5, 8], "result_index": 0}
+    await storage.set_data(KEY, data)
+
+    raw = next(value for key, value in redis.values.items() if key.endswith(":data"))
+    assert json.loads(raw) == data
+    assert b" " not in raw
+    assert len(raw) < 100
@@ -0,0 +1,71 @@
+"""
+Тесты inline-режима: разбор запроса, индекс каталога, пагинация.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.bot import router_inline
+from app.services.catalog import ApartmentView, CatalogSnapshot, MediaView
+
+
+def make_view(apartment_id, title, district, guests_max=2, tags=(), features=()):
+    return ApartmentView(
+        id=apartment_id, title=title, district=district, address_short=None,
+        guests_max=guests_max, price_per_night=3000, beds_text=None, features_json=tuple(features),
+        rules_short=None, map_url=None, sort_order=apartment_id, updated_at=datetime(2026, 1, 1),
+        tags=tuple(tags),
+        media=(MediaView(id=apartment_id, type="photo", url=f"https://cdn/{apartment_id}.jpg", file_id=None, sort_order=0),),
+    )
+
+
+SNAPSHOT = CatalogSnapshot(1, (
+    make_view(1, "Студия у парка", "Центр", 2, tags=("Для пары",)),
+    make_view(2, "Семейная двушка", "Центр", 4, features=("Парковка", "Wi-Fi")),
+    make_view(3, "Лофт", "ФМР", 4, tags=("Для компании",)),
+))
+
+
+def test_parse_inline_query():
+    assert router_inline.parse_inline_query("центр 4 гостя") == (("центр",), 4)
+    assert router_inline.parse_inline_query("на 3 человек") == ((), 3)
+    assert router_inline.parse_inline_query("4гостя Парковка") == (("парковка",), 4)
+
+
+def test_snapshot_search_by_tokens():
+    assert [apt.id for apt in SNAPSHOT.search(("центр",), 4)] == [2]
+    # Окончание запроса отбрасывается: «центре» находит «Центр»
+    assert [apt.id for apt in SNAPSHOT.search(("центре",))] == [1, 2]
+    # Префикс и поиск по удобствам/тегам
+    assert [apt.id for apt in SNAPSHOT.search(("парк",))] == [1, 2]
+    assert [apt.id for apt in SNAPSHOT.search(("компании",))] == [3]
+    assert SNAPSHOT.search(("океан",)) == ()
+    assert len(SNAPSHOT.search()) == 3
+
+
+async def test_inline_search_pagination(monkeypatch):
+    apartments = tuple(make_view(i, f"Квартира {i}", "Центр") for i in range(1, 26))
+    snapshot = CatalogSnapshot(1, apartments)
+
+    async def get_catalog():
+        return snapshot
+
+    monkeypatch.setattr(router_inline, "get_catalog", get_catalog)
+    answers = []
+
+    async def answer(results, **kwargs):
+        answers.append((results, kwargs))
+
+    await router_inline.inline_search(SimpleNamespace(query="центр", offset="", answer=answer))
+    results, kwargs = answers[-1]
+    assert len(results) == router_inline.INLINE_PAGE_SIZE
+    assert kwargs["next_offset"] == str(router_inline.INLINE_PAGE_SIZE)
+    assert kwargs["cache_time"] > 0
+    assert results[0].thumbnail_url == "https://cdn/1.jpg"
+    # Только кнопки-ссылки
+    assert all(button.url for row in results[0].reply_markup.inline_keyboard for button in row)
+
+    await router_inline.inline_search(SimpleNamespace(query="центр", offset=kwargs["next_offset"], answer=answer))
+    results, kwargs = answers[-1]
+    assert len(results) == 5
+    assert kwargs["next_offset"] == ""
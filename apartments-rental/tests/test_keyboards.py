@@ -0,0 +1,22 @@
+"""
+Тесты клавиатур: статические собраны один раз, динамические кешируются.
+"""
+
+from app.bot import keyboards, texts
+
+
+def test_static_keyboards_are_shared():
+    assert keyboards.main_menu_keyboard() is keyboards.main_menu_keyboard()
+    assert keyboards.wizard_dates_keyboard() is keyboards.WIZARD_DATES
+
+    # Нижняя строка выбора дат — те же кнопки, что и в back_menu_cancel
+    assert keyboards.WIZARD_DATES.keyboard[1] == keyboards.BACK_MENU_CANCEL.keyboard[0]
+
+
+def test_district_keyboard_cached_by_input():
+    first = keyboards.wizard_district_keyboard(["Центр", "ФМР"])
+    assert keyboards.wizard_district_keyboard(("Центр", "ФМР")) is first
+    assert keyboards.wizard_district_keyboard(["ФМР"]) is not first
+
+    buttons = [button.text for row in first.keyboard for button in row]
+    assert buttons == ["📍 Центр", "📍 ФМР", texts.Buttons.district_any]
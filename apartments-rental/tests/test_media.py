@@ -0,0 +1,94 @@
+"""
+Тесты отправки медиа: file_id сохраняется после первой загрузки.
+"""
+
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy import select
+
+from app.db.models import Apartment, ApartmentMedia
+from app.services.media import send_apartment_media
+
+
+def photo_message(file_id):
+    return SimpleNamespace(
+        photo=[SimpleNamespace(file_id=f"{file_id}_small"), SimpleNamespace(file_id=file_id)],
+        video=None,
+    )
+
+
+class FakeBot:
+    def __init__(self, reject_file_ids=False):
+        self.sent = []
+        self.reject_file_ids = reject_file_ids
+
+    async def send_media_group(self, chat_id, media):
+        sources = [item.media for item in media]
+        self.sent.append(sources)
+        if self.reject_file_ids and any(source.startswith("fid") for source in sources):
+            raise TelegramBadRequest(method=None, message="wrong file identifier")
+        return [photo_message(f"fid{len(self.sent)}_{i}") for i in range(len(media))]
+
+    async def send_photo(self, chat_id, photo, caption=None):
+        self.sent.append([photo])
+        return photo_message(f"fid{len(self.sent)}_0")
+
+
+async def create_media(session, count):
+    apartment = Apartment(title="Квартира", district="Центр", guests_max=2)
+    session.add(apartment)
+    await session.flush()
+    for i in range(count):
+        session.add(ApartmentMedia(
+            apartment_id=apartment.id, type="photo", url=f"https://cdn/{i}.jpg", sort_order=i,
+        ))
+    await session.commit()
+    return (await session.execute(
+        select(ApartmentMedia).order_by(ApartmentMedia.sort_order)
+    )).scalars().all()
+
+
+async def test_send_media_caches_file_ids(test_db):
+    """Первый раз — по URL, дальше — по сохраненным file_id"""
+    bot = FakeBot()
+    async with test_db() as session:
+        media = await create_media(session, 3)
+        await send_apartment_media(bot, 1, media, session=session)
+        assert bot.sent[0] == [f"https://cdn/{i}.jpg" for i in range(3)]
+
+    async with test_db() as session:
+        media = (await session.execute(
+            select(ApartmentMedia).order_by(ApartmentMedia.sort_order)
+        )).scalars().all()
+        assert [m.file_id for m in media] == ["fid1_0", "fid1_1", "fid1_2"]
+
+        await send_apartment_media(bot, 1, media, session=session)
+        assert bot.sent[1] == ["fid1_0", "fid1_1", "fid1_2"]
+
+
+async def test_send_media_chunks_and_single(test_db):
+    """Больше 10 медиа — несколько альбомов, одно — отдельным фото"""
+    bot = FakeBot()
+    async with test_db() as session:
+        media = await create_media(session, 11)
+        messages = await send_apartment_media(bot, 1, media, session=session)
+        assert len(messages) == 11
+        assert [len(batch) for batch in bot.sent] == [10, 1]
+
+
+async def test_send_media_falls_back_to_url(test_db):
+    """Отвергнутый file_id: повтор по URL и перезапись file_id"""
+    bot = FakeBot(reject_file_ids=True)
+    async with test_db() as session:
+        media = await create_media(session, 2)
+        for item in media:
+            item.file_id = "fid_stale"
+        await session.commit()
+
+        await send_apartment_media(bot, 1, media, session=session)
+        assert bot.sent[-1] == ["https://cdn/0.jpg", "https://cdn/1.jpg"]
+
+    async with test_db() as session:
+        media = (await session.execute(select(ApartmentMedia))).scalars().all()
+        assert all(m.file_id != "fid_stale" for m in media)
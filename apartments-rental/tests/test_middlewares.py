@@ -0,0 +1,79 @@
+"""
+Тесты middleware бота: одна сессия на update и кеш текущего пользователя.
+"""
+
+from aiogram.types import User as TelegramUser
+from sqlalchemy import select, func
+
+from app.bot.middlewares import DbSessionMiddleware
+from app.db.models import User
+
+
+async def test_db_session_middleware_single_session(test_db):
+    """Хендлер получает сессию и пользователя, User создается один раз"""
+    middleware = DbSessionMiddleware(test_db)
+    seen = {}
+
+    async def handler(event, data):
+        seen["session"] = data["session"]
+        first = await data["current_user"].get()
+        second = await data["current_user"].get()
+        assert first is second
+        return first.telegram_id
+
+    tg_user = TelegramUser(id=42, is_bot=False, first_name="Test", username="tester")
+    result = await middleware(handler, object(), {"event_from_user": tg_user})
+
+    assert result == 42
+    assert seen["session"] is not None
+
+    async with test_db() as session:
+        count = await session.scalar(select(func.count(User.id)))
+        assert count == 1
+
+
+async def test_db_session_middleware_lazy_connection(test_db):
+    """Апдейт без обращений к БД не берет соединение"""
+    middleware = DbSessionMiddleware(test_db)
+
+    async def handler(event, data):
+        return data["session"].in_transaction()
+
+    assert await middleware(handler, object(), {}) is False
+
+
+async def test_current_user_returns_connection_after_lookup(test_db):
+    """После поиска пользователя соединение не остается в транзакции"""
+    middleware = DbSessionMiddleware(test_db)
+    tg_user = TelegramUser(id=42, is_bot=False, first_name="Test")
+
+    async def handler(event, data):
+        user = await data["current_user"].get()
+        return user.telegram_id, data["session"].in_transaction()
+
+    assert await middleware(handler, object(), {"event_from_user": tg_user}) == (42, False)
+    # Существующий пользователь — тот же результат (только SELECT)
+    assert await middleware(handler, object(), {"event_from_user": tg_user}) == (42, False)
+
+
+async def test_current_user_keeps_handler_transaction(test_db):
+    """Транзакцию, начатую хендлером, get() не коммитит"""
+    middleware = DbSessionMiddleware(test_db)
+    tg_user = TelegramUser(id=42, is_bot=False, first_name="Test")
+    async with test_db() as session:
+        session.add(User(telegram_id=42))
+        await session.commit()
+
+    async def handler(event, data):
+        session = data["session"]
+        session.add(User(telegram_id=7))
+        await session.flush()
+        await data["current_user"].get()
+        in_transaction = session.in_transaction()
+        await session.rollback()
+        return in_transaction
+
+    assert await middleware(handler, object(), {"event_from_user": tg_user}) is True
+
+    async with test_db() as session:
+        assert await session.scalar(select(func.count(User.id)).where(User.telegram_id == 7)) == 0
@@ -0,0 +1,165 @@
+"""
+Тесты публикации в канал: инкрементальная синхронизация по content_hash.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, select
+
+from app.db.models import Apartment, ChannelPost
+from app.services import publishing
+from app.services.rate_limit import TelegramRateLimiter
+
+
+class FakeBot:
+    """Записывает вызовы API вместо отправки в Telegram"""
+
+    def __init__(self):
+        self.calls = []
+        self.next_id = 100
+
+    async def send_message(self, **kwargs):
+        self.calls.append(("send", kwargs))
+        self.next_id += 1
+        return SimpleNamespace(message_id=self.next_id)
+
+    async def edit_message_text(self, **kwargs):
+        self.calls.append(("edit", kwargs))
+        return True
+
+    async def delete_message(self, **kwargs):
+        self.calls.append(("delete", kwargs))
+        return True
+
+
+@pytest.fixture
+def fake_bot(test_db, monkeypatch):
+    bot = FakeBot()
+    limiter = TelegramRateLimiter(global_rate=1000, chat_rate_per_minute=60000)
+
+    async def get_bot():
+        return bot
+
+    monkeypatch.setattr(publishing, "SessionLocal", test_db)
+    monkeypatch.setattr(publishing, "get_bot", get_bot)
+    monkeypatch.setattr(publishing, "get_rate_limiter", lambda: limiter)
+    return bot
+
+
+async def test_sync_apartments_incremental(test_db, fake_bot):
+    """Повторная синхронизация без изменений не делает запросов к API"""
+    async with test_db() as session:
+        for i in range(3):
+            session.add(Apartment(
+                title=f"Квартира {i}", district="Центр", guests_max=2,
+                beds_text="1 кровать", sort_order=i,
+            ))
+        await session.commit()
+
+    result = await publishing.sync_apartments()
+    assert result.created == 3
+    assert len(fake_bot.calls) == 3
+
+    fake_bot.calls.clear()
+    result = await publishing.sync_apartments()
+    assert result.unchanged == 3
+    assert fake_bot.calls == []
+
+    async with test_db() as session:
+        apartments = (await session.execute(select(Apartment).order_by(Apartment.id))).scalars().all()
+        apartments[0].title = "Новое название"
+        apartments[1].is_active = False
+        await session.commit()
+
+    result = await publishing.sync_apartments()
+    assert (result.edited, result.deleted, result.unchanged) == (1, 1, 1)
+    assert sorted(kind for kind, _ in fake_bot.calls) == ["delete", "edit"]
+
+    async with test_db() as session:
+        posts = (await session.execute(select(ChannelPost))).scalars().all()
+        assert len(posts) == 2
+        assert all(post.content_hash for post in posts)
+
+
+async def test_publish_all_apartments_batched_writes(test_db, fake_bot):
+    """Прогон публикации: одна сессия, записи постов одной пачкой"""
+    async with test_db() as session:
+        for i in range(5):
+            session.add(Apartment(
+                title=f"Квартира {i}", district="Центр", guests_max=2,
+                beds_text="1 кровать", sort_order=i,
+            ))
+        await session.commit()
+
+    statements = []
+    engine = test_db.kw["bind"].sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = await publishing.publish_all_apartments()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert result.published == 5
+    # select квартир + select постов + один INSERT всех постов
+    assert len(statements) == 3
+
+    result = await publishing.publish_all_apartments(resume_since=result.started_at)
+    assert (result.published, result.skipped) == (0, 5)
+
+    async with test_db() as session:
+        posts = (await session.execute(select(ChannelPost))).scalars().all()
+        assert len(posts) == 5
+
+
+def test_render_catalog_pages():
+    """Страницы ограничены по числу квартир и по длине сообщения"""
+    apartments = [
+        SimpleNamespace(title=f"Квартира {i}", district="Центр", guests_max=2)
+        for i in range(45)
+    ]
+
+    pages = publishing.render_catalog_pages(apartments, page_size=20)
+    assert len(pages) == 3
+    assert "Квартира 19" in pages[0] and "Квартира 20" in pages[1]
+
+    pages = publishing.render_catalog_pages(apartments, page_size=100, limit=500)
+    assert len(pages) > 1
+    assert all(len(page) <= 500 for page in pages)
+
+
+async def test_publish_catalog_partial_edits(test_db, fake_bot, monkeypatch):
+    """Изменение одной квартиры редактирует только ее страницу"""
+    monkeypatch.setattr(publishing.settings, "catalog_page_size", 2)
+    async with test_db() as session:
+        for i in range(5):
+            session.add(Apartment(
+                title=f"Квартира {i}", district="Центр", guests_max=2,
+                beds_text="1 кровать", sort_order=i,
+            ))
+        await session.commit()
+
+    result = await publishing.publish_catalog()
+    assert result.created == 3
+
+    fake_bot.calls.clear()
+    async with test_db() as session:
+        apartment = (await session.execute(
+            select(Apartment).where(Apartment.title == "Квартира 3")
+        )).scalar_one()
+        apartment.guests_max = 4
+        await session.commit()
+
+    result = await publishing.publish_catalog()
+    assert (result.edited, result.unchanged) == (1, 2)
+    assert [kind for kind, _ in fake_bot.calls] == ["edit"]
+
+    async with test_db() as session:
+        for apartment in (await session.execute(select(Apartment))).scalars().all():
+            if apartment.sort_order >= 2:
+                apartment.is_active = False
+        await session.commit()
+
+    result = await publishing.publish_catalog()
+    assert result.deleted == 2
@@ -0,0 +1,70 @@
+"""
+Тесты лимитера Telegram: token bucket и обработка retry_after.
+"""
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.services.rate_limit import TelegramRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_delay():
+    """Токены выдаются с темпом rate, запас не больше capacity"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    assert bucket.delay() == pytest.approx(0.5)
+
+    clock.now = 10.0
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    assert bucket.delay() > 0
+
+
+def test_token_bucket_block():
+    """После 429 токены не выдаются до истечения retry_after"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100.0, clock=clock)
+
+    bucket.block(3)
+    assert bucket.delay() == pytest.approx(3)
+
+    clock.now = 3.0
+    assert bucket.delay() == 0
+
+
+async def test_rate_limiter_retries_after_429():
+    """TelegramRetryAfter повторяется, ответ возвращается вызывающему"""
+    limiter = TelegramRateLimiter(global_rate=1000, chat_rate_per_minute=60000, max_retries=2)
+    calls = []
+
+    async def send():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=0)
+        return "ok"
+
+    assert await limiter.call(-100, send) == "ok"
+    assert len(calls) == 2
+    assert limiter.retries == 1
+
+
+async def test_rate_limiter_gives_up():
+    """После max_retries исключение пробрасывается"""
+    limiter = TelegramRateLimiter(global_rate=1000, chat_rate_per_minute=60000, max_retries=1)
+
+    async def send():
+        raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=0)
+
+    with pytest.raises(TelegramRetryAfter):
+        await limiter.call(-100, send)
@@ -0,0 +1,142 @@
+"""
+Тесты планировщика: запись запусков, дневные агрегаты, лидерство.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db.crud import create_lead, get_last_job_runs, get_or_create_booking, rollup_daily_stats
+from app.db.models import BookingStatus, JobRun
+from app.services import scheduler
+
+
+async def test_run_job_records_duration(test_db, monkeypatch):
+    """Каждый запуск пишется в job_runs, ошибка задачи не пробрасывается"""
+    async def ok():
+        pass
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(scheduler.JOBS, "ok_job", scheduler.JobSpec(ok, 1))
+    monkeypatch.setitem(scheduler.JOBS, "bad_job", scheduler.JobSpec(boom, 1))
+
+    await scheduler.run_job("ok_job", sessionmaker=test_db)
+    await scheduler.run_job("bad_job", sessionmaker=test_db)
+    await scheduler.run_job("ok_job", sessionmaker=test_db)
+
+    async with test_db() as session:
+        runs = (await session.execute(select(JobRun))).scalars().all()
+        assert len(runs) == 3
+        assert all(run.duration_ms >= 0 for run in runs)
+
+        last = {run.job_id: run for run in await get_last_job_runs(session)}
+        assert last["ok_job"].status == "ok"
+        assert last["bad_job"].status == "error"
+        assert last["bad_job"].error == "boom"
+
+
+async def test_rollup_daily_stats_idempotent(test_db):
+    """Повторный rollup за день перезаписывает строку, а не дублирует"""
+    today = datetime.utcnow().date()
+    async with test_db() as session:
+        await create_lead(session, contact="+7900")
+        await get_or_create_booking(session, "b1", status=BookingStatus.PAID, total_amount=5000)
+        await get_or_create_booking(session, "b2", status=BookingStatus.CREATED)
+
+        stats = await rollup_daily_stats(session, today)
+        assert (stats.leads_count, stats.bookings_count, stats.paid_count, stats.paid_amount) == (1, 2, 1, 5000)
+
+        await create_lead(session, contact="+7901")
+        stats = await rollup_daily_stats(session, today)
+        assert stats.leads_count == 2
+
+
+def test_sync_database_url():
+    assert scheduler.sync_database_url("postgresql+asyncpg://u@h/db") == "postgresql+psycopg://u@h/db"
+    assert scheduler.sync_database_url("sqlite+aiosqlite:///app.db") == "sqlite:///app.db"
+
+
+class FakeLock:
+    def __init__(self):
+        self.acquired = 0
+        self.released = 0
+
+    async def acquire(self):
+        self.acquired += 1
+        return True
+
+    async def check(self):
+        return True
+
+    async def release(self):
+        self.released += 1
+
+
+class FakeStore:
+    def __init__(self):
+        self.engine = self
+        self.disposed = False
+
+    def dispose(self):
+        self.disposed = True
+
+
+class FakeScheduler:
+    def __init__(self, fail_start=False):
+        self.fail_start = fail_start
+        self.running = False
+
+    def start(self):
+        if self.fail_start:
+            raise RuntimeError("job store недоступен")
+        self.running = True
+
+    def shutdown(self, wait=True):
+        self.running = False
+
+
+async def test_failed_start_releases_leadership(monkeypatch):
+    """Упавший запуск не оставляет воркер лидером: lock отпущен, следующий шаг повторяет"""
+    lock = FakeLock()
+    job_scheduler = scheduler.JobScheduler(lock)
+    built = []
+
+    def build():
+        job_scheduler._jobstore = FakeStore()
+        built.append((FakeScheduler(fail_start=len(built) == 0), job_scheduler._jobstore))
+        return built[-1][0]
+
+    monkeypatch.setattr(job_scheduler, "build", build)
+    monkeypatch.setattr(job_scheduler, "ensure_jobs", lambda: None)
+
+    await job_scheduler.elect()
+    assert not job_scheduler.is_leader
+    assert lock.released == 1
+    assert built[0][1].disposed
+
+    await job_scheduler.elect()
+    assert job_scheduler.is_leader
+    assert lock.acquired == 2
+
+
+async def test_failed_ensure_jobs_shuts_scheduler_down(monkeypatch):
+    lock = FakeLock()
+    job_scheduler = scheduler.JobScheduler(lock)
+    fake = FakeScheduler()
+    store = FakeStore()
+
+    def build():
+        job_scheduler._jobstore = store
+        return fake
+
+    def ensure_jobs():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(job_scheduler, "build", build)
+    monkeypatch.setattr(job_scheduler, "ensure_jobs", ensure_jobs)
+
+    await job_scheduler.elect()
+    assert not job_scheduler.is_leader
+    assert (fake.running, store.disposed, lock.released) == (False, True, 1)
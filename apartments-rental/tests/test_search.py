@@ -0,0 +1,53 @@
+"""
+Тесты поиска квартир для wizard.
+"""
+
+from app.db.crud import search_apartments
+from app.db.models import Apartment, Booking, BookingStatus
+
+
+async def seed(sessionmaker):
+    async with sessionmaker() as session:
+        apartments = [
+            Apartment(title="A", district="Центр", guests_max=4, price_per_night=3000, sort_order=2),
+            Apartment(title="B", district="Центр", guests_max=2, price_per_night=2000, sort_order=1),
+            Apartment(title="C", district="Парк", guests_max=6, price_per_night=5000, sort_order=3),
+            Apartment(title="D", district="Центр", guests_max=4, price_per_night=None, sort_order=4),
+            Apartment(title="E", district="Центр", guests_max=4, is_active=False),
+        ]
+        session.add_all(apartments)
+        await session.commit()
+        return {apt.title: apt.id for apt in apartments}
+
+
+async def test_search_filters_and_order(test_db):
+    ids = await seed(test_db)
+    async with test_db() as session:
+        assert await search_apartments(session) == [ids["B"], ids["A"], ids["C"], ids["D"]]
+        assert await search_apartments(session, district="Центр", guests=3) == [ids["A"], ids["D"]]
+        assert await search_apartments(session, guests=5) == [ids["C"]]
+
+
+async def test_search_budget_keeps_unpriced(test_db):
+    ids = await seed(test_db)
+    async with test_db() as session:
+        assert await search_apartments(session, budget=2500) == [ids["B"], ids["D"]]
+
+
+async def test_search_excludes_booked_dates(test_db):
+    ids = await seed(test_db)
+    async with test_db() as session:
+        session.add_all([
+            Booking(external_id="1", apartment_id=ids["A"], check_in="2026-03-01", check_out="2026-03-05",
+                    status=BookingStatus.PAID),
+            Booking(external_id="2", apartment_id=ids["B"], check_in="2026-03-01", check_out="2026-03-05",
+                    status=BookingStatus.CANCELED),
+        ])
+        await session.commit()
+
+        found = await search_apartments(session, district="Центр", dates=("2026-03-04", "2026-03-06"))
+        assert found == [ids["B"], ids["D"]]
+
+        # выезд в день заезда — не пересечение
+        found = await search_apartments(session, district="Центр", dates=("2026-03-05", "2026-03-07"))
+        assert found == [ids["B"], ids["A"], ids["D"]]
@@ -0,0 +1,58 @@
+"""
+Тесты unit of work: один commit на сценарий и откат при ошибке.
+"""
+
+import pytest
+from sqlalchemy import event, select, func
+
+from app.db.crud import create_lead, get_or_create_user, save_webhook_event
+from app.db.models import Lead, User, WebhookEvent
+from app.db.session import unit_of_work
+
+
+async def test_unit_of_work_single_commit(test_db):
+    """Хелперы внутри unit_of_work только flush-ят, commit один"""
+    async with test_db() as session:
+        commits = []
+        event.listen(session.sync_session, "after_commit", lambda s: commits.append(s))
+
+        async with unit_of_work(session):
+            user = await get_or_create_user(session, telegram_id=100)
+            lead = await create_lead(session, user_id=user.id, contact="+7900")
+            await save_webhook_event(
+                session, provider="homereserve", event_type="paid", payload_hash="h1",
+            )
+            # id уже назначены после flush
+            assert user.id is not None
+            assert lead.id is not None
+            assert commits == []
+
+        assert len(commits) == 1
+
+
+async def test_unit_of_work_rollback_on_error(test_db):
+    """При исключении не остается частичных записей"""
+    async with test_db() as session:
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session):
+                user = await get_or_create_user(session, telegram_id=200)
+                await create_lead(session, user_id=user.id, contact="+7901")
+                raise RuntimeError("boom")
+
+    async with test_db() as session:
+        users = await session.execute(select(func.count(User.id)))
+        leads = await session.execute(select(func.count(Lead.id)))
+        events = await session.execute(select(func.count(WebhookEvent.id)))
+        assert users.scalar() == 0
+        assert leads.scalar() == 0
+        assert events.scalar() == 0
+
+
+async def test_helpers_commit_outside_unit_of_work(test_db):
+    """Вне unit_of_work хелперы коммитят сами, как раньше"""
+    async with test_db() as session:
+        await get_or_create_user(session, telegram_id=300)
+
+    async with test_db() as session:
+        result = await session.execute(select(User).where(User.telegram_id == 300))
+        assert result.scalar_one_or_none() is not None
@@ -0,0 +1,80 @@
+"""
+Тесты пула обработки Telegram updates.
+"""
+
+import asyncio
+
+from app.bot.updates import UpdateWorkerPool, update_chat_key
+
+
+def test_update_chat_key():
+    message = {"update_id": 1, "message": {"message_id": 5, "chat": {"id": 42}, "from": {"id": 7}}}
+    callback = {"update_id": 2, "callback_query": {"id": "x", "from": {"id": 7}, "message": {"chat": {"id": 43}}}}
+    inline = {"update_id": 3, "inline_query": {"id": "q", "from": {"id": 8}, "query": ""}}
+
+    assert update_chat_key(message) == 42
+    assert update_chat_key(callback) == 43
+    assert update_chat_key(inline) == 8
+    assert update_chat_key({"update_id": 9}) == 9
+
+
+async def test_pool_keeps_order_per_chat_and_runs_chats_in_parallel():
+    seen = []
+    active = 0
+    peak = 0
+
+    async def handler(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        seen.append(item)
+        active -= 1
+
+    pool = UpdateWorkerPool(handler, workers=4, queue_size=100)
+    pool.start()
+    for i in range(5):
+        for chat in (1, 2, 3):
+            assert pool.submit(chat, (chat, i))
+    await pool.stop()
+
+    for chat in (1, 2, 3):
+        assert [i for c, i in seen if c == chat] == list(range(5))
+    assert peak > 1
+    assert pool.metrics()["processed"] == 15
+
+
+async def test_pool_rejects_when_full_and_survives_errors():
+    release = asyncio.Event()
+
+    async def handler(item):
+        await release.wait()
+        if item == "bad":
+            raise ValueError(item)
+
+    pool = UpdateWorkerPool(handler, workers=1, queue_size=2)
+    pool.start()
+    assert pool.submit(1, "bad")
+    await asyncio.sleep(0)  # воркер забрал первый update
+    assert pool.submit(1, "a")
+    assert pool.submit(1, "b")
+    assert not pool.submit(1, "c")
+
+    release.set()
+    await pool.stop()
+
+    metrics = pool.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["failed"] == 1
+    assert metrics["processed"] == 2
+
+
+async def test_pool_rejects_before_start_and_after_stop():
+    pool = UpdateWorkerPool(lambda item: asyncio.sleep(0), workers=2)
+    assert not pool.submit(1, "early")
+
+    pool.start()
+    assert pool.submit(1, "a")
+    await pool.stop()
+    assert not pool.submit(1, "late")
+    assert pool.metrics()["rejected"] == 2
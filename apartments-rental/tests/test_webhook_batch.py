@@ -0,0 +1,71 @@
+"""
+Тесты пакетного приема вебхуков.
+"""
+
+from sqlalchemy import func, select
+
+from app.api.routes_webhooks import batch_item, iter_ndjson
+from app.db.crud import get_or_create_booking
+from app.db.models import Booking, WebhookEvent
+from app.services.booking_events import ingest_booking_batch
+from app.services.webhook_parser import get_provider_registry
+
+
+def item(booking_id: str, status: str = "confirmed", **extra) -> tuple:
+    payload = {"booking_id": booking_id, "status": status, "price": 5000, **extra}
+    return f"hash-{booking_id}-{status}", payload
+
+
+async def test_iter_ndjson_splits_across_chunks():
+    async def stream():
+        yield b'{"a": 1}\n{"b"'
+        yield b': 2}\n\n'
+        yield b'{"c": 3}'
+
+    lines = [line async for line in iter_ndjson(stream())]
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+    spec = get_provider_registry().get("homereserve")
+    assert batch_item(spec, b"not json")[1] is None
+    assert batch_item(spec, b'{"b": 2, "a": 1}')[0] == batch_item(spec, b'{"a":1,"b":2}')[0]
+
+
+async def test_batch_dedups_and_reports_per_item(test_db):
+    async with test_db() as session:
+        existing, _ = await get_or_create_booking(session, external_id="BK-old", status="confirmed")
+
+        items = [
+            item("BK-1"),
+            item("BK-2", "paid"),
+            item("BK-1"),  # дубликат внутри пачки
+            ("hash-garbage", {"unexpected": True}),
+            ("hash-invalid", None),
+            item("BK-old", "paid"),
+        ]
+        results = await ingest_booking_batch(session, "homereserve", items)
+
+        assert [r["ok"] for r in results] == [True, True, True, False, False, True]
+        assert results[2] == {"ok": True, "duplicate": True}
+        assert results[3]["error"] == "Could not parse webhook"
+        assert results[4]["error"] == "Invalid JSON"
+        assert results[5]["booking_id"] == existing.id
+
+        # Повтор той же пачки — все уже сохраненные события дубликаты
+        again = await ingest_booking_batch(session, "homereserve", items[:3])
+        assert all(r.get("duplicate") for r in again)
+
+        assert await session.scalar(select(func.count(Booking.id))) == 3
+        assert await session.scalar(select(func.count(WebhookEvent.id))) == 4
+
+
+async def test_batch_queue_only_leaves_events_for_inbox(test_db):
+    async with test_db() as session:
+        results = await ingest_booking_batch(
+            session, "homereserve", [item("BK-1"), item("BK-2")], queue_only=True,
+        )
+        assert all(r["queued"] for r in results)
+
+        pending = await session.scalar(
+            select(func.count(WebhookEvent.id)).where(WebhookEvent.processed_at.is_(None))
+        )
+        assert pending == 2
+        assert await session.scalar(select(func.count(Booking.id))) == 0
@@ -0,0 +1,94 @@
+"""
+Тесты inbox вебхуков: сохранение сырых событий и обработка воркерами.
+"""
+
+from sqlalchemy import select
+
+from app.db.crud import claim_webhook_event, count_webhook_inbox
+from app.db.models import Booking, WebhookEvent
+from app.services import booking_events
+from app.services.booking_events import WebhookInbox
+
+
+def booking_payload(booking_id: str, status: str = "confirmed") -> dict:
+    return {
+        "booking_id": booking_id,
+        "status": status,
+        "check_in_date": "2026-02-15",
+        "check_out_date": "2026-02-17",
+        "price": 5000,
+    }
+
+
+async def enqueue(session, payload: dict, payload_hash: str):
+    return await claim_webhook_event(
+        session,
+        provider="homereserve",
+        payload_hash=payload_hash,
+        event_type="unknown",
+        raw_payload_json=payload,
+    )
+
+
+async def test_inbox_processes_pending_events_in_batches(test_db):
+    async with test_db() as session:
+        for i in range(5):
+            await enqueue(session, booking_payload(f"BK-{i}"), f"h{i}")
+        await enqueue(session, {"unexpected": True}, "garbage")
+
+    inbox = WebhookInbox(sessionmaker=test_db, batch_size=4)
+    assert await inbox.run_once() == 4
+    assert await inbox.run_once() == 2
+    assert await inbox.run_once() == 0
+
+    assert inbox.processed == 5
+    assert inbox.unparsed == 1
+    assert inbox.latency.count == 6
+
+    async with test_db() as session:
+        assert await count_webhook_inbox(session, 5) == {"pending": 0, "dead": 0}
+        bookings = (await session.execute(select(Booking))).scalars().all()
+        assert sorted(b.external_id for b in bookings) == [f"BK-{i}" for i in range(5)]
+
+        event = (await session.execute(
+            select(WebhookEvent).where(WebhookEvent.payload_hash == "h0")
+        )).scalar_one()
+        assert (event.event_id, event.event_type) == ("BK-0", "confirmed")
+
+
+async def test_inbox_failure_is_isolated_and_retried(test_db, monkeypatch):
+    """Ошибка одного события откатывает только его savepoint"""
+    async with test_db() as session:
+        await enqueue(session, booking_payload("BK-ok"), "ok")
+        await enqueue(session, booking_payload("BK-bad"), "bad")
+
+    apply = booking_events.apply_booking_event
+
+    async def flaky_apply(session, parsed, payload):
+        if parsed["event_id"] == "BK-bad":
+            raise RuntimeError("db is down")
+        return await apply(session, parsed, payload)
+
+    monkeypatch.setattr(booking_events, "apply_booking_event", flaky_apply)
+
+    inbox = WebhookInbox(sessionmaker=test_db, max_attempts=2)
+    assert await inbox.run_once() == 2
+    assert (inbox.processed, inbox.failed) == (1, 1)
+
+    async with test_db() as session:
+        bad = (await session.execute(
+            select(WebhookEvent).where(WebhookEvent.payload_hash == "bad")
+        )).scalar_one()
+        assert bad.processed_at is None
+        assert (bad.attempts, bad.last_error) == (1, "db is down")
+
+    async with test_db() as session:
+        assert await count_webhook_inbox(session, 2) == {"pending": 1, "dead": 0}
+
+    # Вторая попытка, затем событие исключается из очереди
+    assert await inbox.run_once() == 1
+    assert await inbox.run_once() == 0
+    assert inbox.failed == 2
+
+    async with test_db() as session:
+        assert await count_webhook_inbox(session, 2) == {"pending": 0, "dead": 1}
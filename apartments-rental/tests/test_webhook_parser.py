@@ -3,8 +3,13 @@
 """
 
 import pytest
-from app.services.webhook_parser import WebhookParser, calculate_payload_hash
+from app import fastjson
+from app.services.webhook_parser import (
+    BUILTIN_MAPPINGS, ProviderRegistry, WebhookParser, calculate_payload_hash,
+    canonical_payload_hash, compile_path, compile_volatile,
+)
 import hashlib
+import json
 
 
 def test_webhook_parser_homereserve():
@@ -84,4 +89,76 @@ def test_calculate_payload_hash():
     
     # Хеш должен быть hex string длиной 64 (SHA256)
     assert len(hash1) == 64
-    assert all(c in "0123456789abcdef" for c in hash1)
\ No newline at end of file
+    assert all(c in "0123456789abcdef" for c in hash1)
+
+def test_webhook_parser_booking_com():
+    """Второй встроенный провайдер"""
+    payload = {"reservation_id": "R-1", "event_type": "PAYMENT_RECEIVED", "total_price": "7000"}
+    
+    result = WebhookParser(provider="booking_com", payload=payload).parse()
+    
+    assert result["provider"] == "booking_com"
+    assert (result["event_id"], result["event_type"], result["total_amount"]) == ("R-1", "paid", 7000)
+    assert result["currency"] == "RUB"
+
+
+def test_compile_path():
+    assert compile_path("a.b")({"a": {"b": 1}}) == 1
+    assert compile_path("a.b")({"a": "flat"}) is None
+    assert compile_path("a")(["not", "a", "dict"]) is None
+    assert compile_path(None)({"a": 1}) is None
+
+
+def test_provider_registry_loads_file(tmp_path):
+    """Провайдеры из файла компилируются и доступны по имени"""
+    path = tmp_path / "providers.json"
+    path.write_text(json.dumps({
+        "avito": {
+            "event_id": "booking.id",
+            "event_type": "booking.state",
+            "status_values": {"PAID": "paid"},
+        },
+    }))
+    
+    registry = ProviderRegistry(BUILTIN_MAPPINGS)
+    assert registry.load_file(str(path)) == 1
+    assert registry.names() == ["avito", "booking_com", "homereserve"]
+    
+    parsed = registry.get("avito").extract({"booking": {"id": "A-1", "state": "PAID"}})
+    assert (parsed["provider"], parsed["event_id"], parsed["event_type"]) == ("avito", "A-1", "paid")
+
+
+def test_canonical_payload_hash_ignores_form():
+    """Порядок ключей, пробелы, 5000.0 vs 5000 и volatile-поля не меняют хеш"""
+    volatile = compile_volatile(["sent_at", "meta.delivery"])
+    first = fastjson.loads(b'{"booking_id": "BK-1", "price": 5000, "sent_at": 1, "meta": {"delivery": 1, "v": 2}}')
+    second = fastjson.loads(b'{"meta":{"v":2,"delivery":7},"sent_at":2,"price":5000.0,"booking_id":"BK-1"}')
+    
+    assert canonical_payload_hash(first, volatile) == canonical_payload_hash(second, volatile)
+    assert canonical_payload_hash(first, volatile) != canonical_payload_hash({**first, "price": 5001}, volatile)
+    # Без volatile-полей разница во времени отправки — это другое событие
+    assert canonical_payload_hash(first) != canonical_payload_hash(second)
+
+
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_fastjson_roundtrip(backend, monkeypatch):
+    """Разбор одинаков на обоих бэкендах, включая NaN, который orjson не принимает"""
+    if backend == "stdlib":
+        monkeypatch.setattr(fastjson, "orjson", None)
+    data = {"b": [1, 2.5, None], "a": "Краснодар"}
+    
+    assert fastjson.loads(fastjson.dumps(data)) == data
+    assert fastjson.loads(b'{"x": NaN}')["x"] != fastjson.loads(b'{"x": NaN}')["x"]
+    with pytest.raises(ValueError):
+        fastjson.loads(b"{broken")
+
+
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_canonical_hash_does_not_depend_on_backend(backend, monkeypatch):
+    """Ключ дедупликации одинаков на воркерах с orjson и без"""
+    if backend == "stdlib":
+        monkeypatch.setattr(fastjson, "orjson", None)
+    payload = fastjson.loads('{"tiny": 1e-7, "huge": 1e16, "price": 2.5, "city": "Краснодар"}')
+    
+    canonical = '{"city":"Краснодар","huge":10000000000000000,"price":2.5,"tiny":1e-07}'.encode()
+    assert canonical_payload_hash(payload) == hashlib.sha256(canonical).hexdigest()
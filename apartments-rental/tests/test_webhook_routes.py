@@ -0,0 +1,104 @@
+"""
+Тесты endpoint-ов вебхуков бронирования.
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import func, select
+
+from app.api import routes_webhooks
+from app.api.routes_webhooks import router, settings
+from app.db.crud import get_or_create_referral_code, get_or_create_user
+from app.db.models import Booking, ReferralEvent, WebhookEvent
+from app.db.session import get_session
+
+
+@pytest.fixture
+async def client(test_db):
+    app = FastAPI()
+    app.include_router(router, prefix="/webhooks")
+
+    async def session_override():
+        async with test_db() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        client.headers["X-Webhook-Secret"] = settings.webhook_secret
+        yield client
+
+
+async def test_webhook_applies_booking(client, test_db):
+    response = await client.post("/webhooks/booking_com", json={
+        "reservation_id": "R-1", "event_type": "PAYMENT_RECEIVED", "total_price": 5000,
+    })
+    assert response.json()["ok"] is True
+    assert response.json()["status_applied"] is True
+
+    response = await client.post("/webhooks/unknown_provider", json={})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"text"', b'{"status": "paid"}'])
+async def test_webhook_rejects_unusable_payload_before_upsert(client, test_db, body):
+    """Не объект или без id брони — ok: false (200), а не 500 с вечными ретраями"""
+    response = await client.post("/webhooks/booking", content=body)
+
+    assert response.status_code == 200
+    assert response.json()["ok"] is False
+
+    async with test_db() as session:
+        assert await session.scalar(select(func.count(Booking.id))) == 0
+        # Событие без id сохраняется обработанным — повтор будет дубликатом
+        pending = await session.scalar(
+            select(func.count(WebhookEvent.id)).where(WebhookEvent.processed_at.is_(None))
+        )
+        assert pending == 0
+
+
+async def test_repeated_paid_logs_referral_once(client, test_db):
+    """Повтор paid (другой payload, тот же статус) не считается переходом"""
+    async with test_db() as session:
+        user = await get_or_create_user(session, telegram_id=42)
+        code = await get_or_create_referral_code(session, user.id)
+        source_tag = f"partner_{code.code}"
+
+    payload = {"booking_id": "BK-1", "status": "paid", "price": 5000, "source_tag": source_tag}
+    first = await client.post("/webhooks/homereserve", json=payload)
+    again = await client.post("/webhooks/homereserve", json={**payload, "price": 5500})
+
+    assert first.json()["status_applied"] is True
+    assert again.json()["status_applied"] is False
+    assert again.json()["payout_created"] is False
+
+    async with test_db() as session:
+        assert await session.scalar(select(func.count(ReferralEvent.id))) == 1
+        booking = await session.scalar(select(Booking))
+        assert booking.total_amount == 5500
+
+
+async def test_batch_array_is_split_into_chunks(client, test_db, monkeypatch):
+    """Большой JSON-массив применяется частями по webhook_batch_size"""
+    chunks = []
+    ingest = routes_webhooks.ingest_booking_batch
+
+    async def spy(session, provider, items, queue_only=False):
+        chunks.append(len(items))
+        return await ingest(session, provider, items, queue_only)
+
+    monkeypatch.setattr(routes_webhooks, "ingest_booking_batch", spy)
+    monkeypatch.setattr(settings, "webhook_batch_size", 2)
+    monkeypatch.setattr(settings, "webhook_mode", "inline")
+
+    payloads = [{"booking_id": f"BK-{i}", "status": "confirmed", "price": 5000} for i in range(4)]
+    payloads.append(payloads[0])  # дубликат из предыдущей части
+    response = await client.post("/webhooks/booking/batch", json=payloads)
+
+    body = response.json()
+    assert chunks == [2, 2, 1]
+    assert body["count"] == 5
+    assert [r.get("duplicate", False) for r in body["results"]] == [False] * 4 + [True]
+
+    async with test_db() as session:
+        assert await session.scalar(select(func.count(Booking.id))) == 4